@@ -4,6 +4,7 @@ import pathlib
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from database import db
+from utils import sqlite_profile
 from sqlalchemy.exc import OperationalError
 
 # Set up logging
@@ -54,6 +55,9 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # Log which redirect URI we're using
 logger.info(f"Using Replit redirect URI: {os.environ.get('REPLIT_URL', 'Not set')}/callback")
 
+# Tune every SQLite connection (the fallback database is shared with the dashboard)
+sqlite_profile.install()
+
 # Initialize database
 db.init_app(app)
 
@@ -64,8 +68,10 @@ retry_count = 0
 while retry_count < MAX_RETRIES:
     try:
         with app.app_context():
-            from models.economy import UserEconomy, Item, Inventory, Transaction
+            from models.economy import UserEconomy, Item, Inventory, Transaction, TransactionDaily, upgrade_economy_schema
+            from models.moderation import ModerationEvent, ModerationAggregate
             db.create_all()
+            upgrade_economy_schema()
             logger.info("Database tables created successfully")
             break  # Success, exit the retry loop
     except OperationalError as e:
@@ -106,8 +112,10 @@ while retry_count < MAX_RETRIES:
         # Try one more time with SQLite
         try:
             with app.app_context():
-                from models.economy import UserEconomy, Item, Inventory, Transaction
+                from models.economy import UserEconomy, Item, Inventory, Transaction, TransactionDaily, upgrade_economy_schema
+                from models.moderation import ModerationEvent, ModerationAggregate
                 db.create_all()
+                upgrade_economy_schema()
                 logger.info("Database tables created successfully with SQLite")
                 break
         except Exception as sqlite_err:
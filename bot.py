@@ -40,6 +40,21 @@ class Bot(commands.Bot):
         logger.info(f"Owner check for {user} (ID: {user.id}): {is_owner}, BOT_OWNER_IDS: {BOT_OWNER_IDS}")
         return is_owner
 
+    async def close(self):
+        """Flush pending config and economy writes and close HTTP and database pools before shutting down"""
+        from utils.config_store import flush_all_stores
+        from utils.http_client import close_sessions
+        from models.conversation import dispose_engine
+        from utils.db_executor import shutdown_executor
+        from repositories.economy_cache import close_cache
+        await flush_all_stores()
+        await close_cache()
+        await super().close()
+        await close_sessions()
+        # Let queued database work finish before closing the pools; both block, so off the event loop
+        await asyncio.to_thread(shutdown_executor)
+        await asyncio.to_thread(dispose_engine)
+
     async def setup_hook(self):
         """Load cogs and start tasks"""
         logger.info("Setting up bot...")
@@ -303,8 +318,9 @@ class Bot(commands.Bot):
 def init_db():
     """Initialize database tables"""
     from dashboard.app import app
-    from models.economy import initialize_shop, UserEconomy, Item, Inventory, Transaction
-    from models.conversation import Conversation  # Import Conversation model
+    from models.economy import initialize_shop, upgrade_economy_schema, UserEconomy, Item, Inventory, Transaction, TransactionDaily
+    from models.conversation import Conversation, init_conversation_storage  # Import Conversation model
+    from models.moderation import ModerationEvent, ModerationAggregate
     
     # Add enhanced economy debugging
     debug_logger = logging.getLogger('economy_debug')
@@ -313,6 +329,7 @@ def init_db():
     with app.app_context():
         # Create all tables
         db.create_all()
+        upgrade_economy_schema()
         
         # Verify economy tables exist
         debug_logger.info("Verifying economy tables...")
@@ -336,6 +353,12 @@ def init_db():
         
         logger.info("Database tables and shop items created successfully")
         
+    # Create the shared conversation engine and schema once, up front
+    try:
+        init_conversation_storage()
+    except Exception as e:
+        logger.error(f"Error initializing conversation storage: {str(e)}")
+        
     # Print environment info for debugging
     debug_logger.info(f"Discord token length: {len(os.environ.get('DISCORD_TOKEN', ''))}")
     debug_logger.info(f"Database URL available: {'yes' if os.environ.get('DATABASE_URL') else 'no'}")
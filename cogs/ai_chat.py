@@ -4,15 +4,17 @@ import g4f
 import asyncio
 import os
 import json
-import aiohttp
 import random
 import traceback
 from typing import Literal, Optional
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from utils.embed_helpers import create_embed, create_error_embed
 from utils.ai_preference_manager import ai_preferences
-from models.conversation import Conversation
+from repositories import conversation as conversation_repo
+from utils import http_client
+from utils.provider_router import get_router, all_routers
+from utils.response_cache import ResponseCache, make_key, normalize_text
 from config import GOOGLE_CLOUD_PROJECT, VERTEX_LOCATION, USE_VERTEX_AI, USE_GOOGLE_AI, GOOGLE_API_KEY
 from config import AIML_API_KEY, USE_AIML_API
 
@@ -39,6 +41,117 @@ except ImportError:
 
 logger = logging.getLogger('discord')
 
+# How often conversation history outside the retention policy is deleted
+CONVERSATION_RETENTION_HOURS = 6
+
+# Streamed answers: seconds between message edits (Discord allows about 5 edits per 5 seconds)
+STREAM_EDIT_INTERVAL = 1.0
+# Embed descriptions are capped at 4096 characters
+STREAM_PREVIEW_CHARS = 4000
+AI_COLOR = 0x3498db  # Blue color for AI
+
+# Router provider names and how answers from them are labelled
+PROVIDER_LABELS = {
+    "aiml": "AIML API",
+    "gemini": "Gemini API",
+    "vertex": "Vertex AI",
+    "vertex_rest": "Vertex AI REST",
+    "g4f": "FreeGpt AI",
+}
+
+# One-off answers (no conversation history) are cached by prompt, personality and models
+AI_RESPONSE_CACHE_SIZE = int(os.environ.get("AI_RESPONSE_CACHE_SIZE", "1000"))
+AI_RESPONSE_CACHE_TTL = int(os.environ.get("AI_RESPONSE_CACHE_TTL", str(6 * 60 * 60)))
+# SQLite file that keeps cached answers across restarts (empty = memory only)
+AI_RESPONSE_CACHE_PATH = os.environ.get("AI_RESPONSE_CACHE_PATH", "data/ai_response_cache.db")
+# Appended to ai_source for answers served from the cache
+CACHED_SUFFIX = " (cached)"
+
+class StreamedReply:
+    """One Discord message showing an AI answer while it is generated
+
+    The first text is shown as soon as it arrives; after that the message is
+    edited at most once per STREAM_EDIT_INTERVAL with whatever has arrived
+    since, so a fast stream never runs into the edit rate limit.
+    """
+
+    def __init__(self, send, edit):
+        self._send = send  # async (embed) -> message
+        self._edit = edit  # async (message, embed)
+        self.message = None
+        self._text = ""
+        self._closed = False
+        self._dirty = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task = None
+
+    @classmethod
+    def for_context(cls, ctx):
+        return cls(lambda embed: ctx.send(embed=embed), lambda message, embed: message.edit(embed=embed))
+
+    @classmethod
+    def for_interaction(cls, interaction):
+        # The deferred response is the message: the first edit replaces its "thinking" state
+        return cls(
+            lambda embed: interaction.edit_original_response(embed=embed),
+            lambda message, embed: interaction.edit_original_response(embed=embed)
+        )
+
+    def update(self, text: str) -> None:
+        """Show text (everything received so far) at the next allowed edit"""
+        self._text = text
+        self._dirty.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._render_loop())
+
+    async def _show(self, embed) -> None:
+        if self.message is None:
+            self.message = await self._send(embed)
+        else:
+            await self._edit(self.message, embed)
+
+    async def _render_loop(self) -> None:
+        while True:
+            await self._dirty.wait()
+            if self._closed:
+                return
+            self._dirty.clear()
+            text = self._text
+            if len(text) > STREAM_PREVIEW_CHARS:
+                text = text[:STREAM_PREVIEW_CHARS] + "…"
+            try:
+                await self._show(create_embed("AI Assistant", text + " ▌", color=AI_COLOR))
+            except discord.HTTPException as e:
+                logger.warning(f"Could not update streamed AI response: {str(e)}")
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=STREAM_EDIT_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    async def finish(self, embed) -> None:
+        """Show the final answer (or an error), in the streamed message if there is one"""
+        if self._task is not None and not self._task.done():
+            # Let an edit in flight land first so it can't overwrite the final embed
+            self._closed = True
+            self._closing.set()
+            self._dirty.set()
+            try:
+                await self._task
+            except Exception as e:
+                logger.warning(f"Streamed AI response stopped with an error: {str(e)}")
+        await self._show(embed)
+
+    async def close(self) -> None:
+        """Stop updating the message without showing anything else (after an error)"""
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
 class AIChat(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -128,10 +241,207 @@ class AIChat(commands.Cog):
         else:
             logger.info("AI Chat cog initialized with g4f fallback AI providers only")
             logger.info("To use AIML API, set the AIML_API_KEY environment variable")
+        
+        # Cached answers are only valid for the providers and models that produced them
+        self.response_cache = ResponseCache(
+            "ai_responses", AI_RESPONSE_CACHE_SIZE, AI_RESPONSE_CACHE_TTL, AI_RESPONSE_CACHE_PATH or None
+        )
+        providers = [name for name, _ in self._chat_candidates("", None, False, None)]
+        self.model_signature = f"{','.join(providers)};{self.gemini_model}"
+
+    async def cog_load(self):
+        """Start background tasks"""
+        http_client.acquire()
+        await self.response_cache.open()
+        self.prune_conversations.start()
+
+    async def cog_unload(self):
+        """Stop background tasks and release the shared HTTP sessions"""
+        self.prune_conversations.cancel()
+        await self.response_cache.close()
+        await http_client.release()
+
+    @tasks.loop(hours=CONVERSATION_RETENTION_HOURS)
+    async def prune_conversations(self):
+        """Delete conversation history outside the retention policy so the table stays bounded"""
+        try:
+            removed = await conversation_repo.prune_history()
+            if removed:
+                logger.info(f"Pruned {removed} conversation turns outside the retention policy")
+        except Exception as e:
+            logger.error(f"Error pruning conversation history: {str(e)}")
+
+    async def _stream_aiml(self, prompt, on_partial):
+        """Stream an AIML API completion, passing the text so far to on_partial
+
+        Returns (text, complete); complete is False if the stream broke off early.
+        """
+        pieces = []
+        try:
+            async for piece in self.aiml_client.stream_text(prompt):
+                pieces.append(piece)
+                on_partial("".join(pieces))
+        except Exception as e:
+            # The user has already seen what arrived; keep it rather than starting over
+            if not pieces:
+                raise
+            logger.warning(f"AIML API stream broke off after {len(pieces)} chunks: {str(e)}")
+            return "".join(pieces), False
+        return "".join(pieces), True
 
-    async def _process_ai_request(self, prompt, user_id=None, include_history=False):
+    async def _ask_aiml(self, prompt, on_partial, claim, truncated):
+        """AIML API answer (primary provider), streamed when the caller can show partial answers
+
+        A stream that broke off still answers with what arrived, but adds "aiml" to truncated.
+        """
+        # Format the prompt with system instructions
+        full_prompt = f"{ai_preferences.get_system_prompt()}\n\nUser query: {prompt}"
+        if not on_partial:
+            return await self.aiml_client.generate_text(full_prompt)
+
+        def show(text):
+            # Only the provider that claimed the reply may draw into it
+            if claim():
+                on_partial(text)
+
+        text, complete = await self._stream_aiml(full_prompt, show)
+        if not complete:
+            truncated.add("aiml")
+        return text or None
+
+    async def _ask_gemini(self, prompt, user_id, include_history):
+        """Gemini API answer, with conversation history if requested"""
+        system_prompt = ai_preferences.get_system_prompt()
+        headers = {
+            "Content-Type": "application/json"
+        }
+        
+        # Get conversation history for Gemini if needed
+        message_history = []
+        if user_id and include_history:
+            history = await conversation_repo.get_formatted_history(user_id, limit=8)
+            for msg in history:
+                message_history.append({
+                    "role": msg["role"],
+                    "parts": [{"text": msg["content"]}]
+                })
+            
+        # Add system prompt if not included in history
+        if not message_history or message_history[0]["role"] != "system":
+            message_history.insert(0, {
+                "role": "system",
+                "parts": [{"text": system_prompt}]
+            })
+            
+        # Add current message
+        message_history.append({
+            "role": "user",
+            "parts": [{"text": prompt}]
+        })
+            
+        payload = {
+            "contents": message_history,
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": 1024,
+                "topP": 0.95
+            }
+        }
+            
+        # Choose API endpoint based on model and version
+        api_url = f"https://generativelanguage.googleapis.com/{self.gemini_api_version}/{self.gemini_model}:generateContent?key={GOOGLE_API_KEY}"
+            
+        # Call Gemini API over the shared session
+        async with http_client.get_session("gemini").post(api_url, headers=headers, json=payload) as resp:
+            if resp.status != 200:
+                error_text = await resp.text()
+                logger.error(f"Gemini API error: Status {resp.status}, {error_text}")
+                return None
+            data = await resp.json()
+            if "candidates" in data and data["candidates"]:
+                candidate = data["candidates"][0]
+                if "content" in candidate and "parts" in candidate["content"]:
+                    return candidate["content"]["parts"][0]["text"]
+        return None
+
+    async def _ask_vertex(self, client, prompt, user_id, include_history):
+        """Vertex AI answer from the SDK or REST client"""
+        system_prompt = ai_preferences.get_system_prompt()
+        
+        # Get conversation history for Vertex
+        history = None
+        if user_id and include_history:
+            history = await conversation_repo.get_formatted_history(user_id, limit=8)
+        
+        # Use chat method for conversations with history
+        if include_history and history:
+            return await client.generate_chat_response(
+                message=prompt,
+                history=history,
+                system_prompt=system_prompt
+            )
+        # Use simple generation for one-off questions
+        if client is self.vertex_client:
+            return await client.generate_text(prompt=prompt, system_prompt=system_prompt)
+        return await client.generate_text(prompt=prompt)
+
+    async def _ask_g4f(self, prompt):
+        """g4f answer via the FreeGpt provider, with retries"""
+        max_retries = 2
+        retry_delay = 1
+        
+        # Create system message for g4f
+        system_messages = [
+            {"role": "system", "content": ai_preferences.get_system_prompt()}
+        ]
+        
+        for attempt in range(max_retries):
+            try:
+                response = await asyncio.wait_for(
+                    self.bot.loop.run_in_executor(
+                        None,
+                        lambda: g4f.ChatCompletion.create(
+                            model="gpt-3.5-turbo",  # Use a more compatible model
+                            provider=g4f.Provider.FreeGpt,  # First provider to try
+                            messages=system_messages + [{"role": "user", "content": prompt}]
+                        )
+                    ),
+                    timeout=30.0  # 30 second timeout
+                )
+                if response:  # If we got a valid response, stop retrying
+                    return response
+            except Exception as e:
+                logger.error(f"Error with FreeGpt attempt {attempt+1}/{max_retries}: {str(e)}")
+                if attempt < max_retries - 1:
+                    retry_after = retry_delay * (2 ** attempt)
+                    logger.warning(f"Retrying FreeGpt in {retry_after}s")
+                    await asyncio.sleep(retry_after)
+        return None
+
+    def _chat_candidates(self, prompt, user_id, include_history, on_partial, truncated=None):
+        """The configured providers as (name, attempt) pairs, in order of preference
+
+        Providers whose answer was cut short are added to the truncated set.
+        """
+        truncated = set() if truncated is None else truncated
+        candidates = []
+        if self.aiml_client and self.aiml_client.initialized:
+            candidates.append(("aiml", lambda claim: self._ask_aiml(prompt, on_partial, claim, truncated)))
+        if USE_GOOGLE_AI and GOOGLE_API_KEY:
+            candidates.append(("gemini", lambda claim: self._ask_gemini(prompt, user_id, include_history)))
+        if self.use_vertex_ai and self.vertex_client and self.vertex_client.initialized:
+            candidates.append(("vertex", lambda claim: self._ask_vertex(self.vertex_client, prompt, user_id, include_history)))
+        if self.use_vertex_ai and self.vertex_rest_client and self.vertex_rest_client.initialized:
+            candidates.append(("vertex_rest", lambda claim: self._ask_vertex(self.vertex_rest_client, prompt, user_id, include_history)))
+        candidates.append(("g4f", lambda claim: self._ask_g4f(prompt)))
+        return candidates
+
+    async def _process_ai_request(self, prompt, user_id=None, include_history=False, on_partial=None):
         """Process an AI request and return the response and source
-        This is a helper method used by both slash commands and prefix commands
+        This is a helper method used by both slash commands and prefix commands.
+        Answers to one-off questions come from the response cache when possible;
+        otherwise providers are tried through the chat router, healthiest first.
+        With on_partial, providers that can stream call it with the text received so far.
         """
         response = None
         ai_source = "Unknown"
@@ -142,211 +452,72 @@ class AIChat(commands.Cog):
             logger.info(f"Using custom response for query: {prompt[:50]}...")
             response = custom_response
             ai_source = "Custom Response"
+        else:
+            # Answers that depend on conversation history can't be shared
+            cache_key = None
+            if not include_history:
+                cache_key = make_key(self.model_signature, ai_preferences.personality_mode, normalize_text(prompt))
+                cached = await self.response_cache.fetch(cache_key)
+                if cached:
+                    response = cached["response"]
+                    ai_source = cached["source"] + CACHED_SUFFIX
+                    logger.info(f"AI response from cache ({cached['source']})")
             
-        # Try AIML API as primary provider
-        elif not response and self.aiml_client and self.aiml_client.initialized:
-            logger.info("Using AIML API as primary AI provider")
-            try:
-                # Set up system prompt
-                system_prompt = ai_preferences.get_system_prompt()
-                
-                # Format the prompt with system instructions
-                full_prompt = f"{system_prompt}\n\nUser query: {prompt}"
-                
-                # Call AIML API
-                aiml_response = await self.aiml_client.generate_text(full_prompt)
-                if aiml_response:
-                    response = aiml_response
-                    ai_source = "AIML API"
-                else:
-                    logger.warning("AIML API returned empty response")
-            except Exception as e:
-                logger.error(f"Error getting AIML API response: {str(e)}")
-                # Continue to next fallback
-        
-        # If no AIML API response, try Gemini API as fallback
-        elif not response and USE_GOOGLE_AI and GOOGLE_API_KEY:
-            # Set up system prompt
-            system_prompt = ai_preferences.get_system_prompt()
-            
-            logger.info("Using Gemini API as fallback AI provider")
-            try:
-                # Call Gemini API with aiohttp
-                async with aiohttp.ClientSession() as session:
-                    headers = {
-                        "Content-Type": "application/json"
-                    }
-                    
-                    # Get conversation history for Gemini if needed
-                    message_history = []
-                    if user_id and include_history:
-                        history = Conversation.get_formatted_history(user_id, limit=8)
-                        for msg in history:
-                            message_history.append({
-                                "role": msg["role"],
-                                "parts": [{"text": msg["content"]}]
-                            })
-                    
-                    # Add system prompt if not included in history
-                    if not message_history or message_history[0]["role"] != "system":
-                        message_history.insert(0, {
-                            "role": "system",
-                            "parts": [{"text": system_prompt}]
-                        })
-                    
-                    # Add current message
-                    message_history.append({
-                        "role": "user",
-                        "parts": [{"text": prompt}]
-                    })
-                    
-                    payload = {
-                        "contents": message_history,
-                        "generationConfig": {
-                            "temperature": 0.7,
-                            "maxOutputTokens": 1024,
-                            "topP": 0.95
-                        }
-                    }
-                    
-                    # Choose API endpoint based on model and version
-                    api_url = f"https://generativelanguage.googleapis.com/{self.gemini_api_version}/{self.gemini_model}:generateContent?key={GOOGLE_API_KEY}"
-                    
-                    async with session.post(api_url, headers=headers, json=payload) as resp:
-                        if resp.status == 200:
-                            data = await resp.json()
-                            if "candidates" in data and data["candidates"]:
-                                candidate = data["candidates"][0]
-                                if "content" in candidate and "parts" in candidate["content"]:
-                                    text_content = candidate["content"]["parts"][0]["text"]
-                                    response = text_content
-                                    ai_source = "Gemini API"
-                        else:
-                            error_text = await resp.text()
-                            logger.error(f"Gemini API error: Status {resp.status}, {error_text}")
-            except Exception as e:
-                logger.error(f"Error getting Gemini API response: {str(e)}")
-                # Continue to next fallback
-        
-        # Fall back to Vertex AI if Gemini API failed and Vertex is available
-        if not response and self.vertex_client and self.vertex_client.initialized and self.use_vertex_ai:
-            logger.info("Using Vertex AI as fallback AI provider")
-            try:
-                # Set up system prompt
-                system_prompt = ai_preferences.get_system_prompt()
-                
-                # Get conversation history for Vertex
-                history = None
-                if user_id and include_history:
-                    history = Conversation.get_formatted_history(user_id, limit=8)
-                
-                # Use chat method for conversations with history
-                if include_history and history:
-                    response = await self.vertex_client.generate_chat_response(
-                        message=prompt,
-                        history=history,
-                        system_prompt=system_prompt
-                    )
-                else:
-                    # Use simple generation for one-off questions
-                    response = await self.vertex_client.generate_text(
-                        prompt=prompt,
-                        system_prompt=system_prompt
-                    )
-                
-                if response:
-                    ai_source = "Vertex AI"
-            except Exception as e:
-                logger.error(f"Error getting Vertex AI response: {str(e)}")
-                # Continue to next fallback
-        
-        # Try Vertex REST API client as a second fallback if available and others failed
-        if not response and self.vertex_rest_client and self.vertex_rest_client.initialized and self.use_vertex_ai:
-            logger.info("Using Vertex REST API client as fallback for response")
-            try:
-                # Get conversation history for Vertex
-                history = None
-                if user_id and include_history:
-                    history = Conversation.get_formatted_history(user_id, limit=8)
-                
-                # Use chat method for conversations with history
-                if include_history and history:
-                    response = await self.vertex_rest_client.generate_chat_response(
-                        message=prompt,
-                        history=history,
-                        system_prompt=system_prompt
-                    )
-                else:
-                    # Use simple generation for one-off questions
-                    response = await self.vertex_rest_client.generate_text(
-                        prompt=prompt
-                    )
-                
-                if response:
-                    ai_source = "Vertex AI REST"
-            except Exception as e:
-                logger.error(f"Error getting Vertex REST API response: {str(e)}")
-                # Continue to next fallback
-        
-        # Fall back to g4f if both Google and Vertex AI failed or not configured
+            if not response:
+                truncated = set()
+                result = await get_router("chat").run(
+                    self._chat_candidates(prompt, user_id, include_history, on_partial, truncated)
+                )
+                if result:
+                    provider, response = result
+                    ai_source = PROVIDER_LABELS[provider]
+                    logger.info(f"AI response from {ai_source}")
+                    # A cut-off answer is better than nothing now, but must not be served again
+                    if cache_key and provider not in truncated:
+                        await self.response_cache.store(cache_key, {"response": response, "source": ai_source})
+            
+        # If all else failed, provide a generic fallback response
         if not response:
-            logger.info("Using g4f as fallback for AI response")
-            max_retries = 2
-            retry_delay = 1
-            
-            # Use standard system prompt for g4f 
-            system_prompt = ai_preferences.get_system_prompt()
-            
-            # Create system message for g4f
-            system_messages = [
-                {"role": "system", "content": system_prompt}
+            # Create a list of generic fallback responses
+            fallback_responses = [
+                "I'm having trouble processing your request right now. Could we try a simpler question?",
+                "I seem to be experiencing technical difficulties. Let's try again with a different question.",
+                "Sorry, I couldn't generate a proper response this time. Please try asking in a different way.",
+                "I wasn't able to process that correctly. Would you mind rephrasing your question?",
+                "My apologies, but I'm having trouble formulating a response. Let's try again later."
             ]
             
-            # Try with FreeGpt provider first
-            for attempt in range(max_retries):
-                try:
-                    response = await asyncio.wait_for(
-                        self.bot.loop.run_in_executor(
-                            None,
-                            lambda: g4f.ChatCompletion.create(
-                                model="gpt-3.5-turbo",  # Use a more compatible model
-                                provider=g4f.Provider.FreeGpt,  # First provider to try
-                                messages=system_messages + [{"role": "user", "content": prompt}]
-                            )
-                        ),
-                        timeout=30.0  # 30 second timeout
-                    )
-                    if response:  # If we got a valid response, break the retry loop
-                        ai_source = "FreeGpt AI"
-                        break
-                except Exception as e:
-                    logger.error(f"Error with FreeGpt attempt {attempt+1}/{max_retries}: {str(e)}")
-                    if attempt < max_retries - 1:
-                        retry_after = retry_delay * (2 ** attempt)
-                        logger.warning(f"Retrying FreeGpt in {retry_after}s")
-                        await asyncio.sleep(retry_after)
-            
-            # Try more providers if needed...
-            # Additional provider attempts can be added here
-            
-            # If all else failed, provide a generic fallback response
-            if not response:
-                # Create a list of generic fallback responses
-                fallback_responses = [
-                    "I'm having trouble processing your request right now. Could we try a simpler question?",
-                    "I seem to be experiencing technical difficulties. Let's try again with a different question.",
-                    "Sorry, I couldn't generate a proper response this time. Please try asking in a different way.",
-                    "I wasn't able to process that correctly. Would you mind rephrasing your question?",
-                    "My apologies, but I'm having trouble formulating a response. Let's try again later."
-                ]
-                
-                # Choose a random fallback response
-                response = random.choice(fallback_responses)
-                ai_source = "Bot Fallback"
-                logger.warning("All AI providers failed, using generic fallback response")
+            # Choose a random fallback response
+            response = random.choice(fallback_responses)
+            ai_source = "Bot Fallback"
+            logger.warning("All AI providers failed, using generic fallback response")
                 
         return response, ai_source
     
+    async def _show_error(self, interaction, reply, embed):
+        """Show an error in place of the streamed answer, or as a followup if nothing was streamed"""
+        if reply is not None:
+            await reply.finish(embed)
+        else:
+            await interaction.followup.send(embed=embed)
+
+    async def _abort_reply(self, reply):
+        """Replace a partly streamed answer with an error message after a failed request"""
+        if reply.message is None:
+            await reply.close()
+            return
+        embed = create_embed(
+            "AI Assistant",
+            "I'm sorry, but I encountered an error while processing your request. Please try again or ask a different question.",
+            color=0x3498db
+        )
+        embed.set_footer(text="An error occurred. Please try again.")
+        try:
+            await reply.finish(embed)
+        except Exception as e:
+            logger.error(f"Error replacing streamed response with error: {str(e)}")
+            await reply.close()
+
     @commands.command(name="ask")
     async def ask_prefix(self, ctx, *, question: str):
         """Ask the AI a question (prefix version)"""
@@ -354,14 +525,18 @@ class AIChat(commands.Cog):
         
         # Show typing indicator to show the bot is working
         async with ctx.typing():
-            # Process the AI request
-            response, ai_source = await self._process_ai_request(question, str(ctx.author.id))
+            # Process the AI request, showing the answer as it streams in
+            reply = StreamedReply.for_context(ctx)
+            try:
+                response, ai_source = await self._process_ai_request(question, str(ctx.author.id), on_partial=reply.update)
+            except Exception:
+                await self._abort_reply(reply)
+                raise
             
-            # Save the AI's response to the conversation history
+            # Save the question and the AI's response to the conversation history
             try:
                 user_id = str(ctx.author.id)
-                Conversation.add_message(user_id, "user", question)
-                Conversation.add_message(user_id, "assistant", response)
+                await conversation_repo.add_exchange(user_id, question, response)
                 logger.info(f"Added conversation to history for {user_id}")
             except Exception as e:
                 logger.error(f"Failed to save conversation to history: {str(e)}")
@@ -384,8 +559,11 @@ class AIChat(commands.Cog):
                     response,
                     color=0x3498db  # Blue color for AI
                 )
-                embed.set_footer(text=random.choice(expressions))
-                await ctx.send(embed=embed)
+                footer = random.choice(expressions)
+                if ai_source.endswith(CACHED_SUFFIX):
+                    footer += " • ⚡ Answered from cache"
+                embed.set_footer(text=footer)
+                await reply.finish(embed)
             else:
                 # Generic fallback error messages
                 fallback_messages = [
@@ -412,7 +590,7 @@ class AIChat(commands.Cog):
                     color=0x3498db  # Blue color for AI
                 )
                 embed.set_footer(text=random.choice(fallback_footers))
-                await ctx.send(embed=embed)
+                await reply.finish(embed)
     
     @app_commands.command(name="ask", description="Ask the AI a question")
     @app_commands.describe(question="The question or prompt for the AI")
@@ -420,6 +598,7 @@ class AIChat(commands.Cog):
         """Ask the AI a question and get a response"""
         # Initialize deferred to False as default
         deferred = False
+        reply = None
         
         try:
             # Add a try/except block to handle the defer operation safely
@@ -436,25 +615,21 @@ class AIChat(commands.Cog):
             logger.info(f"Processing AI request from {interaction.user}: {question}")
             user_id = str(interaction.user.id)
             
-            # Save the user's message to the conversation history
-            try:
-                Conversation.add_message(user_id, "user", question)
-                logger.info(f"Added user question to conversation history for {user_id}")
-            except Exception as e:
-                logger.error(f"Failed to save user question to conversation history: {str(e)}")
-                # Don't abort on history save failure, continue with the request
-            
-            # Process the AI request using the common method
-            response, ai_source = await self._process_ai_request(question, user_id)
+            # Process the AI request using the common method, editing the deferred response as it streams in
+            reply = StreamedReply.for_interaction(interaction) if deferred else None
+            response, ai_source = await self._process_ai_request(
+                question, user_id, on_partial=reply.update if reply else None
+            )
 
             logger.info(f"AI Response generated successfully: {response[:100]}...")  # Log first 100 chars
 
-            # Save the AI's response to the conversation history
+            # Save the question and the AI's response to the conversation history
             try:
-                Conversation.add_message(user_id, "assistant", response)
-                logger.info(f"Added AI response to conversation history for {user_id}")
+                await conversation_repo.add_exchange(user_id, question, response)
+                logger.info(f"Added conversation to history for {user_id}")
             except Exception as e:
-                logger.error(f"Failed to save AI response to conversation history: {str(e)}")
+                logger.error(f"Failed to save conversation to history: {str(e)}")
+                # Don't abort on history save failure, continue with the request
             
             # Create embed with the response
             # Generic footer expressions for slash commands
@@ -473,12 +648,15 @@ class AIChat(commands.Cog):
                 color=0x3498db  # Blue color for AI
             )
             embed.add_field(name="You asked", value=question)
-            embed.set_footer(text=random.choice(slash_expressions))
+            footer = random.choice(slash_expressions)
+            if ai_source.endswith(CACHED_SUFFIX):
+                footer += " • ⚡ Answered from cache"
+            embed.set_footer(text=footer)
 
             # Only send followup if we successfully deferred
             if deferred:
                 try:
-                    await interaction.followup.send(embed=embed)
+                    await reply.finish(embed)
                     logger.info(f"Successfully sent AI response from {ai_source}")
                 except Exception as e:
                     logger.error(f"Error sending followup: {str(e)}")
@@ -499,7 +677,7 @@ class AIChat(commands.Cog):
             # Only send followup if we successfully deferred
             if deferred:
                 try:
-                    await interaction.followup.send(embed=embed)
+                    await self._show_error(interaction, reply, embed)
                 except Exception as e:
                     logger.error(f"Error sending timeout response: {str(e)}")
                     
@@ -520,10 +698,14 @@ class AIChat(commands.Cog):
             # Only send followup if we successfully deferred
             if deferred:
                 try:
-                    await interaction.followup.send(embed=embed)
+                    await self._show_error(interaction, reply, embed)
                 except Exception as e:
                     logger.error(f"Error sending error response: {str(e)}")
                     logger.error(f"Original error: {traceback.format_exc()}")
+        finally:
+            # Never leave a render task behind (or a "▌" cursor on the message)
+            if reply is not None:
+                await reply.close()
 
     @commands.command(name="chat")
     async def chat_prefix(self, ctx, *, message: str):
@@ -533,22 +715,22 @@ class AIChat(commands.Cog):
         
         # Show typing indicator to show the bot is working
         async with ctx.typing():
-            # Save the user's message to conversation history
+            # Process the AI request with conversation history, showing the answer as it streams in
+            reply = StreamedReply.for_context(ctx)
             try:
-                Conversation.add_message(user_id, "user", message)
-                logger.info(f"Added user message to conversation history for {user_id}")
-            except Exception as e:
-                logger.error(f"Failed to save user message to conversation history: {str(e)}")
-            
-            # Process the AI request with conversation history
-            response, ai_source = await self._process_ai_request(message, user_id, include_history=True)
+                response, ai_source = await self._process_ai_request(
+                    message, user_id, include_history=True, on_partial=reply.update
+                )
+            except Exception:
+                await self._abort_reply(reply)
+                raise
             
-            # Save the AI's response to the conversation history
+            # Save the user's message and the AI's response to the conversation history
             try:
-                Conversation.add_message(user_id, "assistant", response)
-                logger.info(f"Added AI response to conversation history for {user_id}")
+                await conversation_repo.add_exchange(user_id, message, response)
+                logger.info(f"Added conversation to history for {user_id}")
             except Exception as e:
-                logger.error(f"Failed to save AI response to conversation history: {str(e)}")
+                logger.error(f"Failed to save conversation to history: {str(e)}")
             
             # Send the response
             if response:
@@ -568,7 +750,7 @@ class AIChat(commands.Cog):
                     color=0x3498db  # Blue color for AI
                 )
                 embed.set_footer(text=random.choice(prefix_chat_expressions))
-                await ctx.send(embed=embed)
+                await reply.finish(embed)
             else:
                 # Generic error messages
                 error_messages = [
@@ -595,7 +777,7 @@ class AIChat(commands.Cog):
                     color=0x3498db  # Blue color for AI
                 )
                 embed.set_footer(text=random.choice(error_footers))
-                await ctx.send(embed=embed)
+                await reply.finish(embed)
     
     @app_commands.command(name="chat", description="Have a casual chat with the AI")
     @app_commands.describe(message="Your message to the AI")
@@ -603,6 +785,7 @@ class AIChat(commands.Cog):
         """Have a more casual conversation with the AI with memory of past conversations"""
         # Initialize deferred to False as default
         deferred = False
+        reply = None
         
         try:
             # Add a try/except block to handle the defer operation safely
@@ -619,28 +802,23 @@ class AIChat(commands.Cog):
             user_id = str(interaction.user.id)
             logger.info(f"Processing casual AI chat from {interaction.user} (ID: {user_id}): {message}")
             
-            # Save the user's message to the conversation history
-            try:
-                Conversation.add_message(user_id, "user", message)
-                logger.info(f"Added user message to conversation history for {user_id}")
-            except Exception as e:
-                logger.error(f"Failed to save user message to conversation history: {str(e)}")
-                # Don't abort on history save failure, continue with the request
-            
-            # Process the AI request with conversation history
-            response, ai_source = await self._process_ai_request(message, user_id, include_history=True)
+            # Process the AI request with conversation history, editing the deferred response as it streams in
+            reply = StreamedReply.for_interaction(interaction) if deferred else None
+            response, ai_source = await self._process_ai_request(
+                message, user_id, include_history=True, on_partial=reply.update if reply else None
+            )
 
             # If we got a valid response
             if response:
                 logger.info(f"Casual AI Response generated successfully: {response[:100]}...")  # Log first 100 chars
 
-                # Save the AI's response to the conversation history
+                # Save the user's message and the AI's response in one transaction
                 # Only do this if we have a valid response
                 try:
-                    Conversation.add_message(user_id, "assistant", response)
-                    logger.info(f"Added AI response to conversation history for {user_id}")
+                    await conversation_repo.add_exchange(user_id, message, response)
+                    logger.info(f"Added conversation to history for {user_id}")
                 except Exception as e:
-                    logger.error(f"Failed to save AI response to conversation history: {str(e)}")
+                    logger.error(f"Failed to save conversation to history: {str(e)}")
                     # Don't abort on history save failure, continue with sending the response
                 
                 # Generic footer expressions for slash chat
@@ -663,7 +841,7 @@ class AIChat(commands.Cog):
                 # Only send followup if we successfully deferred
                 if deferred:
                     try:
-                        await interaction.followup.send(embed=embed)
+                        await reply.finish(embed)
                         logger.info(f"Successfully sent casual AI response from {ai_source}")
                     except Exception as e:
                         logger.error(f"Error sending followup: {str(e)}")
@@ -692,7 +870,7 @@ class AIChat(commands.Cog):
                 # Only send followup if we successfully deferred
                 if deferred:
                     try:
-                        await interaction.followup.send(embed=embed)
+                        await reply.finish(embed)
                         logger.info("Sent fallback response due to AI processing failure")
                     except Exception as e:
                         logger.error(f"Error sending fallback response: {str(e)}")
@@ -712,7 +890,7 @@ class AIChat(commands.Cog):
             # Only send followup if we successfully deferred
             if deferred:
                 try:
-                    await interaction.followup.send(embed=embed)
+                    await self._show_error(interaction, reply, embed)
                 except Exception as e:
                     logger.error(f"Error sending timeout response: {str(e)}")
         except Exception as e:
@@ -732,10 +910,14 @@ class AIChat(commands.Cog):
             # Only send followup if we successfully deferred
             if deferred:
                 try:
-                    await interaction.followup.send(embed=embed)
+                    await self._show_error(interaction, reply, embed)
                 except Exception as e:
                     logger.error(f"Error sending error response: {str(e)}")
                     logger.error(f"Original error: {traceback.format_exc()}")
+        finally:
+            # Never leave a render task behind (or a "▌" cursor on the message)
+            if reply is not None:
+                await reply.close()
     
     @app_commands.command(name="testvertex", description="Test Vertex AI connection (Admin only)")
     @app_commands.default_permissions(administrator=True)
@@ -837,6 +1019,31 @@ class AIChat(commands.Cog):
         # Send all results
         await interaction.followup.send("\n".join(result_lines), ephemeral=True)
     
+    @app_commands.command(name="aiproviders", description="Show AI provider health and circuit breakers (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    async def ai_providers(self, interaction: discord.Interaction):
+        """Show each AI router's view of its providers (Admin only)"""
+        embed = create_embed(
+            "🩺 AI Provider Health",
+            "Latency, error rate and breaker state per provider.",
+            color=AI_COLOR
+        )
+        for router in all_routers():
+            lines = []
+            for health in router.snapshot():
+                p50 = f"{health['p50']:.2f}s" if health['p50'] is not None else "n/a"
+                line = (f"`{health['provider']}` {health['state']} - p50 {p50}, "
+                        f"{health['error_rate']:.0%} errors over {health['samples']} calls")
+                if health['degraded'] and health['state'] == "closed":
+                    line += ", deprioritised"
+                if health['retry_in']:
+                    line += f", retry in {health['retry_in']:.0f}s"
+                lines.append(line)
+            embed.add_field(name=router.name.title(), value="\n".join(lines) or "No requests yet", inline=False)
+        if not embed.fields:
+            embed.description = "No AI requests have been routed yet."
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="ai_reload", description="Reload AI preferences from file (Admin only)")
     @app_commands.default_permissions(administrator=True)
     async def ai_reload(self, interaction: discord.Interaction):
@@ -844,6 +1051,8 @@ class AIChat(commands.Cog):
         try:
             await interaction.response.defer(ephemeral=True)
             preferences = ai_preferences.reload_preferences()
+            # The system prompt may have changed under the cached answers
+            await self.response_cache.clear()
             
             # Get stats about loaded preferences
             custom_response_count = len(preferences.get('custom_responses', {}))
@@ -884,6 +1093,7 @@ class AIChat(commands.Cog):
         try:
             # Cycle to the next personality mode
             new_mode_id = ai_preferences.cycle_personality_mode()
+            await self.response_cache.clear()
             current_mode = ai_preferences.get_current_personality_mode()
             
             # Create appropriate embed based on the new mode
@@ -950,6 +1160,7 @@ class AIChat(commands.Cog):
             
             # Cycle to the next personality mode
             new_mode_id = ai_preferences.cycle_personality_mode()
+            await self.response_cache.clear()
             current_mode = ai_preferences.get_current_personality_mode()
             
             # Create appropriate embed based on the new mode
@@ -1193,7 +1404,7 @@ class AIChat(commands.Cog):
         
         try:
             # Clear the conversation history
-            Conversation.clear_history(user_id)
+            await conversation_repo.clear_history(user_id)
             
             # Send confirmation
             embed = create_embed(
@@ -1231,7 +1442,7 @@ class AIChat(commands.Cog):
             user_id = str(interaction.user.id)
             
             try:
-                Conversation.clear_history(user_id)
+                await conversation_repo.clear_history(user_id)
                 logger.info(f"Cleared conversation history for user {interaction.user} (ID: {user_id})")
                 
                 # Clear history confirmation message
@@ -1295,7 +1506,7 @@ class AIChat(commands.Cog):
         
         try:
             # Get up to 10 most recent messages
-            history = Conversation.get_history(user_id, limit=10)
+            history = await conversation_repo.get_history(user_id, limit=10)
             
             if not history:
                 await ctx.send(
@@ -1357,7 +1568,7 @@ class AIChat(commands.Cog):
             
             try:
                 # Get up to 10 most recent messages
-                history = Conversation.get_history(user_id, limit=10)
+                history = await conversation_repo.get_history(user_id, limit=10)
                 
                 if not history:
                     # No history message
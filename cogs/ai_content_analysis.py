@@ -11,6 +11,9 @@ from discord import app_commands
 from discord.ext import commands
 from utils.embed_helpers import create_embed, create_error_embed
 from utils.permissions import is_mod, is_admin, is_bot_owner
+from utils.config_store import JSONConfigStore
+from utils import http_client
+from utils.message_pipeline import get_pipeline, InspectedMessage, Verdict, PRIORITY_CONTENT_ANALYSIS
 from config import GOOGLE_API_KEY, USE_GOOGLE_AI, COLORS
 
 # Set up logging
@@ -23,6 +26,7 @@ class AIContentAnalysis(commands.Cog):
         self.bot = bot
         self.config_file = "data/ai_content_analysis_config.json"
         self.config = self.load_config()
+        self.store = JSONConfigStore(self.config_file, lambda: self.config, indent=2)
         
         # Default model is now Gemini 1.5 (latest version)
         self.gemini_model = "models/gemini-1.5-pro-latest"
@@ -76,16 +80,8 @@ class AIContentAnalysis(commands.Cog):
             return default_config
     
     def save_config(self) -> None:
-        """Save configuration to file"""
-        try:
-            # Create data directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-            logger.info("Saved AI content analysis config")
-        except Exception as e:
-            logger.error(f"Error saving AI content analysis config: {str(e)}")
+        """Schedule a (debounced, atomic) save of the configuration"""
+        self.store.save()
     
     def is_feature_enabled(self, feature_name: str, guild_id: str) -> bool:
         """Check if a feature is enabled for a guild"""
@@ -154,40 +150,40 @@ class AIContentAnalysis(commands.Cog):
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status != 200:
-                        logger.error(f"Gemini API error: {response.status}")
-                        error_body = await response.text()
-                        logger.error(f"Error details: {error_body[:200]}")
-                        return True, "Error analyzing image", 0.0
+            session = http_client.get_session("gemini")
+            async with session.post(url, json=payload) as response:
+                if response.status != 200:
+                    logger.error(f"Gemini API error: {response.status}")
+                    error_body = await response.text()
+                    logger.error(f"Error details: {error_body[:200]}")
+                    return True, "Error analyzing image", 0.0
                     
-                    data = await response.json()
-                    try:
-                        # Extract the text response
-                        text_parts = data["candidates"][0]["content"]["parts"]
-                        response_text = " ".join([part["text"] for part in text_parts if "text" in part])
+                data = await response.json()
+                try:
+                    # Extract the text response
+                    text_parts = data["candidates"][0]["content"]["parts"]
+                    response_text = " ".join([part["text"] for part in text_parts if "text" in part])
                         
-                        # Extract JSON from the response
-                        json_start = response_text.find('{')
-                        json_end = response_text.rfind('}') + 1
-                        if json_start != -1 and json_end != -1:
-                            json_str = response_text[json_start:json_end]
-                            result = json.loads(json_str)
+                    # Extract JSON from the response
+                    json_start = response_text.find('{')
+                    json_end = response_text.rfind('}') + 1
+                    if json_start != -1 and json_end != -1:
+                        json_str = response_text[json_start:json_end]
+                        result = json.loads(json_str)
                             
-                            # Extract the values
-                            is_appropriate = result.get("is_appropriate", True)
-                            reason = result.get("reason", "Unknown")
-                            confidence = float(result.get("confidence", 0.5))
+                        # Extract the values
+                        is_appropriate = result.get("is_appropriate", True)
+                        reason = result.get("reason", "Unknown")
+                        confidence = float(result.get("confidence", 0.5))
                             
-                            return is_appropriate, reason, confidence
-                        else:
-                            logger.warning(f"Could not find JSON in response: {response_text[:100]}")
-                            return True, "Error parsing response", 0.0
-                    except Exception as e:
-                        logger.error(f"Error processing Gemini response: {str(e)}")
-                        logger.error(f"Response data: {str(data)[:200]}")
-                        return True, "Error processing response", 0.0
+                        return is_appropriate, reason, confidence
+                    else:
+                        logger.warning(f"Could not find JSON in response: {response_text[:100]}")
+                        return True, "Error parsing response", 0.0
+                except Exception as e:
+                    logger.error(f"Error processing Gemini response: {str(e)}")
+                    logger.error(f"Response data: {str(data)[:200]}")
+                    return True, "Error processing response", 0.0
         except Exception as e:
             logger.error(f"Error in Gemini image analysis: {str(e)}")
             return True, f"Error: {str(e)}", 0.0
@@ -203,95 +199,95 @@ class AIContentAnalysis(commands.Cog):
         
         try:
             # First, fetch the content of the link
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.get(url, timeout=10) as response:
-                        if response.status != 200:
-                            return f"Error fetching link content (status {response.status})", False
+            session = http_client.get_session("web")
+            try:
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        return f"Error fetching link content (status {response.status})", False
                         
-                        content_type = response.headers.get("Content-Type", "")
+                    content_type = response.headers.get("Content-Type", "")
                         
-                        # Check if it's HTML content
-                        if "text/html" in content_type:
-                            html_content = await response.text()
-                            # Extract title and description
-                            title_match = re.search(r"<title>(.*?)</title>", html_content, re.IGNORECASE | re.DOTALL)
-                            title = title_match.group(1) if title_match else "No title"
+                    # Check if it's HTML content
+                    if "text/html" in content_type:
+                        html_content = await response.text()
+                        # Extract title and description
+                        title_match = re.search(r"<title>(.*?)</title>", html_content, re.IGNORECASE | re.DOTALL)
+                        title = title_match.group(1) if title_match else "No title"
                             
-                            # Get meta description
-                            desc_match = re.search(r'<meta\s+name=["\'](description|og:description)["\']' + r'\s+content=["\'](.*?)["\']', html_content, re.IGNORECASE)
-                            description = desc_match.group(2) if desc_match else "No description"
+                        # Get meta description
+                        desc_match = re.search(r'<meta\s+name=["\'](description|og:description)["\']' + r'\s+content=["\'](.*?)["\']', html_content, re.IGNORECASE)
+                        description = desc_match.group(2) if desc_match else "No description"
                             
-                            # Call Gemini API to analyze the content
-                            api_url = f"https://generativelanguage.googleapis.com/{self.gemini_api_version}/{self.gemini_model}:generateContent?key={GOOGLE_API_KEY}"
+                        # Call Gemini API to analyze the content
+                        api_url = f"https://generativelanguage.googleapis.com/{self.gemini_api_version}/{self.gemini_model}:generateContent?key={GOOGLE_API_KEY}"
                             
-                            system_prompt = """
-                            You are a helpful AI that summarizes web content. 
-                            Provide a brief summary of the webpage based on the title and description.
-                            Also analyze if the content appears safe and legitimate or potentially harmful, 
-                            checking for signs of phishing, scams, malware, or adult content.
+                        system_prompt = """
+                        You are a helpful AI that summarizes web content. 
+                        Provide a brief summary of the webpage based on the title and description.
+                        Also analyze if the content appears safe and legitimate or potentially harmful, 
+                        checking for signs of phishing, scams, malware, or adult content.
                             
-                            Respond with ONLY a JSON object in this exact format:
-                            {
-                                "summary": "brief 1-2 sentence summary of the webpage content",
-                                "is_safe": true/false,
-                                "warning": "brief explanation if unsafe, empty string if safe"
-                            }
-                            """
+                        Respond with ONLY a JSON object in this exact format:
+                        {
+                            "summary": "brief 1-2 sentence summary of the webpage content",
+                            "is_safe": true/false,
+                            "warning": "brief explanation if unsafe, empty string if safe"
+                        }
+                        """
                             
-                            payload = {
-                                "contents": [{
-                                    "role": "user",
-                                    "parts": [{
-                                        "text": f"{system_prompt}\n\nTitle: {title}\nDescription: {description}\nURL: {url}"
-                                    }]
-                                }],
-                                "generationConfig": {
-                                    "temperature": 0.0,
-                                    "topP": 1.0,
-                                    "topK": 1,
-                                    "maxOutputTokens": 200
-                                }
+                        payload = {
+                            "contents": [{
+                                "role": "user",
+                                "parts": [{
+                                    "text": f"{system_prompt}\n\nTitle: {title}\nDescription: {description}\nURL: {url}"
+                                }]
+                            }],
+                            "generationConfig": {
+                                "temperature": 0.0,
+                                "topP": 1.0,
+                                "topK": 1,
+                                "maxOutputTokens": 200
                             }
+                        }
                             
-                            async with session.post(api_url, json=payload) as api_response:
-                                if api_response.status != 200:
-                                    return f"Error analyzing link (status {api_response.status})", False
+                        async with http_client.get_session("gemini").post(api_url, json=payload) as api_response:
+                            if api_response.status != 200:
+                                return f"Error analyzing link (status {api_response.status})", False
                                 
-                                data = await api_response.json()
-                                try:
-                                    # Extract the text response
-                                    text_parts = data["candidates"][0]["content"]["parts"]
-                                    response_text = " ".join([part["text"] for part in text_parts if "text" in part])
+                            data = await api_response.json()
+                            try:
+                                # Extract the text response
+                                text_parts = data["candidates"][0]["content"]["parts"]
+                                response_text = " ".join([part["text"] for part in text_parts if "text" in part])
                                     
-                                    # Extract JSON from the response
-                                    json_start = response_text.find('{')
-                                    json_end = response_text.rfind('}') + 1
-                                    if json_start != -1 and json_end != -1:
-                                        json_str = response_text[json_start:json_end]
-                                        result = json.loads(json_str)
+                                # Extract JSON from the response
+                                json_start = response_text.find('{')
+                                json_end = response_text.rfind('}') + 1
+                                if json_start != -1 and json_end != -1:
+                                    json_str = response_text[json_start:json_end]
+                                    result = json.loads(json_str)
                                         
-                                        # Extract the values
-                                        summary = result.get("summary", "No summary available")
-                                        is_safe = result.get("is_safe", True)
-                                        warning = result.get("warning", "")
+                                    # Extract the values
+                                    summary = result.get("summary", "No summary available")
+                                    is_safe = result.get("is_safe", True)
+                                    warning = result.get("warning", "")
                                         
-                                        if not is_safe and warning:
-                                            return f"{summary}\n\n⚠️ **Warning**: {warning}", is_safe
-                                        else:
-                                            return summary, is_safe
+                                    if not is_safe and warning:
+                                        return f"{summary}\n\n⚠️ **Warning**: {warning}", is_safe
                                     else:
-                                        return "Error parsing AI response", True
-                                except Exception as e:
-                                    logger.error(f"Error processing link analysis: {str(e)}")
-                                    return f"Error processing AI response: {str(e)}", True
-                        else:
-                            # Non-HTML content
-                            return f"Link contains non-HTML content: {content_type}", True
-                except aiohttp.ClientError as e:
-                    return f"Error connecting to the website: {str(e)}", False
-                except asyncio.TimeoutError:
-                    return "Website took too long to respond", False
+                                        return summary, is_safe
+                                else:
+                                    return "Error parsing AI response", True
+                            except Exception as e:
+                                logger.error(f"Error processing link analysis: {str(e)}")
+                                return f"Error processing AI response: {str(e)}", True
+                    else:
+                        # Non-HTML content
+                        return f"Link contains non-HTML content: {content_type}", True
+            except aiohttp.ClientError as e:
+                return f"Error connecting to the website: {str(e)}", False
+            except asyncio.TimeoutError:
+                return "Website took too long to respond", False
         except Exception as e:
             logger.error(f"Error in link analysis: {str(e)}")
             return f"Error analyzing link: {str(e)}", False
@@ -652,84 +648,85 @@ class AIContentAnalysis(commands.Cog):
         
         await interaction.followup.send(embed=embed, ephemeral=True)
     
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Monitor messages for images and links"""
-        # Ignore messages from bots, including our own
-        if message.author.bot:
-            return
-            
-        # Ignore DMs
-        if not message.guild:
-            return
-        
-        guild_id = str(message.guild.id)
+    async def cog_load(self):
+        """Register image and link analysis with the shared message pipeline"""
+        get_pipeline(self.bot).register("ai_content_analysis", self.inspect_message, PRIORITY_CONTENT_ANALYSIS)
+        http_client.acquire()
+
+    async def cog_unload(self):
+        """Remove image and link analysis from the shared message pipeline"""
+        get_pipeline(self.bot).unregister("ai_content_analysis")
+        await self.store.close()
+        await http_client.release()
+
+    async def inspect_message(self, inspected: InspectedMessage):
+        """Monitor messages for images and links (message pipeline stage)"""
+        message = inspected.message
+        guild_id = inspected.guild_id
         
         # Check for images if image moderation is enabled
-        if self.is_feature_enabled("image_moderation", guild_id) and len(message.attachments) > 0:
-            for attachment in message.attachments:
-                # Check if it's an image
-                if attachment.content_type and attachment.content_type.startswith("image/"):
-                    # Analyze the image
-                    is_appropriate, reason, confidence = await self.analyze_image(attachment.url)
-                    
-                    # If not appropriate with high confidence, delete it
-                    threshold = self.config["image_moderation"]["threshold"]
-                    if not is_appropriate and confidence >= threshold:
+        if inspected.image_attachments and self.is_feature_enabled("image_moderation", guild_id):
+            for attachment in inspected.image_attachments:
+                # Analyze the image
+                is_appropriate, reason, confidence = await self.analyze_image(attachment.url)
+                
+                # If not appropriate with high confidence, delete it
+                threshold = self.config["image_moderation"]["threshold"]
+                if not is_appropriate and confidence >= threshold:
+                    try:
+                        # Delete the message
+                        await inspected.delete()
+                        logger.info(f"Deleted inappropriate image from {message.author.name} (confidence: {confidence:.2f})")
+                        
+                        # Send a warning to the user
+                        warning_embed = create_error_embed(
+                            "Image Removed", 
+                            f"Your message was removed for containing inappropriate imagery."
+                        )
+                        
                         try:
-                            # Delete the message
-                            await message.delete()
-                            logger.info(f"Deleted inappropriate image from {message.author.name} (confidence: {confidence:.2f})")
-                            
-                            # Send a warning to the user
-                            warning_embed = create_error_embed(
-                                "Image Removed", 
-                                f"Your message was removed for containing inappropriate imagery."
-                            )
-                            
-                            try:
-                                await message.author.send(embed=warning_embed)
-                            except discord.Forbidden:
-                                # Cannot DM the user
-                                pass
-                            
-                            # Log to mod channel if available
-                            try:
-                                log_channel = discord.utils.get(message.guild.text_channels, name="mod-logs")
-                                if not log_channel:
-                                    log_channel = discord.utils.get(message.guild.text_channels, name="logs")
-                                    
-                                if log_channel:
-                                    log_embed = discord.Embed(
-                                        title="AI Moderation: Inappropriate Image Removed",
-                                        description=f"An image from {message.author.mention} was removed.",
-                                        color=COLORS["ERROR"]
-                                    )
-                                    log_embed.add_field(name="User", value=f"{message.author.name} ({message.author.id})", inline=True)
-                                    log_embed.add_field(name="Channel", value=f"{message.channel.name}", inline=True)
-                                    log_embed.add_field(name="Confidence", value=f"{confidence:.2f}", inline=True)
-                                    log_embed.add_field(name="Reason", value=reason, inline=False)
-                                    log_embed.add_field(name="Image URL", value=attachment.url, inline=False)
-                                    log_embed.set_footer(text=f"Timestamp: {datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
-                                    
-                                    await log_channel.send(embed=log_embed)
-                            except Exception as e:
-                                logger.error(f"Error sending to mod log channel: {str(e)}")
-                            
-                            # Break after deleting the message, no need to check other attachments
-                            break
+                            await message.author.send(embed=warning_embed)
                         except discord.Forbidden:
-                            logger.warning(f"No permission to delete inappropriate image from {message.author.name}")
+                            # Cannot DM the user
+                            pass
+                        
+                        # Log to mod channel if available
+                        try:
+                            log_channel = discord.utils.get(message.guild.text_channels, name="mod-logs")
+                            if not log_channel:
+                                log_channel = discord.utils.get(message.guild.text_channels, name="logs")
+                                
+                            if log_channel:
+                                log_embed = discord.Embed(
+                                    title="AI Moderation: Inappropriate Image Removed",
+                                    description=f"An image from {message.author.mention} was removed.",
+                                    color=COLORS["ERROR"]
+                                )
+                                log_embed.add_field(name="User", value=f"{message.author.name} ({message.author.id})", inline=True)
+                                log_embed.add_field(name="Channel", value=f"{message.channel.name}", inline=True)
+                                log_embed.add_field(name="Confidence", value=f"{confidence:.2f}", inline=True)
+                                log_embed.add_field(name="Reason", value=reason, inline=False)
+                                log_embed.add_field(name="Image URL", value=attachment.url, inline=False)
+                                log_embed.set_footer(text=f"Timestamp: {datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
+                                
+                                await log_channel.send(embed=log_embed)
                         except Exception as e:
-                            logger.error(f"Error processing inappropriate image: {str(e)}")
+                            logger.error(f"Error sending to mod log channel: {str(e)}")
+                        
+                        # Break after deleting the message, no need to check other attachments
+                        break
+                    except discord.Forbidden:
+                        logger.warning(f"No permission to delete inappropriate image from {message.author.name}")
+                    except Exception as e:
+                        logger.error(f"Error processing inappropriate image: {str(e)}")
+        
+        # Nothing left to analyze once the message is gone
+        if inspected.deleted:
+            return Verdict.STOP
         
         # Check for links if link analysis is enabled
-        if self.is_feature_enabled("link_analysis", guild_id):
-            # Extract URLs from the message
-            url_pattern = r'https?://\S+'
-            urls = re.findall(url_pattern, message.content)
-            
-            for url in urls:
+        if inspected.urls and self.is_feature_enabled("link_analysis", guild_id):
+            for url in inspected.urls:
                 # Skip if domain is already whitelisted
                 if self.is_domain_safe(url):
                     continue
@@ -743,7 +740,7 @@ class AIContentAnalysis(commands.Cog):
                     if is_blocked:
                         try:
                             # Delete the message
-                            await message.delete()
+                            await inspected.delete()
                             logger.info(f"Deleted message with blocked domain from {message.author.name}")
                             
                             # Send a warning to the user
@@ -773,7 +770,7 @@ class AIContentAnalysis(commands.Cog):
                 if not is_safe:
                     try:
                         # Delete the message
-                        await message.delete()
+                        await inspected.delete()
                         logger.info(f"Deleted message with unsafe link from {message.author.name}")
                         
                         # Send a warning to the user
@@ -824,6 +821,8 @@ class AIContentAnalysis(commands.Cog):
                         
                         # Log the safe domain
                         logger.info(f"Link to {domain} analyzed and deemed safe")
+        
+        return Verdict.STOP if inspected.deleted else Verdict.CONTINUE
 
 async def setup(bot):
     """Add the AI Content Analysis cog to the bot"""
@@ -1,7 +1,6 @@
 import discord
 import logging
 import json
-import aiohttp
 import os
 import re
 import asyncio
@@ -12,6 +11,9 @@ from discord import app_commands
 from discord.ext import commands
 from utils.embed_helpers import create_embed, create_error_embed
 from utils.permissions import is_mod, is_admin, is_bot_owner
+from utils.config_store import JSONConfigStore
+from utils import http_client
+from utils.message_pipeline import get_pipeline, InspectedMessage, Verdict, PRIORITY_CONVERSATION
 from config import GOOGLE_API_KEY, USE_GOOGLE_AI, COLORS, AIML_API_KEY, USE_AIML_API
 
 # Import AIML API client
@@ -31,6 +33,7 @@ class AIConversation(commands.Cog):
         self.bot = bot
         self.config_file = "data/ai_conversation_config.json"
         self.config = self.load_config()
+        self.store = JSONConfigStore(self.config_file, lambda: self.config, indent=2)
         
         # Default model is now Gemini 1.5 (latest version)
         self.gemini_model = "models/gemini-1.5-pro-latest"
@@ -119,16 +122,8 @@ class AIConversation(commands.Cog):
             return default_config
     
     def save_config(self) -> None:
-        """Save configuration to file"""
-        try:
-            # Create data directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-            logger.info("Saved AI conversation config")
-        except Exception as e:
-            logger.error(f"Error saving AI conversation config: {str(e)}")
+        """Schedule a (debounced, atomic) save of the configuration"""
+        self.store.save()
     
     async def generate_summary(self, messages: List[Dict]) -> str:
         """Generate a summary of conversation messages using AI"""
@@ -208,24 +203,24 @@ class AIConversation(commands.Cog):
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status != 200:
-                        logger.error(f"Gemini API error: {response.status}")
-                        error_body = await response.text()
-                        logger.error(f"Error details: {error_body[:200]}")
-                        return "Error generating summary. Please try again later."
+            session = http_client.get_session("gemini")
+            async with session.post(url, json=payload) as response:
+                if response.status != 200:
+                    logger.error(f"Gemini API error: {response.status}")
+                    error_body = await response.text()
+                    logger.error(f"Error details: {error_body[:200]}")
+                    return "Error generating summary. Please try again later."
                     
-                    data = await response.json()
-                    try:
-                        # Extract the text response
-                        text_parts = data["candidates"][0]["content"]["parts"]
-                        summary_text = " ".join([part["text"] for part in text_parts if "text" in part])
-                        return summary_text
-                    except Exception as e:
-                        logger.error(f"Error processing Gemini response: {str(e)}")
-                        logger.error(f"Response data: {str(data)[:200]}")
-                        return "Error processing summary. Please try again later."
+                data = await response.json()
+                try:
+                    # Extract the text response
+                    text_parts = data["candidates"][0]["content"]["parts"]
+                    summary_text = " ".join([part["text"] for part in text_parts if "text" in part])
+                    return summary_text
+                except Exception as e:
+                    logger.error(f"Error processing Gemini response: {str(e)}")
+                    logger.error(f"Response data: {str(data)[:200]}")
+                    return "Error processing summary. Please try again later."
         except Exception as e:
             logger.error(f"Error in Gemini summarization: {str(e)}")
             return "Error generating summary. Please try again later."
@@ -579,22 +574,25 @@ class AIConversation(commands.Cog):
         
         return None
     
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Process messages for conversation analysis and smart responses"""
-        # Ignore messages from bots, including our own
-        if message.author.bot:
-            return
-            
-        # Ignore DMs
-        if not message.guild:
-            return
-        
-        channel_id = str(message.channel.id)
+    async def cog_load(self):
+        """Register conversation features with the shared message pipeline"""
+        get_pipeline(self.bot).register("ai_conversation", self.inspect_message, PRIORITY_CONVERSATION)
+        http_client.acquire()
+
+    async def cog_unload(self):
+        """Remove conversation features from the shared message pipeline"""
+        get_pipeline(self.bot).unregister("ai_conversation")
+        await self.store.close()
+        await http_client.release()
+
+    async def inspect_message(self, inspected: InspectedMessage):
+        """Process messages for conversation analysis and smart responses (message pipeline stage)"""
+        message = inspected.message
+        channel_id = inspected.channel_id
         
         # Check for smart responses
         if channel_id in self.config["smart_responses"]["enabled_channels"]:
-            smart_response = self.get_smart_response(message.content)
+            smart_response = self.get_smart_response(inspected.text)
             if smart_response:
                 # Send the smart response
                 await message.channel.send(
@@ -636,6 +634,8 @@ class AIConversation(commands.Cog):
                 
                 # Clear history after sending summary
                 self.channel_histories[channel_id] = []
+        
+        return Verdict.CONTINUE
 
 async def setup(bot):
     """Add the AI Conversation cog to the bot"""
@@ -1,15 +1,22 @@
 import discord
 import logging
 import json
-import aiohttp
 import os
 import re
+import time
+import asyncio
 import datetime
 from typing import Dict, List, Tuple, Optional, Literal
 from discord import app_commands
 from discord.ext import commands
 from utils.embed_helpers import create_embed, create_error_embed
 from utils.permissions import is_mod, is_admin, is_bot_owner, PermissionChecks
+from utils.config_store import JSONConfigStore
+from utils import http_client
+from utils.provider_router import get_router
+from utils.response_cache import ResponseCache, make_key, normalize_text
+from utils.message_pipeline import get_pipeline, InspectedMessage, Verdict, PRIORITY_AI_MODERATION
+from utils.sliding_window import WindowStore
 from config import GOOGLE_API_KEY, USE_GOOGLE_AI, USE_VERTEX_AI, GOOGLE_CLOUD_PROJECT, VERTEX_LOCATION, COLORS
 
 # Import Vertex AI clients if available
@@ -29,6 +36,18 @@ except ImportError:
 # Set up logging
 logger = logging.getLogger('discord')
 
+# Spam detection looks at each user's last few messages within this window
+SPAM_HISTORY_SIZE = 10
+SPAM_HISTORY_SECONDS = 600
+
+# Keys that used to be persisted in the config and are now kept in memory only
+EPHEMERAL_CONFIG_KEYS = ("message_history", "join_history")
+
+# Toxicity verdicts by normalized content, shared by every guild
+TOXICITY_CACHE_SIZE = int(os.environ.get("TOXICITY_CACHE_SIZE", "10000"))
+TOXICITY_CACHE_TTL = int(os.environ.get("TOXICITY_CACHE_TTL", "3600"))
+verdict_cache = ResponseCache("toxicity_verdicts", TOXICITY_CACHE_SIZE, TOXICITY_CACHE_TTL)
+
 class AIModeration(commands.Cog):
     """AI-powered content moderation and analysis"""
     
@@ -36,6 +55,16 @@ class AIModeration(commands.Cog):
         self.bot = bot
         self.config_file = "data/ai_moderation_config.json"
         self.config = self.load_config()
+        self.store = JSONConfigStore(self.config_file, lambda: self.config, indent=2)
+        
+        # In-memory sliding windows for spam and raid detection (never saved)
+        self.message_windows = WindowStore(SPAM_HISTORY_SECONDS, maxlen=SPAM_HISTORY_SIZE)
+        raid_timeframe = self.config.get("raid_detection", {}).get("timeframe_seconds", 60)
+        self.join_windows = WindowStore(raid_timeframe)
+        
+        # Analyses in flight by cache key, so duplicates arriving together share one provider call
+        self._pending_verdicts: Dict[str, asyncio.Future] = {}
+        self.coalesced_verdicts = 0
         
         # Default model is now Gemini 1.5 (latest version)
         self.gemini_model = "models/gemini-1.5-pro-latest"
@@ -113,7 +142,6 @@ class AIModeration(commands.Cog):
                 "smart_responses": False,
                 "image_moderation": False
             },
-            "message_history": {},
             "raid_detection": {
                 "join_threshold": 5,  # Number of joins in timeframe to trigger alert
                 "timeframe_seconds": 60,  # Timeframe for join rate monitoring
@@ -135,6 +163,10 @@ class AIModeration(commands.Cog):
                         if key not in config:
                             config[key] = value
                     
+                    # Drop history written by older versions
+                    for key in EPHEMERAL_CONFIG_KEYS:
+                        config.pop(key, None)
+                    
                     return config
             else:
                 logger.info("No AI moderation config found, creating default")
@@ -144,16 +176,8 @@ class AIModeration(commands.Cog):
             return default_config
     
     def save_config(self) -> None:
-        """Save configuration to file"""
-        try:
-            # Create data directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-            logger.info("Saved AI moderation config")
-        except Exception as e:
-            logger.error(f"Error saving AI moderation config: {str(e)}")
+        """Schedule a (debounced, atomic) save of the configuration"""
+        self.store.save()
     
     def is_feature_enabled(self, feature: str, guild_id: str) -> bool:
         """Check if a feature is enabled for a guild"""
@@ -180,45 +204,53 @@ class AIModeration(commands.Cog):
         """
         if not content or len(content.strip()) == 0:
             return 0.0, "none"
-            
-        # Try using Vertex AI SDK as primary option if available
+        
+        # Repeated content (copy-paste spam, emotes) reuses the verdict it already got
+        key = make_key(normalize_text(content))
+        cached = verdict_cache.get(key)
+        if cached:
+            return cached[0], cached[1]
+        pending = self._pending_verdicts.get(key)
+        if pending:
+            verdict = await asyncio.shield(pending)
+            if verdict:
+                self.coalesced_verdicts += 1
+                return verdict
+            return await self._analyze_toxicity_uncached(content, key)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending_verdicts[key] = future
+        try:
+            verdict = await self._analyze_toxicity_uncached(content, key)
+            future.set_result(verdict)
+            return verdict
+        finally:
+            # Waiters left behind by a failed analysis do their own
+            if not future.done():
+                future.set_result(None)
+            self._pending_verdicts.pop(key, None)
+    
+    async def _analyze_toxicity_uncached(self, content: str, key: str) -> Tuple[float, str]:
+        """Analyze content with the AI providers, caching their verdict"""
+        # Ask the healthiest configured provider; a clean verdict (0.0) is an answer too
+        candidates = []
         if self.vertex_client and self.vertex_client.initialized:
-            try:
-                logger.info("Using Vertex AI SDK as primary for toxicity analysis")
-                result = await self._analyze_with_vertex_ai(content)
-                if result and result[0] > 0:
-                    return result
-            except Exception as e:
-                logger.error(f"Error using Vertex AI SDK for toxicity analysis: {str(e)}")
-                # Continue to next fallback
-                
-        # Try using Vertex REST API as first fallback if available
+            candidates.append(("vertex", lambda claim: self._analyze_with_vertex_ai(content)))
         if self.vertex_rest_client and self.vertex_rest_client.initialized:
-            try:
-                logger.info("Using Vertex REST API for toxicity analysis")
-                result = await self._analyze_with_vertex_rest(content)
-                if result and result[0] > 0:
-                    return result
-            except Exception as e:
-                logger.error(f"Error using Vertex REST API for toxicity analysis: {str(e)}")
-                # Continue to next fallback
-        
-        # Use Google Gemini AI as second fallback if available
+            candidates.append(("vertex_rest", lambda claim: self._analyze_with_vertex_rest(content)))
         if USE_GOOGLE_AI and GOOGLE_API_KEY:
-            try:
-                logger.info("Using Google Gemini as fallback for toxicity analysis")
-                result = await self._analyze_with_gemini(content)
-                if result and result[0] > 0:
-                    return result
-            except Exception as e:
-                logger.error(f"Error using Gemini for toxicity analysis: {str(e)}")
-                # Continue to next fallback
+            candidates.append(("gemini", lambda claim: self._analyze_with_gemini(content)))
+        result = await get_router("moderation").run(candidates)
+        if result:
+            provider, (toxicity_score, category) = result
+            verdict_cache.put(key, (toxicity_score, category, provider, time.time()))
+            return toxicity_score, category
         
         # Fallback to basic analysis as last resort
         logger.info("Using basic pattern analysis as last resort for toxicity analysis")
         return self._basic_toxicity_analysis(content)
     
-    async def _analyze_with_gemini(self, content: str) -> Tuple[float, str]:
+    async def _analyze_with_gemini(self, content: str) -> Optional[Tuple[float, str]]:
         """Use Google's Gemini API to analyze content toxicity"""
         try:
             url = f"https://generativelanguage.googleapis.com/{self.gemini_api_version}/{self.gemini_model}:generateContent?key={GOOGLE_API_KEY}"
@@ -253,44 +285,44 @@ class AIModeration(commands.Cog):
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status != 200:
-                        logger.error(f"Gemini API error: {response.status}")
-                        error_body = await response.text()
-                        logger.error(f"Error details: {error_body[:200]}")
-                        return 0.0, "none"
+            session = http_client.get_session("gemini")
+            async with session.post(url, json=payload) as response:
+                if response.status != 200:
+                    logger.error(f"Gemini API error: {response.status}")
+                    error_body = await response.text()
+                    logger.error(f"Error details: {error_body[:200]}")
+                    return None
                     
-                    data = await response.json()
-                    try:
-                        # Extract the text response
-                        text_parts = data["candidates"][0]["content"]["parts"]
-                        response_text = " ".join([part["text"] for part in text_parts if "text" in part])
+                data = await response.json()
+                try:
+                    # Extract the text response
+                    text_parts = data["candidates"][0]["content"]["parts"]
+                    response_text = " ".join([part["text"] for part in text_parts if "text" in part])
                         
-                        # Extract JSON from the response
-                        json_start = response_text.find('{')
-                        json_end = response_text.rfind('}') + 1
-                        if json_start != -1 and json_end != -1:
-                            json_str = response_text[json_start:json_end]
-                            result = json.loads(json_str)
+                    # Extract JSON from the response
+                    json_start = response_text.find('{')
+                    json_end = response_text.rfind('}') + 1
+                    if json_start != -1 and json_end != -1:
+                        json_str = response_text[json_start:json_end]
+                        result = json.loads(json_str)
                             
-                            # Extract the values
-                            toxicity_score = float(result.get("toxicity_score", 0.0))
-                            category = result.get("category", "none")
+                        # Extract the values
+                        toxicity_score = float(result.get("toxicity_score", 0.0))
+                        category = result.get("category", "none")
                             
-                            return toxicity_score, category
-                        else:
-                            logger.warning(f"Could not find JSON in response: {response_text[:100]}")
-                            return 0.0, "none"
-                    except Exception as e:
-                        logger.error(f"Error processing Gemini response: {str(e)}")
-                        logger.error(f"Response data: {str(data)[:200]}")
-                        return 0.0, "none"
+                        return toxicity_score, category
+                    else:
+                        logger.warning(f"Could not find JSON in response: {response_text[:100]}")
+                        return None
+                except Exception as e:
+                    logger.error(f"Error processing Gemini response: {str(e)}")
+                    logger.error(f"Response data: {str(data)[:200]}")
+                    return None
         except Exception as e:
             logger.error(f"Error in Gemini toxicity analysis: {str(e)}")
-            return 0.0, "none"
+            return None
     
-    async def _analyze_with_vertex_ai(self, content: str) -> Tuple[float, str]:
+    async def _analyze_with_vertex_ai(self, content: str) -> Optional[Tuple[float, str]]:
         """Use Vertex AI SDK to analyze content toxicity"""
         try:
             # Create the prompt specifically for content moderation
@@ -320,7 +352,7 @@ class AIModeration(commands.Cog):
             
             if not response:
                 logger.warning("No response from Vertex AI")
-                return 0.0, "none"
+                return None
                 
             # Extract JSON from the response
             json_start = response.find('{')
@@ -337,13 +369,13 @@ class AIModeration(commands.Cog):
                 return toxicity_score, category
             else:
                 logger.warning(f"Could not find JSON in Vertex AI response: {response[:100]}")
-                return 0.0, "none"
+                return None
                 
         except Exception as e:
             logger.error(f"Error in Vertex AI toxicity analysis: {str(e)}")
-            return 0.0, "none"
+            return None
     
-    async def _analyze_with_vertex_rest(self, content: str) -> Tuple[float, str]:
+    async def _analyze_with_vertex_rest(self, content: str) -> Optional[Tuple[float, str]]:
         """Use Vertex AI REST API to analyze content toxicity"""
         try:
             # Create the prompt specifically for content moderation
@@ -372,7 +404,7 @@ class AIModeration(commands.Cog):
             
             if not response:
                 logger.warning("No response from Vertex AI REST API")
-                return 0.0, "none"
+                return None
                 
             # Extract JSON from the response
             json_start = response.find('{')
@@ -389,11 +421,11 @@ class AIModeration(commands.Cog):
                 return toxicity_score, category
             else:
                 logger.warning(f"Could not find JSON in Vertex AI REST response: {response[:100]}")
-                return 0.0, "none"
+                return None
                 
         except Exception as e:
             logger.error(f"Error in Vertex AI REST toxicity analysis: {str(e)}")
-            return 0.0, "none"
+            return None
     
     def _basic_toxicity_analysis(self, content: str) -> Tuple[float, str]:
         """Basic fallback toxicity analysis using regex patterns"""
@@ -429,13 +461,16 @@ class AIModeration(commands.Cog):
         
         return toxicity_score, category
     
-    async def detect_spam(self, message: discord.Message) -> Tuple[bool, float]:
+    async def detect_spam(self, inspected: InspectedMessage) -> Tuple[bool, float]:
         """
         Detect if a message is likely spam
+        Uses the URLs and mention counts the pipeline already extracted.
         Returns a tuple of (is_spam, confidence)
         """
+        content = inspected.content
+        
         # Skip short messages
-        if len(message.content) < 10:
+        if len(content) < 10:
             return False, 0.0
         
         # Check for common spam indicators
@@ -443,60 +478,41 @@ class AIModeration(commands.Cog):
         confidence = 0.0
         
         # 1. Excessive caps
-        caps_ratio = sum(1 for c in message.content if c.isupper()) / len(message.content)
-        if caps_ratio > 0.7 and len(message.content) > 10:
+        caps_ratio = sum(1 for c in content if c.isupper()) / len(content)
+        if caps_ratio > 0.7 and len(content) > 10:
             indicators += 1
         
         # 2. Repeated characters
         repeated_chars_pattern = r'(.)\1{5,}'
-        if re.search(repeated_chars_pattern, message.content):
+        if re.search(repeated_chars_pattern, content):
             indicators += 1
         
         # 3. Message repetition (check user's recent messages)
-        guild_id = str(message.guild.id)
-        user_id = str(message.author.id)
+        user_id = str(inspected.message.author.id)
         
-        if "message_history" not in self.config:
-            self.config["message_history"] = {}
-            
-        if guild_id not in self.config["message_history"]:
-            self.config["message_history"][guild_id] = {}
-            
-        if user_id not in self.config["message_history"][guild_id]:
-            self.config["message_history"][guild_id][user_id] = []
-        
-        # Add current message to history
-        self.config["message_history"][guild_id][user_id].append({
-            "content": message.content,
-            "timestamp": datetime.datetime.utcnow().isoformat()
-        })
-        
-        # Keep only recent messages (last 10)
-        self.config["message_history"][guild_id][user_id] = self.config["message_history"][guild_id][user_id][-10:]
+        # Add current message to the user's window (content hash only)
+        window = self.message_windows.add((inspected.guild_id, user_id), hash(content))
         
         # Check for repeated messages
-        recent_messages = self.config["message_history"][guild_id][user_id]
-        if len(recent_messages) >= 3:
+        if len(window.entries) >= 3:
             # Check if the last 3 messages are identical
-            if len(set(msg["content"] for msg in recent_messages[-3:])) == 1:
+            if len(set(window.tail(3))) == 1:
                 indicators += 2  # Strong indicator
         
         # 4. Multiple mentions
-        if len(message.mentions) > 5:
+        if inspected.mention_count > 5:
             indicators += 1
         
         # 5. Multiple role mentions
-        if len(message.role_mentions) > 3:
+        if inspected.role_mention_count > 3:
             indicators += 1
         
         # 6. Everyone/here mention
-        if message.mention_everyone:
+        if inspected.mention_everyone:
             indicators += 1
         
         # 7. Multiple links
-        url_pattern = r'https?://\S+'
-        urls = re.findall(url_pattern, message.content)
-        if len(urls) > 2:
+        if len(inspected.urls) > 2:
             indicators += 1
         
         # Calculate confidence based on indicators
@@ -668,16 +684,18 @@ class AIModeration(commands.Cog):
         # Spam detection (simple analysis for the command)
         # Create a fake message object for spam detection
         class FakeMessage:
-            def __init__(self, content, author, guild):
+            def __init__(self, content, author, guild, channel):
                 self.content = content
                 self.author = author
                 self.guild = guild
+                self.channel = channel
+                self.attachments = []
                 self.mentions = []
                 self.role_mentions = []
                 self.mention_everyone = False
         
-        fake_msg = FakeMessage(text, interaction.user, interaction.guild)
-        is_spam, spam_confidence = await self.detect_spam(fake_msg)
+        fake_msg = FakeMessage(text, interaction.user, interaction.guild, interaction.channel)
+        is_spam, spam_confidence = await self.detect_spam(InspectedMessage(fake_msg))
         
         embed.add_field(name="Spam Confidence", value=f"{spam_confidence:.2f}/1.00", inline=True)
         embed.add_field(
@@ -688,22 +706,50 @@ class AIModeration(commands.Cog):
         
         await interaction.followup.send(embed=embed, ephemeral=True)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Monitor messages for toxicity and spam"""
-        # Ignore messages from bots
-        if message.author.bot:
-            return
-        
-        # Ignore DMs
-        if not message.guild:
+    @app_commands.command(name="verdictcache", description="Show toxicity verdict cache statistics")
+    @app_commands.check(PermissionChecks.slash_is_admin())
+    async def verdictcache(self, interaction: discord.Interaction):
+        """Show how many toxicity analyses were answered from the verdict cache"""
+        # Check admin permissions
+        if not is_admin(interaction) and not is_bot_owner(interaction.user.id):
+            await interaction.response.send_message(
+                embed=create_error_embed("Permission Denied", "You need administrator permissions to use this command."),
+                ephemeral=True
+            )
             return
         
-        guild_id = str(message.guild.id)
+        stats = verdict_cache.stats()
+        embed = create_embed(
+            "Toxicity Verdict Cache",
+            f"Repeated messages within {TOXICITY_CACHE_TTL // 60} minutes reuse their verdict instead of calling an AI provider."
+        )
+        embed.add_field(name="Hits", value=str(stats["hits"]), inline=True)
+        embed.add_field(name="Misses", value=str(stats["misses"]), inline=True)
+        embed.add_field(name="Hit Rate", value=f"{stats['hit_rate']:.0%}", inline=True)
+        # Misses that waited for an identical analysis already in flight
+        embed.add_field(name="Shared In-Flight", value=str(self.coalesced_verdicts), inline=True)
+        embed.add_field(name="Entries", value=f"{stats['entries']}/{TOXICITY_CACHE_SIZE}", inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    async def cog_load(self):
+        """Register AI moderation with the shared message pipeline"""
+        get_pipeline(self.bot).register("ai_moderation", self.inspect_message, PRIORITY_AI_MODERATION)
+        http_client.acquire()
+
+    async def cog_unload(self):
+        """Remove AI moderation from the shared message pipeline"""
+        get_pipeline(self.bot).unregister("ai_moderation")
+        await self.store.close()
+        await http_client.release()
+
+    async def inspect_message(self, inspected: InspectedMessage):
+        """Monitor messages for toxicity and spam (message pipeline stage)"""
+        message = inspected.message
+        guild_id = inspected.guild_id
         
         # Check if AI moderation is enabled for this guild
         if not self.is_feature_enabled("content_filtering", guild_id) and not self.is_feature_enabled("toxicity_analysis", guild_id):
-            return
+            return Verdict.CONTINUE
         
         # Analyze content for toxicity if content filtering is enabled
         if self.is_feature_enabled("content_filtering", guild_id) or self.is_feature_enabled("toxicity_analysis", guild_id):
@@ -713,7 +759,7 @@ class AIModeration(commands.Cog):
             if toxicity_score >= self.config["toxicity_threshold"] and category in ["moderate", "severe"]:
                 try:
                     # Delete the message
-                    await message.delete()
+                    await inspected.delete()
                     logger.info(f"Deleted toxic message from {message.author.name} (score: {toxicity_score:.2f}, category: {category})")
                     
                     # Send a warning to the user
@@ -756,15 +802,19 @@ class AIModeration(commands.Cog):
                 except Exception as e:
                     logger.error(f"Error processing toxic message: {str(e)}")
         
+        # No need to check a removed message for spam
+        if inspected.deleted:
+            return Verdict.STOP
+        
         # Check for spam if enabled
         if self.is_feature_enabled("spam_detection", guild_id):
-            is_spam, spam_confidence = await self.detect_spam(message)
+            is_spam, spam_confidence = await self.detect_spam(inspected)
             
             # If spam confidence is above threshold, take action
             if is_spam:
                 try:
                     # Delete the message
-                    await message.delete()
+                    await inspected.delete()
                     logger.info(f"Deleted spam message from {message.author.name} (confidence: {spam_confidence:.2f})")
                     
                     # Send a warning to the user
@@ -805,6 +855,8 @@ class AIModeration(commands.Cog):
                     logger.warning(f"No permission to delete spam message from {message.author.name}")
                 except Exception as e:
                     logger.error(f"Error processing spam message: {str(e)}")
+        
+        return Verdict.STOP if inspected.deleted else Verdict.CONTINUE
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
@@ -822,42 +874,22 @@ class AIModeration(commands.Cog):
                 "enabled": False
             }
         
-        # Initialize join history for this guild if needed
-        if "join_history" not in self.config:
-            self.config["join_history"] = {}
-        
-        if guild_id not in self.config["join_history"]:
-            self.config["join_history"][guild_id] = []
-        
-        # Add this join to the history
-        now = datetime.datetime.utcnow()
-        self.config["join_history"][guild_id].append({
-            "user_id": str(member.id),
-            "username": member.name,
-            "timestamp": now.isoformat()
-        })
-        
-        # Keep only recent joins (last 24 hours)
-        day_ago = now - datetime.timedelta(days=1)
-        self.config["join_history"][guild_id] = [
-            j for j in self.config["join_history"][guild_id]
-            if datetime.datetime.fromisoformat(j["timestamp"]) > day_ago
-        ]
-        
         # Check for potential raid (many joins in a short timeframe)
         threshold = self.config["raid_detection"]["join_threshold"]
         timeframe = self.config["raid_detection"]["timeframe_seconds"]
+        now = datetime.datetime.utcnow()
         
-        # Count recent joins within the timeframe
-        recent_joins = [
-            j for j in self.config["join_history"][guild_id]
-            if (now - datetime.datetime.fromisoformat(j["timestamp"])).total_seconds() < timeframe
-        ]
+        # Add this join to the guild's window; it only holds joins within the timeframe
+        self.join_windows.max_age = timeframe
+        window = self.join_windows.add(guild_id, (str(member.id), member.name))
+        join_count = len(window.entries)
         
         # If join rate exceeds threshold, trigger raid alert
-        if len(recent_joins) >= threshold:
+        if join_count >= threshold:
+            recent_joins = window.values()
+
             # Log potential raid
-            logger.warning(f"Potential raid detected in {member.guild.name}: {len(recent_joins)} joins in {timeframe} seconds")
+            logger.warning(f"Potential raid detected in {member.guild.name}: {join_count} joins in {timeframe} seconds")
             
             # Notify moderators in log channel
             try:
@@ -868,14 +900,14 @@ class AIModeration(commands.Cog):
                 if log_channel:
                     alert_embed = discord.Embed(
                         title="⚠️ POTENTIAL RAID ALERT ⚠️",
-                        description=f"Unusual join activity detected: {len(recent_joins)} new members in the last {timeframe} seconds.",
+                        description=f"Unusual join activity detected: {join_count} new members in the last {timeframe} seconds.",
                         color=COLORS["ERROR"]
                     )
                     
                     # List recent joins
-                    recent_users = "\n".join([f"• {j['username']} (ID: {j['user_id']})" for j in recent_joins[:10]])
-                    if len(recent_joins) > 10:
-                        recent_users += f"\n+ {len(recent_joins) - 10} more..."
+                    recent_users = "\n".join([f"• {username} (ID: {user_id})" for user_id, username in recent_joins[:10]])
+                    if join_count > 10:
+                        recent_users += f"\n+ {join_count - 10} more..."
                     
                     alert_embed.add_field(name="Recent Joins", value=recent_users, inline=False)
                     alert_embed.set_footer(text=f"Timestamp: {now.strftime('%Y-%m-%d %H:%M:%S')} UTC")
@@ -889,9 +921,6 @@ class AIModeration(commands.Cog):
             except Exception as e:
                 logger.error(f"Error sending raid alert: {str(e)}")
         
-        # Save the config
-        self.save_config()
-
 async def setup(bot):
     """Add the AI Moderation cog to the bot"""
     await bot.add_cog(AIModeration(bot))
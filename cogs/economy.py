@@ -3,12 +3,19 @@ import logging
 import random
 import traceback
 from discord import app_commands
-from discord.ext import commands
-from datetime import datetime, timedelta
+from discord.ext import commands, tasks
+from datetime import timedelta, time, timezone
 from utils.embed_helpers import create_embed, create_error_embed
-from models.economy import UserEconomy, Item, Inventory, Transaction
+from utils.permissions import is_bot_owner
+from utils.db_executor import run_db
+from utils.cooldown_index import get_cooldown_index
+from models.economy import UserEconomy, Item
+from repositories import economy as economy_repo
+from repositories.economy import EconomyError, CooldownError
+from repositories.economy_cache import get_cache
+from repositories import item_catalog
 from database import db
-from typing import Literal
+from typing import List, Literal
 
 logger = logging.getLogger('discord')
 
@@ -19,16 +26,123 @@ handler = logging.StreamHandler()
 handler.setFormatter(logging.Formatter('ECONOMY DEBUG - %(message)s'))
 debug_logger.addHandler(handler)
 
+# Cooldowns for timed actions
+DAILY_COOLDOWN = timedelta(days=1)
+WORK_COOLDOWN = timedelta(hours=1)
+ROB_COOLDOWN = timedelta(hours=1)
+
+# Leaderboard size and how often the in-memory ranking is checked against the database
+LEADERBOARD_SIZE = 10
+LEADERBOARD_RECONCILE_MINUTES = 10
+
+# Transaction history page size and how often old transactions are compacted
+TRANSACTIONS_PAGE_SIZE = 10
+TRANSACTION_COMPACTION_HOURS = 6
+
+# Bank interest is paid once a day at this time
+BANK_INTEREST_TIME = time(hour=0, tzinfo=timezone.utc)
+
+def _format_hours_minutes(time_left: timedelta) -> str:
+    """Format a cooldown as 'Xh Ym'"""
+    hours, remainder = divmod(time_left.seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
+    return f"{hours}h {minutes}m"
+
+def _format_minutes_seconds(time_left: timedelta) -> str:
+    """Format a cooldown as 'Xm Ys'"""
+    minutes, seconds = divmod(time_left.seconds, 60)
+    return f"{minutes}m {seconds}s"
+
+class TransactionHistoryView(discord.ui.View):
+    """Newer/Older buttons for paging through a user's transactions"""
+
+    def __init__(self, cog, user, page):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.user = user
+        self.page = page
+        self.cursors = [None]  # Cursor of every page from the newest to the current one
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.newer.disabled = len(self.cursors) == 1
+        self.older.disabled = self.page.next_cursor is None
+
+    async def _show(self, interaction: discord.Interaction):
+        self.page = await economy_repo.get_transaction_page(str(self.user.id), TRANSACTIONS_PAGE_SIZE, self.cursors[-1])
+        self._update_buttons()
+        embed = await self.cog._transactions_embed(self.user, self.page, len(self.cursors))
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user.id:
+            await interaction.response.send_message("This isn't your transaction history.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Newer", style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        await self._show(interaction)
+
+    @discord.ui.button(label="Older", style=discord.ButtonStyle.primary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.append(self.page.next_cursor)
+        await self._show(interaction)
+
 class Economy(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Import app here to avoid circular imports
-        from app import app
-        self.app = app
+        # Answers repeat daily/work/rob attempts without touching the database
+        self.cooldowns = get_cooldown_index()
         logger.info("Economy cog initialized")
-        # Initialize shop items on startup
-        with self.app.app_context():
-            self.initialize_shop()
+
+    async def cog_load(self):
+        """Initialize shop items on startup (off the event loop)"""
+        await run_db(self.initialize_shop)
+        # Warm the catalog so shop, buy and autocomplete never wait on the database
+        await item_catalog.reload()
+        # Write-behind mode: replay any crash journal before taking commands
+        cache = get_cache()
+        if cache:
+            await cache.start()
+        self.reconcile_leaderboard.start()
+        self.compact_transactions.start()
+        if economy_repo.BANK_INTEREST_BPS > 0:
+            self.pay_bank_interest.start()
+
+    async def cog_unload(self):
+        """Stop background tasks"""
+        self.reconcile_leaderboard.cancel()
+        self.compact_transactions.cancel()
+        self.pay_bank_interest.cancel()
+
+    @tasks.loop(time=BANK_INTEREST_TIME)
+    async def pay_bank_interest(self):
+        """Pay the daily bank interest to everyone"""
+        try:
+            result = await economy_repo.apply_bank_interest()
+            logger.info(f"Paid bank interest of {result.minted} coins to {result.users} users")
+        except Exception as e:
+            logger.error(f"Error paying bank interest: {str(e)}")
+
+    @tasks.loop(hours=TRANSACTION_COMPACTION_HOURS)
+    async def compact_transactions(self):
+        """Fold old transactions into daily totals so the ledger stays bounded"""
+        try:
+            removed = await economy_repo.compact_transactions()
+            if removed:
+                logger.info(f"Compacted {removed} old economy transactions into daily totals")
+        except Exception as e:
+            logger.error(f"Error compacting economy transactions: {str(e)}")
+
+    @tasks.loop(minutes=LEADERBOARD_RECONCILE_MINUTES)
+    async def reconcile_leaderboard(self):
+        """Reload the in-memory leaderboard so it can't drift from the database"""
+        try:
+            await economy_repo.reconcile_leaderboard()
+        except Exception as e:
+            logger.error(f"Error reconciling economy leaderboard: {str(e)}")
 
     def initialize_shop(self):
         """Initialize the shop with default items"""
@@ -74,6 +188,7 @@ class Economy(commands.Cog):
 
                 debug_logger.info("Committing shop items to database...")
                 db.session.commit()
+                item_catalog.invalidate()
                 debug_logger.info(f"Successfully added {len(default_items)} default shop items")
             else:
                 debug_logger.info("Shop items already exist, verifying...")
@@ -102,39 +217,28 @@ class Economy(commands.Cog):
                 except Exception as e:
                     debug_logger.warning(f"Could not fetch Discord user data: {str(e)}")
             
-            with self.app.app_context():
-                user = UserEconomy.query.filter_by(user_id=str(user_id)).first()
-                if not user:
-                    debug_logger.info(f"Creating new economy profile for user {user_id} ({username})")
-                    user = UserEconomy(
-                        user_id=str(user_id),
-                        username=username,
-                        display_name=display_name,
-                        wallet=0,
-                        bank=0,
-                        bank_capacity=1000
-                    )
-                    db.session.add(user)
-                    debug_logger.info("Committing new user profile to database...")
-                    db.session.commit()
-                    debug_logger.info("New user profile created successfully")
-                else:
-                    # Update username and display_name if changed
-                    if (username and user.username != username) or (display_name and user.display_name != display_name):
-                        debug_logger.info(f"Updating user data: {user.username} -> {username}, {user.display_name} -> {display_name}")
-                        if username:
-                            user.username = username
-                        if display_name:
-                            user.display_name = display_name
-                        db.session.commit()
-                    
-                    debug_logger.info(f"Found profile for {user.display_identifier} - wallet: {user.wallet}, bank: {user.bank}")
-                return user
+            user = await economy_repo.get_user(str(user_id), username, display_name)
+            debug_logger.info(f"Found profile for {user.display_identifier} - wallet: {user.wallet}, bank: {user.bank}")
+            return user
         except Exception as e:
             debug_logger.error(f"Error in get_user_economy: {str(e)}")
             debug_logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
+    @staticmethod
+    def _identity(user) -> tuple:
+        """(user_id, username, display_name) for a Discord user"""
+        return str(user.id), user.name, user.display_name
+
+    async def _send_interaction_error(self, interaction: discord.Interaction, command_name: str, error: Exception):
+        """Log an unexpected error and report it to the user"""
+        logger.error(f"Error in {command_name} command: {str(error)}")
+        # If we haven't responded yet, respond with the error
+        if not interaction.response.is_done():
+            await interaction.response.send_message(f"An error occurred: {str(error)}", ephemeral=True)
+        else:
+            await interaction.followup.send(f"An error occurred: {str(error)}", ephemeral=True)
+
     @app_commands.command(name="rob", description="Attempt to steal coins from another user")
     @app_commands.describe(target="The user you want to rob")
     async def rob(self, interaction: discord.Interaction, target: discord.Member):
@@ -151,125 +255,100 @@ class Economy(commands.Cog):
                 )
                 return
 
-            # Get both user profiles
-            robber = await self.get_user_economy(
-                str(interaction.user.id),
-                username=interaction.user.name,
-                display_name=interaction.user.display_name
-            )
-            victim = await self.get_user_economy(
-                str(target.id),
-                username=target.name,
-                display_name=target.display_name
-            )
-
-            # Check cooldown (1 hour)
-            now = datetime.utcnow()
-            cooldown = timedelta(hours=1)
-            if hasattr(robber, 'last_rob') and robber.last_rob and now - robber.last_rob < cooldown:
-                time_left = cooldown - (now - robber.last_rob)
-                minutes, seconds = divmod(time_left.seconds, 60)
+            time_left = await self.cooldowns.time_left(interaction.user.id, "rob")
+            if time_left:
                 await interaction.followup.send(
-                    embed=create_error_embed("Cooldown", f"You can rob again in {minutes}m {seconds}s"),
+                    embed=create_error_embed("Cooldown", f"You can rob again in {_format_minutes_seconds(time_left)}"),
                     ephemeral=True
                 )
                 return
 
-            # Minimum wallet requirement for robber (100 coins)
-            if robber.wallet < 100:
-                await interaction.followup.send(
-                    embed=create_error_embed("Error", "You need at least 100 coins in your wallet to rob someone!"),
-                    ephemeral=True
+            # 40% success rate, stealing 20-50% of the victim's wallet; 100 coin fine on failure
+            success = random.random() < 0.4
+            fine = 100
+            try:
+                amount = await economy_repo.rob(
+                    self._identity(interaction.user),
+                    self._identity(target),
+                    ROB_COOLDOWN,
+                    success,
+                    random.uniform(0.2, 0.5),
+                    fine
                 )
-                return
-
-            # Minimum wallet requirement for victim (50 coins)
-            if victim.wallet < 50:
+            except CooldownError as e:
+                await self.cooldowns.set_remaining(interaction.user.id, "rob", e.time_left)
                 await interaction.followup.send(
-                    embed=create_error_embed("Error", f"{target.name} doesn't have enough coins to rob!"),
+                    embed=create_error_embed("Cooldown", f"You can rob again in {_format_minutes_seconds(e.time_left)}"),
                     ephemeral=True
                 )
                 return
+            except EconomyError as e:
+                await interaction.followup.send(embed=create_error_embed("Error", str(e)), ephemeral=True)
+                return
+            await self.cooldowns.start(interaction.user.id, "rob", ROB_COOLDOWN)
 
-            # 40% success rate
-            success = random.random() < 0.4
-            
-            # Use app context for all database operations
-            with self.app.app_context():
-                robber.last_rob = now
-
-                if success:
-                    # Steal 20-50% of victim's wallet
-                    steal_percentage = random.uniform(0.2, 0.5)
-                    amount = int(victim.wallet * steal_percentage)
-
-                    victim.wallet -= amount
-                    robber.wallet += amount
-
-                    # Record transactions
-                    transaction1 = Transaction(
-                        user_id=str(interaction.user.id),
-                        username=interaction.user.name,
-                        display_name=interaction.user.display_name,
-                        amount=amount,
-                        description=f"Stole {amount} coins from {target.name}"
-                    )
-                    transaction2 = Transaction(
-                        user_id=str(target.id),
-                        username=target.name,
-                        display_name=target.display_name,
-                        amount=-amount,
-                        description=f"Got robbed by {interaction.user.name}"
-                    )
-                    db.session.add(transaction1)
-                    db.session.add(transaction2)
-
-                    embed = create_embed(
-                        "🦹 Successful Heist!",
-                        f"You stole {amount} coins from {target.name}!",
-                        color=0x43B581
-                    )
-                else:
-                    # Fine for failed robbery (100 coins)
-                    fine = 100
-                    robber.wallet -= fine
-
-                    # Record transaction
-                    transaction = Transaction(
-                        user_id=str(interaction.user.id),
-                        username=interaction.user.name, 
-                        display_name=interaction.user.display_name,
-                        amount=-fine,
-                        description="Fine for failed robbery attempt"
-                    )
-                    db.session.add(transaction)
-
-                    embed = create_embed(
-                        "👮 Caught in the Act!",
-                        f"You got caught trying to rob {target.name} and had to pay a fine of {fine} coins!",
-                        color=0xF04747
-                    )
-
-                db.session.commit()
+            if success:
+                embed = create_embed(
+                    "🦹 Successful Heist!",
+                    f"You stole {amount} coins from {target.name}!",
+                    color=0x43B581
+                )
+            else:
+                embed = create_embed(
+                    "👮 Caught in the Act!",
+                    f"You got caught trying to rob {target.name} and had to pay a fine of {fine} coins!",
+                    color=0xF04747
+                )
             
             await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Error in rob command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "rob", e)
+
+    async def _pay(self, sender, recipient, amount: int) -> discord.Embed:
+        """Transfer coins between users and build the reply embed"""
+        if amount <= 0:
+            return create_error_embed("Error", "Amount must be positive")
+        if recipient.id == sender.id:
+            return create_error_embed("Error", "You can't pay yourself!")
+        if recipient.bot:
+            return create_error_embed("Error", "You can't pay a bot!")
+
+        try:
+            sender_balance, _ = await economy_repo.transfer(self._identity(sender), self._identity(recipient), amount)
+        except EconomyError as e:
+            return create_error_embed("Error", str(e))
+        return create_embed(
+            "💸 Payment Sent",
+            f"You paid {amount} coins to {recipient.display_name}!\nYour wallet: {sender_balance.wallet} coins",
+            color=0x43B581
+        )
+
+    @commands.command(name="pay", aliases=["give"])
+    async def pay_prefix(self, ctx, member: discord.Member, amount: int):
+        """Give coins from your wallet to another user (prefix version)"""
+        try:
+            await ctx.send(embed=await self._pay(ctx.author, member, amount))
+        except Exception as e:
+            logger.error(f"Error in pay prefix command: {str(e)}")
+            await ctx.send(f"An error occurred: {str(e)}")
+
+    @app_commands.command(name="pay", description="Give coins from your wallet to another user")
+    @app_commands.describe(member="The user to pay", amount="Number of coins to give")
+    async def pay(self, interaction: discord.Interaction, member: discord.Member, amount: int):
+        """Give coins from your wallet to another user"""
+        try:
+            # First acknowledge the interaction to prevent timeouts
+            await interaction.response.defer()
+
+            await interaction.followup.send(embed=await self._pay(interaction.user, member, amount))
+        except Exception as e:
+            await self._send_interaction_error(interaction, "pay", e)
 
     @commands.command(name="balance", aliases=["bal"])
     async def balance_prefix(self, ctx):
         """Check your wallet and bank balance (prefix version)"""
         try:
-            user = await self.get_user_economy(
-                str(ctx.author.id),
-                username=ctx.author.name,
-                display_name=ctx.author.display_name
-            )
+            user = await self.get_user_economy(*self._identity(ctx.author))
             embed = create_embed(
                 "💰 Balance",
                 f"Wallet: {user.wallet} coins\nBank: {user.bank}/{user.bank_capacity} coins"
@@ -289,11 +368,7 @@ class Economy(commands.Cog):
             debug_logger.info(f"Processing balance command for user ID: {interaction.user.id}")
             
             # Get up-to-date user data with username
-            user = await self.get_user_economy(
-                str(interaction.user.id),
-                username=interaction.user.name,
-                display_name=interaction.user.display_name
-            )
+            user = await self.get_user_economy(*self._identity(interaction.user))
             
             # Use the display identifier for a more personalized message
             embed = create_embed(
@@ -302,59 +377,47 @@ class Economy(commands.Cog):
             )
             await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Error in balance command: {str(e)}")
             logger.error(f"Traceback: {traceback.format_exc()}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "balance", e)
+
+    async def _claim_timed(self, user, action: str, cooldown: timedelta, amount: int, description: str):
+        """Pay a timed reward; returns the new balance, or raises CooldownError
+
+        Users the cooldown index knows are still waiting are turned away
+        without a database query.
+        """
+        time_left = await self.cooldowns.time_left(user.id, action)
+        if time_left:
+            raise CooldownError(time_left)
+
+        try:
+            updated = await economy_repo.claim_reward(
+                *self._identity(user), f"last_{action}", cooldown, amount, description
+            )
+        except CooldownError as e:
+            await self.cooldowns.set_remaining(user.id, action, e.time_left)
+            raise
+        await self.cooldowns.start(user.id, action, cooldown)
+        return updated
+
+    async def _claim_daily(self, user) -> discord.Embed:
+        """Pay the daily reward and build the reply embed"""
+        reward = random.randint(100, 200)
+        try:
+            updated = await self._claim_timed(user, "daily", DAILY_COOLDOWN, reward, "Daily reward")
+        except CooldownError as e:
+            return create_error_embed(
+                "Daily Reward",
+                f"You can claim your next daily reward in {_format_hours_minutes(e.time_left)}"
+            )
+        debug_logger.info(f"Daily reward {reward} paid to {user.id}, wallet now {updated.wallet}")
+        return create_embed("📅 Daily Reward", f"You received {reward} coins!", color=0x43B581)
 
     @commands.command(name="daily")
     async def daily_prefix(self, ctx):
         """Collect daily rewards (prefix version)"""
         try:
-            user = await self.get_user_economy(
-                str(ctx.author.id),
-                username=ctx.author.name,
-                display_name=ctx.author.display_name
-            )
-            
-            now = datetime.utcnow()
-            if user.last_daily and now - user.last_daily < timedelta(days=1):
-                time_left = timedelta(days=1) - (now - user.last_daily)
-                hours, remainder = divmod(time_left.seconds, 3600)
-                minutes, _ = divmod(remainder, 60)
-                embed = create_error_embed(
-                    "Daily Reward",
-                    f"You can claim your next daily reward in {hours}h {minutes}m"
-                )
-                await ctx.send(embed=embed)
-                return
-                
-            # Use app context for database operations
-            with self.app.app_context():
-                reward = random.randint(100, 200)
-                user.wallet += reward
-                user.last_daily = now
-                
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(ctx.author.id),
-                    username=ctx.author.name,
-                    display_name=ctx.author.display_name,
-                    amount=reward,
-                    description="Daily reward"
-                )
-                db.session.add(transaction)
-                db.session.commit()
-                
-            embed = create_embed(
-                "📅 Daily Reward",
-                f"You received {reward} coins!",
-                color=0x43B581
-            )
-            await ctx.send(embed=embed)
+            await ctx.send(embed=await self._claim_daily(ctx.author))
         except Exception as e:
             logger.error(f"Error in daily prefix command: {str(e)}")
             await ctx.send(f"An error occurred: {str(e)}")
@@ -367,123 +430,25 @@ class Economy(commands.Cog):
             await interaction.response.defer()
             
             debug_logger.info(f"Processing daily command for user ID: {interaction.user.id}")
-            
-            # Get fresh user data inside app context
-            with self.app.app_context():
-                user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                if not user:
-                    debug_logger.info(f"Creating new economy profile for user {interaction.user.id}")
-                    user = UserEconomy(
-                        user_id=str(interaction.user.id),
-                        wallet=0,
-                        bank=0,
-                        bank_capacity=1000
-                    )
-                    db.session.add(user)
-                    db.session.commit()
-                
-                debug_logger.info(f"User data - wallet: {user.wallet}, last_daily: {user.last_daily}")
-                
-                now = datetime.utcnow()
-                if user.last_daily and now - user.last_daily < timedelta(days=1):
-                    time_left = timedelta(days=1) - (now - user.last_daily)
-                    hours, remainder = divmod(time_left.seconds, 3600)
-                    minutes, _ = divmod(remainder, 60)
-                    debug_logger.info(f"User on cooldown, {hours}h {minutes}m remaining")
-                    
-                    embed = create_error_embed(
-                        "Daily Reward",
-                        f"You can claim your next daily reward in {hours}h {minutes}m"
-                    )
-                    await interaction.followup.send(embed=embed)
-                    return
-                
-                # Generate reward and update user data
-                reward = random.randint(100, 200)
-                debug_logger.info(f"Daily reward generated: {reward}")
-                
-                user.wallet += reward
-                user.last_daily = now
-                debug_logger.info(f"Updated wallet: {user.wallet}")
-
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(interaction.user.id),
-                    username=interaction.user.name,
-                    display_name=interaction.user.display_name,
-                    amount=reward,
-                    description="Daily reward"
-                )
-                db.session.add(transaction)
-                
-                # Explicitly commit changes
-                debug_logger.info("Committing changes to database...")
-                db.session.commit()
-                debug_logger.info("Database commit successful")
-
-            # Get the latest user data after commit for verification
-            with self.app.app_context():
-                updated_user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                debug_logger.info(f"Updated wallet after commit: {updated_user.wallet}")
-
-            embed = create_embed(
-                "📅 Daily Reward",
-                f"You received {reward} coins!",
-                color=0x43B581
-            )
-            await interaction.followup.send(embed=embed)
+            await interaction.followup.send(embed=await self._claim_daily(interaction.user))
         except Exception as e:
-            logger.error(f"Error in daily command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "daily", e)
+
+    async def _work(self, user) -> discord.Embed:
+        """Pay work earnings and build the reply embed"""
+        earnings = random.randint(10, 50)
+        try:
+            updated = await self._claim_timed(user, "work", WORK_COOLDOWN, earnings, "Work earnings")
+        except CooldownError as e:
+            return create_error_embed("Work", f"You can work again in {_format_minutes_seconds(e.time_left)}")
+        debug_logger.info(f"Work complete. New wallet balance: {updated.wallet}")
+        return create_embed("💼 Work", f"You worked hard and earned {earnings} coins!", color=0x43B581)
 
     @commands.command(name="work")
     async def work_prefix(self, ctx):
         """Work to earn coins (prefix version)"""
         try:
-            user = await self.get_user_economy(
-                str(ctx.author.id),
-                username=ctx.author.name,
-                display_name=ctx.author.display_name
-            )
-            
-            now = datetime.utcnow()
-            if user.last_work and now - user.last_work < timedelta(hours=1):
-                time_left = timedelta(hours=1) - (now - user.last_work)
-                minutes, seconds = divmod(time_left.seconds, 60)
-                embed = create_error_embed(
-                    "Work",
-                    f"You can work again in {minutes}m {seconds}s"
-                )
-                await ctx.send(embed=embed)
-                return
-                
-            # Use app context for database operations
-            with self.app.app_context():
-                earnings = random.randint(10, 50)
-                user.wallet += earnings
-                user.last_work = now
-                
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(ctx.author.id),
-                    username=ctx.author.name,
-                    display_name=ctx.author.display_name,
-                    amount=earnings,
-                    description="Work earnings"
-                )
-                db.session.add(transaction)
-                db.session.commit()
-                
-            embed = create_embed(
-                "💼 Work",
-                f"You worked hard and earned {earnings} coins!",
-                color=0x43B581
-            )
-            await ctx.send(embed=embed)
+            await ctx.send(embed=await self._work(ctx.author))
         except Exception as e:
             logger.error(f"Error in work prefix command: {str(e)}")
             await ctx.send(f"An error occurred: {str(e)}")
@@ -496,91 +461,9 @@ class Economy(commands.Cog):
             await interaction.response.defer()
             
             debug_logger.info(f"Processing work command for user ID: {interaction.user.id}")
-            
-            # Check for cooldown and fetch latest data in same transaction
-            now = datetime.utcnow()
-            earnings = 0  # Default value in case we need it
-            wallet_amount = 0  # For storing the final wallet amount
-            
-            with self.app.app_context():
-                # Get fresh user data directly in this context
-                fresh_user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                if not fresh_user:
-                    debug_logger.info(f"Creating new economy profile for user {interaction.user.id}")
-                    fresh_user = UserEconomy(
-                        user_id=str(interaction.user.id),
-                        wallet=0,
-                        bank=0,
-                        bank_capacity=1000
-                    )
-                    db.session.add(fresh_user)
-                    db.session.commit()
-                    # Re-fetch after creation
-                    fresh_user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                    
-                debug_logger.info(f"Fresh user data - wallet: {fresh_user.wallet}, bank: {fresh_user.bank}")
-                
-                # Check cooldown inside the same session
-                if fresh_user.last_work and now - fresh_user.last_work < timedelta(hours=1):
-                    time_left = timedelta(hours=1) - (now - fresh_user.last_work)
-                    minutes, seconds = divmod(time_left.seconds, 60)
-                    debug_logger.info(f"User on cooldown, {minutes}m {seconds}s remaining")
-                    
-                    # Create a snapshot of cooldown data
-                    cooldown_minutes = minutes
-                    cooldown_seconds = seconds
-                    on_cooldown = True
-                else:
-                    on_cooldown = False
-                    # Not on cooldown, so process work
-                    earnings = random.randint(10, 50)
-                    debug_logger.info(f"Earnings generated: {earnings}")
-                    
-                    # Update wallet and work timestamp
-                    fresh_user.wallet += earnings
-                    fresh_user.last_work = now
-                    debug_logger.info(f"Updated wallet: {fresh_user.wallet}")
-    
-                    # Record transaction
-                    transaction = Transaction(
-                        user_id=str(interaction.user.id),
-                        username=interaction.user.name,
-                        display_name=interaction.user.display_name,
-                        amount=earnings,
-                        description="Work earnings"
-                    )
-                    db.session.add(transaction)
-                    
-                    # Explicitly commit changes
-                    debug_logger.info("Committing changes to database...")
-                    db.session.commit()
-                    debug_logger.info("Database commit successful")
-                    
-                    # Store the new wallet amount for use outside this context
-                    wallet_amount = fresh_user.wallet
-            
-            # Respond based on cooldown status
-            if on_cooldown:
-                embed = create_error_embed(
-                    "Work",
-                    f"You can work again in {cooldown_minutes}m {cooldown_seconds}s"
-                )
-            else:
-                embed = create_embed(
-                    "💼 Work",
-                    f"You worked hard and earned {earnings} coins!",
-                    color=0x43B581
-                )
-                debug_logger.info(f"Work complete. New wallet balance: {wallet_amount}")
-                
-            await interaction.followup.send(embed=embed)
+            await interaction.followup.send(embed=await self._work(interaction.user))
         except Exception as e:
-            logger.error(f"Error in work command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "work", e)
 
     @commands.command(name="deposit", aliases=["dep"])
     async def deposit_prefix(self, ctx, amount: int):
@@ -592,41 +475,12 @@ class Economy(commands.Cog):
                 )
                 return
                 
-            user = await self.get_user_economy(
-                str(ctx.author.id),
-                username=ctx.author.name,
-                display_name=ctx.author.display_name
-            )
-            
-            if amount > user.wallet:
-                await ctx.send(
-                    embed=create_error_embed("Error", "You don't have enough coins in your wallet")
-                )
-                return
-                
-            space_available = user.bank_capacity - user.bank
-            if amount > space_available:
-                await ctx.send(
-                    embed=create_error_embed("Error", f"Your bank can only hold {space_available} more coins")
-                )
+            try:
+                await economy_repo.deposit(*self._identity(ctx.author), amount)
+            except EconomyError as e:
+                await ctx.send(embed=create_error_embed("Error", str(e)))
                 return
                 
-            # Use app context for database operations
-            with self.app.app_context():
-                user.wallet -= amount
-                user.bank += amount
-                
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(ctx.author.id),
-                    username=ctx.author.name,
-                    display_name=ctx.author.display_name,
-                    amount=amount,
-                    description="Bank deposit"
-                )
-                db.session.add(transaction)
-                db.session.commit()
-                
             embed = create_embed(
                 "🏦 Deposit",
                 f"Deposited {amount} coins into your bank",
@@ -654,63 +508,13 @@ class Economy(commands.Cog):
                 )
                 return
 
-            # Get fresh user data inside app context
-            with self.app.app_context():
-                user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                if not user:
-                    debug_logger.info(f"Creating new economy profile for user {interaction.user.id}")
-                    user = UserEconomy(
-                        user_id=str(interaction.user.id),
-                        wallet=0,
-                        bank=0,
-                        bank_capacity=1000
-                    )
-                    db.session.add(user)
-                    db.session.commit()
-                
-                debug_logger.info(f"User data - wallet: {user.wallet}, bank: {user.bank}, capacity: {user.bank_capacity}")
-                
-                if amount > user.wallet:
-                    debug_logger.info(f"Insufficient funds: {user.wallet} < {amount}")
-                    await interaction.followup.send(
-                        embed=create_error_embed("Error", "You don't have enough coins in your wallet"),
-                        ephemeral=True
-                    )
-                    return
-    
-                space_available = user.bank_capacity - user.bank
-                if amount > space_available:
-                    debug_logger.info(f"Insufficient bank space: {space_available} < {amount}")
-                    await interaction.followup.send(
-                        embed=create_error_embed("Error", f"Your bank can only hold {space_available} more coins"),
-                        ephemeral=True
-                    )
-                    return
-                
-                # Update wallet and bank
-                user.wallet -= amount
-                user.bank += amount
-                debug_logger.info(f"Updated wallet: {user.wallet}, bank: {user.bank}")
-                
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(interaction.user.id),
-                    username=interaction.user.name,
-                    display_name=interaction.user.display_name,
-                    amount=amount,
-                    description="Bank deposit"
-                )
-                db.session.add(transaction)
-                
-                # Explicitly commit changes
-                debug_logger.info("Committing changes to database...")
-                db.session.commit()
-                debug_logger.info("Database commit successful")
-
-            # Get the latest user data after commit for verification
-            with self.app.app_context():
-                updated_user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                debug_logger.info(f"Updated data after commit - wallet: {updated_user.wallet}, bank: {updated_user.bank}")
+            try:
+                user = await economy_repo.deposit(*self._identity(interaction.user), amount)
+            except EconomyError as e:
+                debug_logger.info(f"Deposit refused: {str(e)}")
+                await interaction.followup.send(embed=create_error_embed("Error", str(e)), ephemeral=True)
+                return
+            debug_logger.info(f"Updated data after commit - wallet: {user.wallet}, bank: {user.bank}")
 
             embed = create_embed(
                 "🏦 Deposit",
@@ -719,12 +523,7 @@ class Economy(commands.Cog):
             )
             await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Error in deposit command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "deposit", e)
 
     @commands.command(name="withdraw", aliases=["with"])
     async def withdraw_prefix(self, ctx, amount: int):
@@ -736,34 +535,12 @@ class Economy(commands.Cog):
                 )
                 return
                 
-            user = await self.get_user_economy(
-                str(ctx.author.id),
-                username=ctx.author.name,
-                display_name=ctx.author.display_name
-            )
-            
-            if amount > user.bank:
-                await ctx.send(
-                    embed=create_error_embed("Error", "You don't have enough coins in your bank")
-                )
+            try:
+                await economy_repo.withdraw(*self._identity(ctx.author), amount)
+            except EconomyError as e:
+                await ctx.send(embed=create_error_embed("Error", str(e)))
                 return
                 
-            # Use app context for database operations
-            with self.app.app_context():
-                user.bank -= amount
-                user.wallet += amount
-                
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(ctx.author.id),
-                    username=ctx.author.name,
-                    display_name=ctx.author.display_name,
-                    amount=amount,
-                    description="Bank withdrawal"
-                )
-                db.session.add(transaction)
-                db.session.commit()
-                
             embed = create_embed(
                 "🏦 Withdraw",
                 f"Withdrew {amount} coins from your bank",
@@ -791,54 +568,13 @@ class Economy(commands.Cog):
                 )
                 return
 
-            # Get fresh user data inside app context
-            with self.app.app_context():
-                user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                if not user:
-                    debug_logger.info(f"Creating new economy profile for user {interaction.user.id}")
-                    user = UserEconomy(
-                        user_id=str(interaction.user.id),
-                        wallet=0,
-                        bank=0,
-                        bank_capacity=1000
-                    )
-                    db.session.add(user)
-                    db.session.commit()
-                
-                debug_logger.info(f"User data - wallet: {user.wallet}, bank: {user.bank}")
-                
-                if amount > user.bank:
-                    debug_logger.info(f"Insufficient bank funds: {user.bank} < {amount}")
-                    await interaction.followup.send(
-                        embed=create_error_embed("Error", "You don't have enough coins in your bank"),
-                        ephemeral=True
-                    )
-                    return
-                
-                # Update wallet and bank
-                user.bank -= amount
-                user.wallet += amount
-                debug_logger.info(f"Updated wallet: {user.wallet}, bank: {user.bank}")
-                
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(interaction.user.id),
-                    username=interaction.user.name,
-                    display_name=interaction.user.display_name,
-                    amount=amount,
-                    description="Bank withdrawal"
-                )
-                db.session.add(transaction)
-                
-                # Explicitly commit changes
-                debug_logger.info("Committing changes to database...")
-                db.session.commit()
-                debug_logger.info("Database commit successful")
-
-            # Get the latest user data after commit for verification
-            with self.app.app_context():
-                updated_user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                debug_logger.info(f"Updated data after commit - wallet: {updated_user.wallet}, bank: {updated_user.bank}")
+            try:
+                user = await economy_repo.withdraw(*self._identity(interaction.user), amount)
+            except EconomyError as e:
+                debug_logger.info(f"Withdrawal refused: {str(e)}")
+                await interaction.followup.send(embed=create_error_embed("Error", str(e)), ephemeral=True)
+                return
+            debug_logger.info(f"Updated data after commit - wallet: {user.wallet}, bank: {user.bank}")
 
             embed = create_embed(
                 "🏦 Withdraw",
@@ -847,12 +583,7 @@ class Economy(commands.Cog):
             )
             await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Error in withdraw command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "withdraw", e)
 
     @app_commands.command(name="coinflip", description="Bet your coins on a coin flip")
     @app_commands.describe(
@@ -880,78 +611,36 @@ class Economy(commands.Cog):
                 )
                 return
 
-            # Get fresh user data inside app context
-            with self.app.app_context():
-                user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                if not user:
-                    debug_logger.info(f"Creating new economy profile for user {interaction.user.id}")
-                    user = UserEconomy(
-                        user_id=str(interaction.user.id),
-                        wallet=0,
-                        bank=0,
-                        bank_capacity=1000
-                    )
-                    db.session.add(user)
-                    db.session.commit()
-                
-                debug_logger.info(f"User data - wallet: {user.wallet}, bank: {user.bank}")
-                
-                if amount > user.wallet:
-                    debug_logger.info(f"Insufficient funds: {user.wallet} < {amount}")
-                    await interaction.followup.send(
-                        embed=create_error_embed("Error", "You don't have enough coins in your wallet"),
-                        ephemeral=True
-                    )
-                    return
-
-                # Determine result
-                result = random.choice(["heads", "tails"])
-                won = choice == result
-                debug_logger.info(f"Coinflip result: {result}, user chose: {choice}, won: {won}")
-                
-                # Update user's wallet
-                if won:
-                    user.wallet += amount
-                    color = 0x43B581
-                    title = "🎉 You won!"
-                    description = f"The coin landed on {result}!\nYou won {amount} coins!"
-                else:
-                    user.wallet -= amount
-                    color = 0xF04747
-                    title = "😢 You lost!"
-                    description = f"The coin landed on {result}!\nYou lost {amount} coins!"
-                
-                debug_logger.info(f"Updated wallet: {user.wallet}")
-
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(interaction.user.id),
-                    username=interaction.user.name,
-                    display_name=interaction.user.display_name,
-                    amount=amount if won else -amount,
-                    description=f"Coinflip: {'won' if won else 'lost'}"
+            # Determine result
+            result = random.choice(["heads", "tails"])
+            won = choice == result
+            debug_logger.info(f"Coinflip result: {result}, user chose: {choice}, won: {won}")
+
+            try:
+                user = await economy_repo.settle_bet(
+                    *self._identity(interaction.user),
+                    amount,
+                    amount if won else -amount,
+                    f"Coinflip: {'won' if won else 'lost'}"
                 )
-                db.session.add(transaction)
-                
-                # Explicitly commit changes
-                debug_logger.info("Committing changes to database...")
-                db.session.commit()
-                debug_logger.info("Database commit successful")
+            except EconomyError as e:
+                await interaction.followup.send(embed=create_error_embed("Error", str(e)), ephemeral=True)
+                return
+            debug_logger.info(f"Updated wallet after commit: {user.wallet}")
 
-            # Get the latest user data after commit for verification
-            with self.app.app_context():
-                updated_user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                debug_logger.info(f"Updated wallet after commit: {updated_user.wallet}")
+            if won:
+                color = 0x43B581
+                title = "🎉 You won!"
+                description = f"The coin landed on {result}!\nYou won {amount} coins!"
+            else:
+                color = 0xF04747
+                title = "😢 You lost!"
+                description = f"The coin landed on {result}!\nYou lost {amount} coins!"
 
             embed = create_embed(title, description, color=color)
             await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Error in coinflip command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "coinflip", e)
 
     @app_commands.command(name="slots", description="Play the slot machine")
     @app_commands.describe(amount="Amount of coins to bet")
@@ -971,83 +660,42 @@ class Economy(commands.Cog):
                 )
                 return
 
-            # Get fresh user data inside app context
-            with self.app.app_context():
-                user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                if not user:
-                    debug_logger.info(f"Creating new economy profile for user {interaction.user.id}")
-                    user = UserEconomy(
-                        user_id=str(interaction.user.id),
-                        wallet=0,
-                        bank=0,
-                        bank_capacity=1000
-                    )
-                    db.session.add(user)
-                    db.session.commit()
-                
-                debug_logger.info(f"User data - wallet: {user.wallet}, bank: {user.bank}")
-                
-                if amount > user.wallet:
-                    debug_logger.info(f"Insufficient funds: {user.wallet} < {amount}")
-                    await interaction.followup.send(
-                        embed=create_error_embed("Error", "You don't have enough coins in your wallet"),
-                        ephemeral=True
-                    )
-                    return
-
-                # Slot machine symbols and their weights
-                symbols = ["🍒", "🍊", "🍋", "🍇", "💎", "7️⃣"]
-                weights = [0.3, 0.25, 0.2, 0.15, 0.07, 0.03]
-
-                # Get three random symbols
-                result = [random.choices(symbols, weights=weights)[0] for _ in range(3)]
-                debug_logger.info(f"Slot results: {result}")
-
-                # Calculate winnings
-                winnings = 0
-                if result[0] == result[1] == result[2]:  # All three match
-                    if result[0] == "7️⃣":
-                        winnings = amount * 10  # Jackpot
-                        debug_logger.info("JACKPOT! Triple 7s")
-                    elif result[0] == "💎":
-                        winnings = amount * 5
-                        debug_logger.info("Big win! Triple diamonds")
-                    else:
-                        winnings = amount * 3
-                        debug_logger.info(f"Good win! Triple {result[0]}")
-                elif result[0] == result[1] or result[1] == result[2]:  # Two match
-                    winnings = amount * 1.5
-                    debug_logger.info("Small win! Two matching symbols")
-
-                # Round winnings to integer
-                winnings = int(winnings)
-                debug_logger.info(f"Total winnings: {winnings}")
-
-                # Update user's wallet
-                user.wallet -= amount
-                if winnings > 0:
-                    user.wallet += winnings
-                debug_logger.info(f"Updated wallet: {user.wallet}")
-
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(interaction.user.id),
-                    username=interaction.user.name,
-                    display_name=interaction.user.display_name,
-                    amount=winnings - amount,
-                    description="Slots game"
+            # Slot machine symbols and their weights
+            symbols = ["🍒", "🍊", "🍋", "🍇", "💎", "7️⃣"]
+            weights = [0.3, 0.25, 0.2, 0.15, 0.07, 0.03]
+
+            # Get three random symbols
+            result = [random.choices(symbols, weights=weights)[0] for _ in range(3)]
+            debug_logger.info(f"Slot results: {result}")
+
+            # Calculate winnings
+            winnings = 0
+            if result[0] == result[1] == result[2]:  # All three match
+                if result[0] == "7️⃣":
+                    winnings = amount * 10  # Jackpot
+                    debug_logger.info("JACKPOT! Triple 7s")
+                elif result[0] == "💎":
+                    winnings = amount * 5
+                    debug_logger.info("Big win! Triple diamonds")
+                else:
+                    winnings = amount * 3
+                    debug_logger.info(f"Good win! Triple {result[0]}")
+            elif result[0] == result[1] or result[1] == result[2]:  # Two match
+                winnings = amount * 1.5
+                debug_logger.info("Small win! Two matching symbols")
+
+            # Round winnings to integer
+            winnings = int(winnings)
+            debug_logger.info(f"Total winnings: {winnings}")
+
+            try:
+                user = await economy_repo.settle_bet(
+                    *self._identity(interaction.user), amount, winnings - amount, "Slots game"
                 )
-                db.session.add(transaction)
-                
-                # Explicitly commit changes
-                debug_logger.info("Committing changes to database...")
-                db.session.commit()
-                debug_logger.info("Database commit successful")
-
-            # Get the latest user data after commit for verification
-            with self.app.app_context():
-                updated_user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                debug_logger.info(f"Updated wallet after commit: {updated_user.wallet}")
+            except EconomyError as e:
+                await interaction.followup.send(embed=create_error_embed("Error", str(e)), ephemeral=True)
+                return
+            debug_logger.info(f"Updated wallet after commit: {user.wallet}")
 
             # Create result message
             display = " ".join(result)
@@ -1063,41 +711,38 @@ class Economy(commands.Cog):
             embed = create_embed(title, description, color=color)
             await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Error in slots command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "slots", e)
+
+    async def _shop_embed(self, prefix: str):
+        """Build the shop listing embed, or None if nothing is for sale"""
+        items = await economy_repo.list_shop_items()
+        if not items:
+            return None
+
+        embed = create_embed(
+            "🛍️ Item Shop",
+            "Here are the items available for purchase:"
+        )
+        for item in items:
+            embed.add_field(
+                name=f"{item.emoji} {item.name} - {item.price} coins",
+                value=item.description,
+                inline=False
+            )
+        embed.set_footer(text=f"Use {prefix}buy <item> to purchase an item")
+        return embed
 
     @commands.command(name="shop")
     async def shop_prefix(self, ctx):
         """View available items in the shop (prefix version)"""
         try:
-            # Use app context for database operations
-            with self.app.app_context():
-                items = Item.query.filter_by(is_buyable=True).all()
-                
-                if not items:
-                    await ctx.send(
-                        embed=create_error_embed("Shop", "No items available in the shop right now")
-                    )
-                    return
-                    
-                embed = create_embed(
-                    "🛍️ Item Shop",
-                    "Here are the items available for purchase:"
+            embed = await self._shop_embed("!")
+            if not embed:
+                await ctx.send(
+                    embed=create_error_embed("Shop", "No items available in the shop right now")
                 )
-                
-                for item in items:
-                    embed.add_field(
-                        name=f"{item.emoji} {item.name} - {item.price} coins",
-                        value=item.description,
-                        inline=False
-                    )
-                    
-                embed.set_footer(text="Use !buy <item> to purchase an item")
-                await ctx.send(embed=embed)
+                return
+            await ctx.send(embed=embed)
         except Exception as e:
             logger.error(f"Error in shop prefix command: {str(e)}")
             await ctx.send(f"An error occurred: {str(e)}")
@@ -1109,102 +754,33 @@ class Economy(commands.Cog):
             # First acknowledge the interaction to prevent timeouts
             await interaction.response.defer()
             
-            # Use app context for database operations
-            with self.app.app_context():
-                items = Item.query.filter_by(is_buyable=True).all()
-
-                if not items:
-                    await interaction.followup.send(
-                        embed=create_error_embed("Shop", "No items available in the shop right now"),
-                        ephemeral=True
-                    )
-                    return
-
-                embed = create_embed(
-                    "🛍️ Item Shop",
-                    "Here are the items available for purchase:"
+            embed = await self._shop_embed("/")
+            if not embed:
+                await interaction.followup.send(
+                    embed=create_error_embed("Shop", "No items available in the shop right now"),
+                    ephemeral=True
                 )
-
-                for item in items:
-                    embed.add_field(
-                        name=f"{item.emoji} {item.name} - {item.price} coins",
-                        value=item.description,
-                        inline=False
-                    )
-
-                embed.set_footer(text="Use /buy <item> to purchase an item")
-                await interaction.followup.send(embed=embed)
+                return
+            await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Error in shop command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "shop", e)
 
     @commands.command(name="buy")
     async def buy_prefix(self, ctx, *, item_name: str):
         """Buy an item from the shop (prefix version)"""
         try:
-            # Use app context for database operations
-            with self.app.app_context():
-                item = Item.query.filter_by(name=item_name, is_buyable=True).first()
-                if not item:
-                    await ctx.send(
-                        embed=create_error_embed("Error", "That item doesn't exist or isn't available")
-                    )
-                    return
-                    
-                user = await self.get_user_economy(
-                    str(ctx.author.id),
-                    username=ctx.author.name,
-                    display_name=ctx.author.display_name
-                )
-                if user.wallet < item.price:
-                    await ctx.send(
-                        embed=create_error_embed("Error", "You don't have enough coins to buy this item")
-                    )
-                    return
-                    
-                # Add item to inventory
-                inventory = Inventory.query.filter_by(
-                    user_id=str(ctx.author.id),
-                    item_id=item.id
-                ).first()
-                
-                if inventory:
-                    inventory.quantity += 1
-                else:
-                    inventory = Inventory(
-                        user_id=str(ctx.author.id),
-                        username=ctx.author.name,
-                        display_name=ctx.author.display_name,
-                        item_id=item.id,
-                        quantity=1
-                    )
-                    db.session.add(inventory)
-                    
-                # Deduct coins
-                user.wallet -= item.price
-                
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(ctx.author.id),
-                    username=ctx.author.name,
-                    display_name=ctx.author.display_name,
-                    amount=-item.price,
-                    description=f"Bought {item.name}"
-                )
-                db.session.add(transaction)
-                db.session.commit()
-                
-                embed = create_embed(
-                    "✅ Purchase Successful",
-                    f"You bought {item.emoji} {item.name} for {item.price} coins!",
-                    color=0x43B581
-                )
+            try:
+                item = await economy_repo.buy_item(*self._identity(ctx.author), item_name)
+            except EconomyError as e:
+                await ctx.send(embed=create_error_embed("Error", str(e)))
+                return
                 
-                await ctx.send(embed=embed)
+            embed = create_embed(
+                "✅ Purchase Successful",
+                f"You bought {item.emoji} {item.name} for {item.price} coins!",
+                color=0x43B581
+            )
+            await ctx.send(embed=embed)
         except Exception as e:
             logger.error(f"Error in buy prefix command: {str(e)}")
             await ctx.send(f"An error occurred: {str(e)}")
@@ -1219,127 +795,61 @@ class Economy(commands.Cog):
             
             debug_logger.info(f"Processing buy command for user ID: {interaction.user.id}, item: {item_name}")
             
-            # Use app context for database operations
-            with self.app.app_context():
-                # Find the item
-                item = Item.query.filter_by(name=item_name, is_buyable=True).first()
-                if not item:
-                    debug_logger.info(f"Item not found or not buyable: {item_name}")
-                    await interaction.followup.send(
-                        embed=create_error_embed("Error", "That item doesn't exist or isn't available"),
-                        ephemeral=True
-                    )
-                    return
-                
-                debug_logger.info(f"Item found: {item.name}, price: {item.price}")
-
-                # Get fresh user data
-                user = UserEconomy.query.filter_by(user_id=str(interaction.user.id)).first()
-                if not user:
-                    debug_logger.info(f"Creating new economy profile for user {interaction.user.id}")
-                    user = UserEconomy(
-                        user_id=str(interaction.user.id),
-                        wallet=0,
-                        bank=0,
-                        bank_capacity=1000
-                    )
-                    db.session.add(user)
-                    db.session.commit()
-                
-                debug_logger.info(f"User data - wallet: {user.wallet}, bank: {user.bank}")
-                
-                # Check if user has enough money
-                if user.wallet < item.price:
-                    debug_logger.info(f"Insufficient funds: {user.wallet} < {item.price}")
-                    await interaction.followup.send(
-                        embed=create_error_embed("Error", "You don't have enough coins to buy this item"),
-                        ephemeral=True
-                    )
-                    return
-
-                # Add item to inventory
-                inventory = Inventory.query.filter_by(
-                    user_id=str(interaction.user.id),
-                    item_id=item.id
-                ).first()
-
-                if inventory:
-                    inventory.quantity += 1
-                    debug_logger.info(f"Updated inventory quantity to: {inventory.quantity}")
-                else:
-                    inventory = Inventory(
-                        user_id=str(interaction.user.id),
-                        username=interaction.user.name,
-                        display_name=interaction.user.display_name,
-                        item_id=item.id,
-                        quantity=1
-                    )
-                    db.session.add(inventory)
-                    debug_logger.info("Added new inventory entry")
-
-                # Deduct coins
-                user.wallet -= item.price
-                debug_logger.info(f"Updated wallet: {user.wallet}")
-
-                # Record transaction
-                transaction = Transaction(
-                    user_id=str(interaction.user.id),
-                    username=interaction.user.name,
-                    display_name=interaction.user.display_name,
-                    amount=-item.price,
-                    description=f"Bought {item.name}"
-                )
-                db.session.add(transaction)
-                
-                # Explicitly commit changes
-                debug_logger.info("Committing changes to database...")
-                db.session.commit()
-                debug_logger.info("Database commit successful")
+            try:
+                item = await economy_repo.buy_item(*self._identity(interaction.user), item_name)
+            except EconomyError as e:
+                debug_logger.info(f"Purchase refused: {str(e)}")
+                await interaction.followup.send(embed=create_error_embed("Error", str(e)), ephemeral=True)
+                return
 
-                embed = create_embed(
-                    "✅ Purchase Successful",
-                    f"You bought {item.emoji} {item.name} for {item.price} coins!",
-                    color=0x43B581
-                )
-                
-                await interaction.followup.send(embed=embed)
+            embed = create_embed(
+                "✅ Purchase Successful",
+                f"You bought {item.emoji} {item.name} for {item.price} coins!",
+                color=0x43B581
+            )
+            await interaction.followup.send(embed=embed)
         except Exception as e:
-            logger.error(f"Error in buy command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "buy", e)
+
+    @buy.autocomplete("item_name")
+    async def buy_item_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        """Suggest shop items matching what has been typed so far"""
+        catalog = await item_catalog.get_catalog()
+        return [
+            app_commands.Choice(name=f"{item.name} - {item.price} coins", value=item.name)
+            for item in catalog.search(current)
+        ]
+
+    async def _inventory_embed(self, user_id: str):
+        """Build the inventory embed, or None if the inventory is empty"""
+        inventory_items = await economy_repo.get_inventory(user_id)
+        debug_logger.info(f"Found {len(inventory_items)} inventory items")
+        if not inventory_items:
+            return None
+
+        embed = create_embed(
+            "🎒 Your Inventory",
+            "Here are your items:"
+        )
+        for inv in inventory_items:
+            embed.add_field(
+                name=f"{inv.item.emoji} {inv.item.name} x{inv.quantity}",
+                value=inv.item.description,
+                inline=False
+            )
+        return embed
 
     @commands.command(name="inventory", aliases=["inv"])
     async def inventory_prefix(self, ctx):
         """View your inventory (prefix version)"""
         try:
-            # Use app context for database operations
-            with self.app.app_context():
-                inventory_items = Inventory.query.filter_by(
-                    user_id=str(ctx.author.id)
-                ).all()
-                
-                if not inventory_items:
-                    await ctx.send(
-                        embed=create_error_embed("Inventory", "Your inventory is empty")
-                    )
-                    return
-                    
-                embed = create_embed(
-                    "🎒 Your Inventory",
-                    "Here are your items:"
+            embed = await self._inventory_embed(str(ctx.author.id))
+            if not embed:
+                await ctx.send(
+                    embed=create_error_embed("Inventory", "Your inventory is empty")
                 )
-                
-                for inv in inventory_items:
-                    embed.add_field(
-                        name=f"{inv.item.emoji} {inv.item.name} x{inv.quantity}",
-                        value=inv.item.description,
-                        inline=False
-                    )
-                    
-                await ctx.send(embed=embed)
+                return
+            await ctx.send(embed=embed)
         except Exception as e:
             logger.error(f"Error in inventory prefix command: {str(e)}")
             await ctx.send(f"An error occurred: {str(e)}")
@@ -1353,44 +863,172 @@ class Economy(commands.Cog):
             
             debug_logger.info(f"Processing inventory command for user ID: {interaction.user.id}")
             
-            # Use app context for database operations
-            with self.app.app_context():
-                inventory_items = Inventory.query.filter_by(
-                    user_id=str(interaction.user.id)
-                ).all()
-                
-                debug_logger.info(f"Found {len(inventory_items)} inventory items")
+            embed = await self._inventory_embed(str(interaction.user.id))
+            if not embed:
+                await interaction.followup.send(
+                    embed=create_error_embed("Inventory", "Your inventory is empty"),
+                    ephemeral=True
+                )
+                return
+            await interaction.followup.send(embed=embed)
+        except Exception as e:
+            await self._send_interaction_error(interaction, "inventory", e)
+
+    async def _leaderboard_embed(self, guild) -> discord.Embed:
+        """Build the leaderboard embed for a guild's members, or everyone if guild is None"""
+        member_ids = {str(member.id) for member in guild.members} if guild else None
+        rows = await economy_repo.get_leaderboard(LEADERBOARD_SIZE, member_ids, str(guild.id) if guild else None)
+        title = f"🏆 {guild.name} Leaderboard" if guild else "🏆 Global Leaderboard"
+        if not rows:
+            return create_error_embed("Leaderboard", "Nobody has any coins yet")
+
+        lines = []
+        for rank, (user_id, total) in enumerate(rows, start=1):
+            member = guild.get_member(int(user_id)) if guild else None
+            user = member or self.bot.get_user(int(user_id))
+            name = user.display_name if user else f"User {user_id}"
+            lines.append(f"**{rank}.** {name} - {total} coins")
+        return create_embed(title, "\n".join(lines))
+
+    @commands.command(name="leaderboard", aliases=["lb", "rich"])
+    async def leaderboard_prefix(self, ctx, scope: str = "server"):
+        """Show the richest users in this server, or "global" (prefix version)"""
+        try:
+            guild = None if scope.lower() == "global" else ctx.guild
+            await ctx.send(embed=await self._leaderboard_embed(guild))
+        except Exception as e:
+            logger.error(f"Error in leaderboard prefix command: {str(e)}")
+            await ctx.send(f"An error occurred: {str(e)}")
 
-                if not inventory_items:
-                    debug_logger.info("User has empty inventory")
-                    await interaction.followup.send(
-                        embed=create_error_embed("Inventory", "Your inventory is empty"),
-                        ephemeral=True
-                    )
-                    return
+    @app_commands.command(name="leaderboard", description="Show the richest users")
+    @app_commands.describe(scope="This server's members or every user of the bot")
+    async def leaderboard(self, interaction: discord.Interaction, scope: Literal["server", "global"] = "server"):
+        """Show the richest users"""
+        try:
+            # First acknowledge the interaction to prevent timeouts
+            await interaction.response.defer()
 
-                embed = create_embed(
-                    "🎒 Your Inventory",
-                    "Here are your items:"
+            guild = None if scope == "global" else interaction.guild
+            await interaction.followup.send(embed=await self._leaderboard_embed(guild))
+        except Exception as e:
+            await self._send_interaction_error(interaction, "leaderboard", e)
+
+    async def _transactions_embed(self, user, page, page_number: int) -> discord.Embed:
+        """Build the embed for one page of a user's transaction history"""
+        embed = create_embed("📜 Transaction History", f"Recent transactions for {user.display_name}")
+        lines = [
+            f"`{transaction.timestamp:%Y-%m-%d %H:%M}` **{transaction.amount:+}** {transaction.description or ''}"
+            for transaction in page.transactions
+        ]
+        if lines:
+            embed.add_field(name=f"Page {page_number}", value="\n".join(lines), inline=False)
+
+        if page.next_cursor is None:
+            # Last page: mention anything already compacted into daily totals
+            days, count, net, latest_day = await economy_repo.get_compacted_summary(str(user.id))
+            if days:
+                embed.add_field(
+                    name="Older history",
+                    value=f"{count} transactions over {days} days up to {latest_day}, net {net:+} coins",
+                    inline=False
                 )
+            elif not lines:
+                embed.description = "You don't have any transactions yet"
+        return embed
+
+    async def _transactions_message(self, user) -> tuple:
+        """The first history page as (embed, view)"""
+        page = await economy_repo.get_transaction_page(str(user.id), TRANSACTIONS_PAGE_SIZE)
+        view = TransactionHistoryView(self, user, page)
+        return await self._transactions_embed(user, page, 1), view
+
+    @commands.command(name="transactions", aliases=["history"])
+    async def transactions_prefix(self, ctx):
+        """View your transaction history (prefix version)"""
+        try:
+            embed, view = await self._transactions_message(ctx.author)
+            await ctx.send(embed=embed, view=view)
+        except Exception as e:
+            logger.error(f"Error in transactions prefix command: {str(e)}")
+            await ctx.send(f"An error occurred: {str(e)}")
 
-                for inv in inventory_items:
-                    debug_logger.info(f"Adding item to embed: {inv.item.name}, quantity: {inv.quantity}")
-                    embed.add_field(
-                        name=f"{inv.item.emoji} {inv.item.name} x{inv.quantity}",
-                        value=inv.item.description,
-                        inline=False
-                    )
+    @app_commands.command(name="transactions", description="View your transaction history")
+    async def transactions(self, interaction: discord.Interaction):
+        """View your transaction history"""
+        try:
+            # First acknowledge the interaction to prevent timeouts
+            await interaction.response.defer(ephemeral=True)
 
-                debug_logger.info("Sending inventory response")
-                await interaction.followup.send(embed=embed)
+            embed, view = await self._transactions_message(interaction.user)
+            await interaction.followup.send(embed=embed, view=view, ephemeral=True)
         except Exception as e:
-            logger.error(f"Error in inventory command: {str(e)}")
-            # If we haven't responded yet, respond with the error
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            await self._send_interaction_error(interaction, "transactions", e)
+
+    async def _owner_only(self, interaction: discord.Interaction) -> bool:
+        """Reply with an error unless the user is a bot owner"""
+        if is_bot_owner(interaction.user.id):
+            return True
+        await interaction.response.send_message(
+            embed=create_error_embed("Access Denied", "Only the bot owner can use this command."),
+            ephemeral=True
+        )
+        return False
+
+    @staticmethod
+    def _bulk_credit_embed(title: str, result, dry_run: bool) -> discord.Embed:
+        """Report an economy-wide credit"""
+        if dry_run:
+            return create_embed(
+                f"{title} (dry run)",
+                f"Would mint {result.minted} coins for {result.users} users. Nothing was changed."
+            )
+        return create_embed(title, f"Minted {result.minted} coins for {result.users} users.", color=0x43B581)
+
+    @app_commands.command(name="interest", description="Pay bank interest to every user (bot owner only)")
+    @app_commands.describe(
+        rate_bps="Interest rate in basis points (100 = 1%); defaults to the daily rate",
+        dry_run="Only report what would be paid"
+    )
+    async def interest(self, interaction: discord.Interaction, rate_bps: int = None, dry_run: bool = True):
+        """Pay bank interest to every user"""
+        if not await self._owner_only(interaction):
+            return
+        try:
+            await interaction.response.defer(ephemeral=True)
+            rate = economy_repo.BANK_INTEREST_BPS if rate_bps is None else rate_bps
+            if rate <= 0:
+                await interaction.followup.send(embed=create_error_embed("Error", "Rate must be positive"), ephemeral=True)
+                return
+            result = await economy_repo.apply_bank_interest(rate, dry_run=dry_run)
+            logger.info(f"{interaction.user.name} ran bank interest at {rate} bps (dry run: {dry_run}): {result}")
+            await interaction.followup.send(embed=self._bulk_credit_embed("🏦 Bank Interest", result, dry_run), ephemeral=True)
+        except EconomyError as e:
+            await interaction.followup.send(embed=create_error_embed("Error", str(e)), ephemeral=True)
+        except Exception as e:
+            await self._send_interaction_error(interaction, "interest", e)
+
+    @app_commands.command(name="payout", description="Give every user coins for an event (bot owner only)")
+    @app_commands.describe(
+        amount="Coins to give each user",
+        reason="Shown in everyone's transaction history",
+        dry_run="Only report what would be paid"
+    )
+    async def payout(self, interaction: discord.Interaction, amount: int, reason: str = "Event payout", dry_run: bool = True):
+        """Give every user coins for an event"""
+        if not await self._owner_only(interaction):
+            return
+        try:
+            await interaction.response.defer(ephemeral=True)
+            if amount <= 0:
+                await interaction.followup.send(embed=create_error_embed("Error", "Amount must be positive"), ephemeral=True)
+                return
+            result = await economy_repo.apply_payout(amount, reason, dry_run=dry_run)
+            logger.info(f"{interaction.user.name} ran payout of {amount} (dry run: {dry_run}): {result}")
+            await interaction.followup.send(embed=self._bulk_credit_embed("🎉 Event Payout", result, dry_run), ephemeral=True)
+        except EconomyError as e:
+            await interaction.followup.send(embed=create_error_embed("Error", str(e)), ephemeral=True)
+        except Exception as e:
+            await self._send_interaction_error(interaction, "payout", e)
 
 async def setup(bot):
     try:
@@ -1411,7 +1049,7 @@ async def setup(bot):
         debug_logger.info(f"Registered global commands: {', '.join(command_names)}")
         
         # Check if economy commands are registered
-        economy_commands = ['balance', 'daily', 'work', 'deposit', 'withdraw', 'rob', 'shop', 'buy', 'inventory']
+        economy_commands = ['balance', 'daily', 'work', 'deposit', 'withdraw', 'rob', 'shop', 'buy', 'inventory', 'leaderboard', 'transactions', 'pay']
         missing_commands = [cmd for cmd in economy_commands if cmd not in command_names]
         
         if missing_commands:
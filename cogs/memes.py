@@ -1,12 +1,12 @@
 import discord
 import logging
 import random
-import aiohttp
 import asyncio
 from collections import deque
 from discord import app_commands
 from discord.ext import commands
 from utils.embed_helpers import create_embed, create_error_embed
+from utils import http_client
 
 logger = logging.getLogger('discord')
 
@@ -22,6 +22,14 @@ class Memes(commands.Cog):
         # Store last 10 meme IDs to prevent duplicates
         self.meme_history = deque(maxlen=10)
 
+    async def cog_load(self):
+        """Share the bot's pooled HTTP sessions"""
+        http_client.acquire()
+
+    async def cog_unload(self):
+        """Release the shared HTTP sessions"""
+        await http_client.release()
+
     async def get_unique_meme(self):
         """Fetch a meme that hasn't been shown in the last 10 memes"""
         max_attempts = 8  # Increased max attempts
@@ -92,31 +100,31 @@ class Memes(commands.Cog):
             subreddit = random.choice(self.meme_subreddits)
             logger.info(f"Fetching meme from meme-api.com, subreddit: {subreddit}")
             
-            async with aiohttp.ClientSession() as session:
-                request_url = f'https://meme-api.com/gimme/{subreddit}'
-                logger.info(f"Making request to: {request_url}")
+            session = http_client.get_session("memes")
+            request_url = f'https://meme-api.com/gimme/{subreddit}'
+            logger.info(f"Making request to: {request_url}")
                 
-                async with session.get(request_url, timeout=5) as response:
-                    logger.info(f"Response status: {response.status}")
+            async with session.get(request_url) as response:
+                logger.info(f"Response status: {response.status}")
                     
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info(f"Received meme data: Title: {data.get('title', 'No title')}")
+                if response.status == 200:
+                    data = await response.json()
+                    logger.info(f"Received meme data: Title: {data.get('title', 'No title')}")
                         
-                        meme_id = data.get('postLink', '')  # Use post link as unique identifier
-                        if not meme_id:
-                            logger.warning(f"Meme data missing postLink: {data}")
-                            return None
+                    meme_id = data.get('postLink', '')  # Use post link as unique identifier
+                    if not meme_id:
+                        logger.warning(f"Meme data missing postLink: {data}")
+                        return None
                             
-                        # If meme hasn't been shown recently, use it
-                        if meme_id not in self.meme_history:
-                            self.meme_history.append(meme_id)
-                            return data
-                        else:
-                            logger.info(f"Skipping duplicate meme: {meme_id}")
+                    # If meme hasn't been shown recently, use it
+                    if meme_id not in self.meme_history:
+                        self.meme_history.append(meme_id)
+                        return data
                     else:
-                        error_text = await response.text()
-                        logger.error(f"Error response from meme API: Status {response.status}, Response: {error_text}")
+                        logger.info(f"Skipping duplicate meme: {meme_id}")
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Error response from meme API: Status {response.status}, Response: {error_text}")
         except Exception as e:
             logger.error(f"Error in primary meme API: {str(e)}")
             
@@ -132,101 +140,101 @@ class Memes(commands.Cog):
                 logger.info(f"Fetching meme from Reddit JSON API, subreddit: {subreddit}")
                 
                 try:
-                    async with aiohttp.ClientSession() as session:
-                        # Try different Reddit sort methods (hot, top, rising)
-                        sort_methods = ['hot', 'top', 'rising']
-                        sort_method = random.choice(sort_methods)
+                    session = http_client.get_session("memes")
+                    # Try different Reddit sort methods (hot, top, rising)
+                    sort_methods = ['hot', 'top', 'rising']
+                    sort_method = random.choice(sort_methods)
                         
-                        # Using Reddit's JSON API directly
-                        request_url = f'https://www.reddit.com/r/{subreddit}/{sort_method}.json?limit=20'
-                        headers = {
-                            'User-Agent': 'discord-bot:v1.0 (by /u/DiscordBot)'
-                        }
+                    # Using Reddit's JSON API directly
+                    request_url = f'https://www.reddit.com/r/{subreddit}/{sort_method}.json?limit=20'
+                    headers = {
+                        'User-Agent': 'discord-bot:v1.0 (by /u/DiscordBot)'
+                    }
                         
-                        logger.info(f"Making request to Reddit API: {request_url}")
-                        async with session.get(request_url, headers=headers, timeout=5) as response:
-                            logger.info(f"Reddit API response status: {response.status}")
+                    logger.info(f"Making request to Reddit API: {request_url}")
+                    async with session.get(request_url, headers=headers) as response:
+                        logger.info(f"Reddit API response status: {response.status}")
                             
-                            if response.status == 200:
-                                data = await response.json()
+                        if response.status == 200:
+                            data = await response.json()
                                 
-                                if 'data' not in data or 'children' not in data['data']:
-                                    logger.warning(f"Unexpected Reddit API response format for r/{subreddit}")
-                                    continue
+                            if 'data' not in data or 'children' not in data['data']:
+                                logger.warning(f"Unexpected Reddit API response format for r/{subreddit}")
+                                continue
                                     
-                                posts = data['data']['children']
+                            posts = data['data']['children']
                                 
-                                if not posts:
-                                    logger.warning(f"No posts found in r/{subreddit}")
-                                    continue
+                            if not posts:
+                                logger.warning(f"No posts found in r/{subreddit}")
+                                continue
                                 
-                                # Filter out pinned posts, non-image posts, etc.
-                                # More flexible filtering to accept more post types
-                                valid_posts = []
+                            # Filter out pinned posts, non-image posts, etc.
+                            # More flexible filtering to accept more post types
+                            valid_posts = []
                                 
-                                for post in posts:
-                                    post_data = post.get('data', {})
+                            for post in posts:
+                                post_data = post.get('data', {})
                                     
-                                    # Skip stickied or self posts
-                                    if post_data.get('stickied', False) or post_data.get('is_self', True):
-                                        continue
+                                # Skip stickied or self posts
+                                if post_data.get('stickied', False) or post_data.get('is_self', True):
+                                    continue
                                     
-                                    # Check if it's an image
-                                    is_image = False
+                                # Check if it's an image
+                                is_image = False
                                     
-                                    # Method 1: Check post_hint
-                                    if post_data.get('post_hint', '') == 'image':
+                                # Method 1: Check post_hint
+                                if post_data.get('post_hint', '') == 'image':
+                                    is_image = True
+                                # Method 2: Check URL extension
+                                elif 'url' in post_data:
+                                    url = post_data['url'].lower()
+                                    if url.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
+                                        is_image = True
+                                # Method 3: Check domain
+                                elif 'domain' in post_data:
+                                    domain = post_data['domain'].lower()
+                                    if 'imgur' in domain or 'redd.it' in domain:
                                         is_image = True
-                                    # Method 2: Check URL extension
-                                    elif 'url' in post_data:
-                                        url = post_data['url'].lower()
-                                        if url.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
-                                            is_image = True
-                                    # Method 3: Check domain
-                                    elif 'domain' in post_data:
-                                        domain = post_data['domain'].lower()
-                                        if 'imgur' in domain or 'redd.it' in domain:
-                                            is_image = True
                                     
-                                    if is_image:
-                                        valid_posts.append(post_data)
+                                if is_image:
+                                    valid_posts.append(post_data)
                                 
-                                if not valid_posts:
-                                    logger.warning(f"No valid image posts found in r/{subreddit}")
-                                    continue
+                            if not valid_posts:
+                                logger.warning(f"No valid image posts found in r/{subreddit}")
+                                continue
                                     
-                                # Shuffle and try posts until we find one not in history
-                                random.shuffle(valid_posts)
+                            # Shuffle and try posts until we find one not in history
+                            random.shuffle(valid_posts)
                                 
-                                for post in valid_posts:
-                                    # Create a response in the same format as meme-api
-                                    if 'permalink' not in post or 'title' not in post or 'url' not in post:
-                                        logger.warning(f"Post missing required fields: {post.keys()}")
-                                        continue
+                            for post in valid_posts:
+                                # Create a response in the same format as meme-api
+                                if 'permalink' not in post or 'title' not in post or 'url' not in post:
+                                    logger.warning(f"Post missing required fields: {post.keys()}")
+                                    continue
                                         
-                                    meme_id = post['permalink']
+                                meme_id = post['permalink']
                                     
-                                    if meme_id in self.meme_history:
-                                        logger.info(f"Skipping duplicate Reddit meme: {meme_id}")
-                                        continue
+                                if meme_id in self.meme_history:
+                                    logger.info(f"Skipping duplicate Reddit meme: {meme_id}")
+                                    continue
                                         
-                                    # Add to history
-                                    self.meme_history.append(meme_id)
+                                # Add to history
+                                self.meme_history.append(meme_id)
                                     
-                                    formatted_data = {
-                                        'title': post['title'],
-                                        'url': post['url'],
-                                        'subreddit': subreddit,
-                                        'postLink': f"https://reddit.com{post['permalink']}",
-                                        'author': post.get('author', 'unknown'),
-                                        'ups': post.get('ups', 0)
-                                    }
+                                formatted_data = {
+                                    'title': post['title'],
+                                    'url': post['url'],
+                                    'subreddit': subreddit,
+                                    'postLink': f"https://reddit.com{post['permalink']}",
+                                    'author': post.get('author', 'unknown'),
+                                    'ups': post.get('ups', 0)
+                                }
                                     
-                                    logger.info(f"Successfully retrieved Reddit meme: {formatted_data['title']}")
-                                    return formatted_data
-                            else:
-                                error_text = await response.text()
-                                logger.error(f"Error from Reddit API: Status {response.status}, Response: {error_text}")
+                                logger.info(f"Successfully retrieved Reddit meme: {formatted_data['title']}")
+                                return formatted_data
+                        else:
+                            error_text = await response.text()
+                            logger.error(f"Error from Reddit API: Status {response.status}, Response: {error_text}")
                 except Exception as inner_e:
                     logger.error(f"Error fetching from subreddit {subreddit}: {str(inner_e)}")
                     # Continue to next subreddit
@@ -10,6 +10,7 @@ from discord.ext import commands
 from datetime import timedelta
 from utils.embed_helpers import create_embed, create_error_embed
 from utils.permissions import PermissionChecks, is_mod, is_admin, is_bot_owner
+from utils.config_store import JSONConfigStore
 
 logger = logging.getLogger('discord')
 
@@ -21,6 +22,7 @@ class Moderation(commands.Cog):
         self.prisoner_role_id = 1355679559625867435  # Placeholder for prisoner role ID
         # Try to load from config file if it exists
         self.config_file = 'data/prisoner_role.json'
+        self.store = JSONConfigStore(self.config_file, lambda: {'prisoner_role_id': self.prisoner_role_id}, indent=None)
         self._load_prisoner_role_config()
         logger.info("Moderation cog initialized")
         
@@ -36,16 +38,13 @@ class Moderation(commands.Cog):
             logger.error(f"Failed to load prisoner role config: {e}")
             
     def _save_prisoner_role_config(self):
-        """Save prisoner role configuration to file"""
-        try:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            
-            with open(self.config_file, 'w') as f:
-                json.dump({'prisoner_role_id': self.prisoner_role_id}, f)
-                logger.info(f"Saved prisoner role ID: {self.prisoner_role_id}")
-        except Exception as e:
-            logger.error(f"Failed to save prisoner role config: {e}")
+        """Schedule a (debounced, atomic) save of the prisoner role configuration"""
+        self.store.save()
+        logger.info(f"Queued save of prisoner role ID: {self.prisoner_role_id}")
+
+    async def cog_unload(self):
+        """Flush pending config changes when the cog is unloaded"""
+        await self.store.close()
 
     @commands.command(name="kick")
     @commands.check_any(commands.has_permissions(kick_members=True), PermissionChecks.is_mod())
@@ -6,16 +6,76 @@ import os
 import datetime
 from discord.ext import commands
 from discord import app_commands
+from utils.config_store import JSONConfigStore
+from utils.message_pipeline import get_pipeline, InspectedMessage, Verdict, PRIORITY_PROFANITY
+from models.moderation import SOURCE_PROFANITY, add_to_aggregate
+from repositories import moderation as moderation_repo
+from database import db
 
 logger = logging.getLogger('discord')
 
+def _trie_pattern(node):
+    """Turn a character trie into a regex fragment that shares common prefixes"""
+    alternatives = []
+    single_chars = []
+    optional = False
+
+    for char in sorted(node):
+        if char == "":
+            optional = True
+            continue
+        sub = _trie_pattern(node[char])
+        if sub is None:
+            single_chars.append(re.escape(char))
+        else:
+            alternatives.append(re.escape(char) + sub)
+
+    if not alternatives and not single_chars:
+        return None
+
+    only_chars = not alternatives
+    if single_chars:
+        alternatives.append(single_chars[0] if len(single_chars) == 1 else "[" + "".join(single_chars) + "]")
+
+    result = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    if optional:
+        result = result + "?" if only_chars else "(?:" + result + ")?"
+    return result
+
+def compile_word_matcher(words):
+    """Compile a word list into one whole-word regex, or None for an empty list
+
+    The words are folded into a trie first so matching cost stays roughly
+    flat as the list grows, instead of trying every word at every position.
+    """
+    trie = {}
+    for word in words:
+        word = word.casefold()
+        if not word:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    body = _trie_pattern(trie)
+    if body is None:
+        return None
+    return re.compile(r"\b" + body + r"\b")
+
 class ProfanityFilter(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.blocked_words = []
+        self.blocked_words = []  # Default list for guilds without their own
+        self.guild_blocked_words = {}  # Per guild word lists
         self.filter_enabled = {}  # Per guild setting
-        self.warning_count = {}  # Track warnings per user
+        self._legacy_warning_count = {}  # Warnings from old configs not yet moved to the database
         self.config_file = "data/profanity_config.json"
+        self._matchers = {}  # Compiled matcher cache, keyed by guild ID (None = default list)
+        self.store = JSONConfigStore(self.config_file, self._config_data, indent=2)
+        # Import app here to avoid circular imports
+        from app import app
+        self.app = app
         self.load_config()
 
     def load_config(self):
@@ -28,9 +88,11 @@ class ProfanityFilter(commands.Cog):
                 with open(self.config_file, 'r') as f:
                     config = json.load(f)
                     self.blocked_words = config.get('blocked_words', [])
+                    self.guild_blocked_words = config.get('guild_blocked_words', {})
                     self.filter_enabled = config.get('filter_enabled', {})
-                    self.warning_count = config.get('warning_count', {})
-                    logger.info(f"Loaded profanity filter config with {len(self.blocked_words)} blocked words")
+                    self._legacy_warning_count = config.get('warning_count', {})
+                    logger.info(f"Loaded profanity filter config with {len(self.blocked_words)} default blocked words "
+                                f"and {len(self.guild_blocked_words)} server word lists")
                     
                     # Add logging for current filter settings
                     enabled_count = sum(1 for val in self.filter_enabled.values() if val == True)
@@ -40,12 +102,19 @@ class ProfanityFilter(commands.Cog):
                 logger.error(f"Error loading profanity filter config: {str(e)}")
                 # Initialize with empty defaults
                 self.blocked_words = []
+                self.guild_blocked_words = {}
                 self.filter_enabled = {}
-                self.warning_count = {}
         else:
             logger.info("No profanity filter config found, creating new one")
             self.save_config()  # Create initial empty config
             
+        # Warning counts now live in the moderation_event table
+        if self._legacy_warning_count:
+            self.migrate_legacy_warnings()
+            
+        # Word lists may have changed, so drop every compiled matcher
+        self._matchers.clear()
+            
         # Pre-initialize filter enabled status for all current servers if not set
         if self.bot.is_ready():
             for guild in self.bot.guilds:
@@ -58,19 +127,79 @@ class ProfanityFilter(commands.Cog):
             # Save any changes we made
             self.save_config()
 
-    def save_config(self):
-        """Save current configuration to file"""
+    def _config_data(self):
+        """Current configuration as written to the config file"""
+        config = {
+            'blocked_words': self.blocked_words,
+            'guild_blocked_words': self.guild_blocked_words,
+            'filter_enabled': self.filter_enabled
+        }
+        # Keep warnings that could not be migrated yet so they aren't lost
+        if self._legacy_warning_count:
+            config['warning_count'] = self._legacy_warning_count
+        return config
+
+    def migrate_legacy_warnings(self):
+        """Move warning counts from the JSON config into the moderation tables"""
         try:
-            config = {
-                'blocked_words': self.blocked_words,
-                'filter_enabled': self.filter_enabled,
-                'warning_count': self.warning_count
-            }
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=2)
-            logger.info("Saved profanity filter configuration")
+            with self.app.app_context():
+                migrated = 0
+                for guild_id, users in self._legacy_warning_count.items():
+                    for user_id, count in users.items():
+                        if count > 0:
+                            # Old counts have no timestamps, so they go straight into the aggregate
+                            add_to_aggregate(guild_id, user_id, SOURCE_PROFANITY, None, count)
+                            migrated += 1
+                db.session.commit()
+            logger.info(f"Migrated profanity warnings for {migrated} users from config to the database")
+            self._legacy_warning_count = {}
+            self.save_config()
         except Exception as e:
-            logger.error(f"Error saving profanity filter config: {str(e)}")
+            logger.error(f"Error migrating profanity warnings to the database: {str(e)}")
+
+    def save_config(self):
+        """Schedule a (debounced, atomic) save of the current configuration"""
+        self.store.save()
+
+    def get_blocked_words(self, guild_id):
+        """Get the word list for a guild (its own list, or the default list)"""
+        guild_id = str(guild_id)
+        if guild_id in self.guild_blocked_words:
+            return self.guild_blocked_words[guild_id]
+        return self.blocked_words
+
+    def add_blocked_word(self, guild_id, word):
+        """Add a word to a guild's list. Returns False if it was already there"""
+        guild_id = str(guild_id)
+        words = self.get_blocked_words(guild_id)
+        if word in words:
+            return False
+
+        # The first change gives the guild its own copy of the default list
+        self.guild_blocked_words[guild_id] = words + [word]
+        self._matchers.pop(guild_id, None)
+        self.save_config()
+        return True
+
+    def remove_blocked_word(self, guild_id, word):
+        """Remove a word from a guild's list. Returns False if it was not there"""
+        guild_id = str(guild_id)
+        words = self.get_blocked_words(guild_id)
+        if word not in words:
+            return False
+
+        self.guild_blocked_words[guild_id] = [w for w in words if w != word]
+        self._matchers.pop(guild_id, None)
+        self.save_config()
+        return True
+
+    def get_matcher(self, guild_id):
+        """Get the compiled matcher for a guild, building it on first use"""
+        guild_id = str(guild_id)
+        key = guild_id if guild_id in self.guild_blocked_words else None
+        if key not in self._matchers:
+            self._matchers[key] = compile_word_matcher(self.get_blocked_words(guild_id))
+        return self._matchers[key]
 
     def is_filtered_word(self, content, guild_id):
         """Check if message contains filtered words"""
@@ -79,105 +208,64 @@ class ProfanityFilter(commands.Cog):
         
         # Skip check if filter is explicitly disabled for this guild (default to enabled)
         # The filter is enabled by default for all servers unless explicitly disabled
-        if guild_id in self.filter_enabled and self.filter_enabled[guild_id] == False:
-            logger.info(f"Filter explicitly disabled for guild {guild_id}")
+        if self.filter_enabled.get(guild_id) == False:
             return False
 
         # No words to filter
-        if not self.blocked_words:
+        matcher = self.get_matcher(guild_id)
+        if matcher is None:
             return False
 
-        # Create regex pattern for whole word matching with word boundaries
-        content = content.lower()
-        for word in self.blocked_words:
-            # Use word boundaries to match whole words only
-            pattern = r'\b' + re.escape(word.lower()) + r'\b'
-            if re.search(pattern, content):
-                return True
-        return False
+        # One pass over the message for the whole word list
+        return matcher.search(content.casefold()) is not None
 
-    def get_warning_count(self, user_id, guild_id):
+    async def get_warning_count(self, user_id, guild_id):
         """Get warning count for a user in a guild"""
-        # Convert IDs to strings for JSON compatibility
-        user_id = str(user_id)
-        guild_id = str(guild_id)
-        
-        # Initialize the guild dict if it doesn't exist
-        if guild_id not in self.warning_count:
-            self.warning_count[guild_id] = {}
-            
-        # Return the warning count or 0 if not found
-        return self.warning_count[guild_id].get(user_id, 0)
+        return await moderation_repo.get_warning_count(guild_id, user_id)
+
+    async def get_guild_warning_counts(self, guild_id):
+        """Get warning counts for every warned user in a guild"""
+        return await moderation_repo.get_guild_warning_counts(guild_id)
 
-    def add_warning(self, user_id, guild_id):
+    async def add_warning(self, user_id, guild_id):
         """Add a warning to a user's count"""
-        # Convert IDs to strings for JSON compatibility
-        user_id = str(user_id)
-        guild_id = str(guild_id)
-        
-        # Initialize the guild dict if it doesn't exist
-        if guild_id not in self.warning_count:
-            self.warning_count[guild_id] = {}
-            
-        # Get current count and increment
-        current = self.warning_count[guild_id].get(user_id, 0)
-        self.warning_count[guild_id][user_id] = current + 1
-        self.save_config()
-        
-        return self.warning_count[guild_id][user_id]
+        return await moderation_repo.add_warning(guild_id, user_id)
 
-    def reset_warnings(self, user_id, guild_id):
+    async def reset_warnings(self, user_id, guild_id):
         """Reset warnings for a user"""
-        # Convert IDs to strings for JSON compatibility
-        user_id = str(user_id)
-        guild_id = str(guild_id)
-        
-        # Initialize the guild dict if it doesn't exist
-        if guild_id not in self.warning_count:
-            self.warning_count[guild_id] = {}
-            logger.info(f"No warnings to reset for guild ID {guild_id} - guild not in warning registry")
-            return
+        removed = await moderation_repo.reset_warnings(guild_id, user_id)
             
-        # Reset the warning count
-        previous_warnings = self.warning_count[guild_id].get(user_id, 0)
-        if user_id in self.warning_count[guild_id]:
-            self.warning_count[guild_id][user_id] = 0
-            self.save_config()
-            logger.info(f"Reset warnings for user ID {user_id} in guild ID {guild_id} from {previous_warnings} to 0")
+        if removed:
+            logger.info(f"Reset warnings for user ID {user_id} in guild ID {guild_id}")
+        else:
+            logger.info(f"No warnings to reset for user ID {user_id} in guild ID {guild_id}")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Check messages for profanity"""
-        # Always log incoming messages for debugging
-        logger.info(f"Message received from {message.author.name}: {message.content}")
-        
-        # Ignore messages from bots, including our own
-        if message.author.bot:
-            logger.info("Message ignored - from bot")
-            return
-            
-        # Ignore DMs
-        if not message.guild:
-            logger.info("Message ignored - from DM")
-            return
-        
-        # Debug log - before filter check
-        guild_id = str(message.guild.id)
-        filter_status = "disabled" if guild_id in self.filter_enabled and self.filter_enabled[guild_id] == False else "enabled"
-        logger.info(f"Filter status for guild {message.guild.name} ({guild_id}): {filter_status}")
-        logger.info(f"Number of blocked words: {len(self.blocked_words)}")
+    async def cog_load(self):
+        """Register the profanity check with the shared message pipeline"""
+        get_pipeline(self.bot).register("profanity_filter", self.inspect_message, PRIORITY_PROFANITY)
+
+    async def cog_unload(self):
+        """Remove the profanity check from the shared message pipeline"""
+        get_pipeline(self.bot).unregister("profanity_filter")
+        await self.store.close()
+
+    async def inspect_message(self, inspected: InspectedMessage):
+        """Check messages for profanity (message pipeline stage)"""
+        message = inspected.message
+        guild_id = inspected.guild_id
+        logger.debug(f"Checking message from {message.author.name} in guild {guild_id} for blocked words")
             
         # Check if message contains filtered words
-        if self.is_filtered_word(message.content, message.guild.id):
+        if self.is_filtered_word(inspected.text, guild_id):
             logger.info(f"MATCH FOUND - Filtered message from {message.author.name} in {message.guild.name}: {message.content}")
             
             try:
                 # Delete the message
-                await message.delete()
+                await inspected.delete()
                 logger.info(f"Message deleted successfully")
                 
                 # Add warning and get count
-                warning_count = self.add_warning(message.author.id, message.guild.id)
+                warning_count = await self.add_warning(message.author.id, message.guild.id)
                 logger.info(f"Warning added: user {message.author.name} ({message.author.id}) now has {warning_count} warnings in server '{message.guild.name}'")
                 
                 # Send warning DM to user
@@ -299,9 +387,11 @@ class ProfanityFilter(commands.Cog):
                 logger.warning(f"PERMISSION ERROR - No permission to delete message from {message.author.name}")
             except Exception as e:
                 logger.error(f"GENERAL ERROR - Error processing filtered message: {str(e)}")
-        else:
-            # Debug - why didn't we match?
-            logger.info(f"No filtered words found in message")
+
+            # Later stages never see a message we removed
+            return Verdict.STOP if inspected.deleted else Verdict.CONTINUE
+
+        return Verdict.CONTINUE
 
     @commands.command(name="addfilter")
     @commands.has_permissions(manage_messages=True)
@@ -310,14 +400,10 @@ class ProfanityFilter(commands.Cog):
         # Convert to lowercase for case-insensitive filtering
         word = word.lower()
         
-        # Check if word already exists
-        if word in self.blocked_words:
+        # Add word to this server's filter
+        if not self.add_blocked_word(ctx.guild.id, word):
             await ctx.send(f"The word '{word}' is already in the filter.")
             return
-            
-        # Add word to filter
-        self.blocked_words.append(word)
-        self.save_config()
         
         await ctx.send(f"Added '{word}' to the profanity filter.")
         logger.info(f"User {ctx.author.name} added '{word}' to profanity filter")
@@ -334,14 +420,10 @@ class ProfanityFilter(commands.Cog):
         # Convert to lowercase for case-insensitive filtering
         word = word.lower()
         
-        # Check if word already exists
-        if word in self.blocked_words:
+        # Add word to this server's filter
+        if not self.add_blocked_word(interaction.guild.id, word):
             await interaction.response.send_message(f"The word '{word}' is already in the filter.", ephemeral=True)
             return
-            
-        # Add word to filter
-        self.blocked_words.append(word)
-        self.save_config()
         
         await interaction.response.send_message(f"Added '{word}' to the profanity filter.", ephemeral=True)
         logger.info(f"User {interaction.user.name} added '{word}' to profanity filter")
@@ -353,14 +435,10 @@ class ProfanityFilter(commands.Cog):
         # Convert to lowercase for case-insensitive matching
         word = word.lower()
         
-        # Check if word exists
-        if word not in self.blocked_words:
+        # Remove word from this server's filter
+        if not self.remove_blocked_word(ctx.guild.id, word):
             await ctx.send(f"The word '{word}' is not in the filter.")
             return
-            
-        # Remove word from filter
-        self.blocked_words.remove(word)
-        self.save_config()
         
         await ctx.send(f"Removed '{word}' from the profanity filter.")
         logger.info(f"User {ctx.author.name} removed '{word}' from profanity filter")
@@ -377,14 +455,10 @@ class ProfanityFilter(commands.Cog):
         # Convert to lowercase for case-insensitive matching
         word = word.lower()
         
-        # Check if word exists
-        if word not in self.blocked_words:
+        # Remove word from this server's filter
+        if not self.remove_blocked_word(interaction.guild.id, word):
             await interaction.response.send_message(f"The word '{word}' is not in the filter.", ephemeral=True)
             return
-            
-        # Remove word from filter
-        self.blocked_words.remove(word)
-        self.save_config()
         
         await interaction.response.send_message(f"Removed '{word}' from the profanity filter.", ephemeral=True)
         logger.info(f"User {interaction.user.name} removed '{word}' from profanity filter")
@@ -394,12 +468,13 @@ class ProfanityFilter(commands.Cog):
     async def list_filtered_words_prefix(self, ctx):
         """List all words in the profanity filter (prefix command)"""
         # No words in filter
-        if not self.blocked_words:
+        blocked_words = self.get_blocked_words(ctx.guild.id)
+        if not blocked_words:
             await ctx.send("There are no words in the profanity filter.")
             return
             
         # Format the list of words
-        word_list = ", ".join([f"`{word}`" for word in sorted(self.blocked_words)])
+        word_list = ", ".join([f"`{word}`" for word in sorted(blocked_words)])
         
         # Send list privately
         await ctx.send(f"**Filtered Words:**\n{word_list}")
@@ -414,12 +489,13 @@ class ProfanityFilter(commands.Cog):
             return
             
         # No words in filter
-        if not self.blocked_words:
+        blocked_words = self.get_blocked_words(interaction.guild.id)
+        if not blocked_words:
             await interaction.response.send_message("There are no words in the profanity filter.", ephemeral=True)
             return
             
         # Format the list of words
-        word_list = ", ".join([f"`{word}`" for word in sorted(self.blocked_words)])
+        word_list = ", ".join([f"`{word}`" for word in sorted(blocked_words)])
         
         # Send list privately
         await interaction.response.send_message(f"**Filtered Words:**\n{word_list}", ephemeral=True)
@@ -465,7 +541,7 @@ class ProfanityFilter(commands.Cog):
     async def reset_user_warnings_prefix(self, ctx, user: discord.Member):
         """Reset profanity warnings for a specific user (prefix command)"""
         # Reset warnings
-        self.reset_warnings(user.id, ctx.guild.id)
+        await self.reset_warnings(user.id, ctx.guild.id)
         
         await ctx.send(f"Reset profanity warnings for {user.mention}.")
         logger.info(f"User {ctx.author.name} reset warnings for {user.name} in {ctx.guild.name}")
@@ -480,7 +556,7 @@ class ProfanityFilter(commands.Cog):
             return
             
         # Reset warnings
-        self.reset_warnings(user.id, interaction.guild.id)
+        await self.reset_warnings(user.id, interaction.guild.id)
         
         await interaction.response.send_message(f"Reset profanity warnings for {user.mention}.", ephemeral=False)
         logger.info(f"User {interaction.user.name} reset warnings for {user.name} in {interaction.guild.name}")
@@ -490,19 +566,12 @@ class ProfanityFilter(commands.Cog):
     async def check_user_warnings_prefix(self, ctx, user: discord.Member):
         """Check how many profanity warnings a user has (prefix command)"""
         # Get warning count
-        guild_id = str(ctx.guild.id)
-        user_id = str(user.id)
         server_name = ctx.guild.name
+        count = await self.get_warning_count(user.id, ctx.guild.id)
         
-        if guild_id not in self.warning_count:
-            await ctx.send(f"No warnings have been issued in server '{server_name}'.")
-            return
-            
-        if user_id not in self.warning_count[guild_id]:
+        if not count:
             await ctx.send(f"User **{user.display_name}** has no warnings in server '{server_name}'.")
             return
-            
-        count = self.warning_count[guild_id][user_id]
         
         await ctx.send(f"User **{user.display_name}** has {count} profanity warning(s) in server '{server_name}'.")
     
@@ -516,19 +585,12 @@ class ProfanityFilter(commands.Cog):
             return
             
         # Get warning count and server details
-        guild_id = str(interaction.guild_id)
-        user_id = str(user.id)
         server_name = interaction.guild.name
+        count = await self.get_warning_count(user.id, interaction.guild_id)
         
-        if guild_id not in self.warning_count:
-            await interaction.response.send_message(f"No warnings have been issued in server '{server_name}'.", ephemeral=True)
-            return
-            
-        if user_id not in self.warning_count[guild_id]:
+        if not count:
             await interaction.response.send_message(f"User **{user.display_name}** has no warnings in server '{server_name}'.", ephemeral=True)
             return
-            
-        count = self.warning_count[guild_id][user_id]
         
         await interaction.response.send_message(
             f"User **{user.display_name}** has {count} profanity warning(s) in server '{server_name}'.", 
@@ -564,13 +626,14 @@ class ProfanityFilter(commands.Cog):
         guild_id = str(ctx.guild.id)
         server_name = ctx.guild.name
         
-        if guild_id not in self.warning_count or not self.warning_count[guild_id]:
+        warning_counts = await self.get_guild_warning_counts(guild_id)
+        if not warning_counts:
             await ctx.send(f"No warnings have been issued in server '{server_name}'.")
             return
             
         # Create a list of users with warnings
         warning_list = []
-        for user_id, count in self.warning_count[guild_id].items():
+        for user_id, count in warning_counts.items():
             if count > 0:  # Only include users with active warnings
                 # Try to resolve user
                 try:
@@ -610,13 +673,14 @@ class ProfanityFilter(commands.Cog):
         guild_id = str(interaction.guild_id)
         server_name = interaction.guild.name
         
-        if guild_id not in self.warning_count or not self.warning_count[guild_id]:
+        warning_counts = await self.get_guild_warning_counts(guild_id)
+        if not warning_counts:
             await interaction.response.send_message(f"No warnings have been issued in server '{server_name}'.", ephemeral=True)
             return
             
         # Create a list of users with warnings
         warning_list = []
-        for user_id, count in self.warning_count[guild_id].items():
+        for user_id, count in warning_counts.items():
             if count > 0:  # Only include users with active warnings
                 # Try to resolve user
                 try:
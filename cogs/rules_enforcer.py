@@ -4,10 +4,15 @@ import json
 import os
 import logging
 import datetime
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from utils.embed_helpers import create_embed, create_error_embed, create_success_embed
 from utils.permissions import PermissionChecks
+from utils.config_store import JSONConfigStore
+from utils.message_pipeline import get_pipeline, InspectedMessage, Verdict, PRIORITY_RULES
+from models.moderation import SOURCE_RULE, record_event
+from repositories import moderation as moderation_repo
+from database import db
 
 logger = logging.getLogger('discord')
 
@@ -102,12 +107,80 @@ RULES = {
     }
 }
 
+# Directory holding per-guild rule packs (<guild_id>.json)
+RULE_PACKS_DIR = "data/rule_packs"
+
+class RuleEngine:
+    """A rule set compiled into single-pass matchers
+
+    Every pattern of every rule becomes one alternative of a combined regex,
+    so a clean message (nearly all of them) is scanned once. Only when the
+    combined regex hits are the rules checked one by one, in rule order, so
+    the first matching rule wins just as with a per-rule scan (a leftmost
+    match could belong to a later, less severe rule). VC-only rules get
+    their own matcher so normal channels never pay for them.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self._rule_matchers = {}
+        self._exceptions = {}
+        self.text_rules, self.text_matcher = self._compile(include_vc=False)
+        self.vc_rules, self.vc_matcher = self._compile(include_vc=True)
+
+    def _compile(self, include_vc):
+        """(rule IDs in order, combined matcher) for one kind of channel"""
+        rule_ids = []
+        alternatives = []
+        for rule_id, rule in self.rules.items():
+            if rule.get("vc_only", False) and not include_vc:
+                continue
+            if not rule.get("patterns"):
+                continue
+
+            body = "|".join(f"(?:{pattern})" for pattern in rule["patterns"])
+            if rule_id not in self._rule_matchers:
+                self._rule_matchers[rule_id] = re.compile(body, re.IGNORECASE)
+                if "exception" in rule:
+                    self._exceptions[rule_id] = re.compile(rule["exception"], re.IGNORECASE)
+            rule_ids.append(rule_id)
+            alternatives.append(f"(?:{body})")
+
+        if not alternatives:
+            return rule_ids, None
+        return rule_ids, re.compile("|".join(alternatives), re.IGNORECASE)
+
+    def match(self, message_content, is_vc):
+        """Return (rule_id, rule) for the first rule (in rule order) the message violates, or (None, None)"""
+        matcher = self.vc_matcher if is_vc else self.text_matcher
+        if matcher is None or not matcher.search(message_content):
+            return None, None
+
+        for rule_id in (self.vc_rules if is_vc else self.text_rules):
+            # Check for rule exception (e.g., "The Plowed" emote exception)
+            exception = self._exceptions.get(rule_id)
+            if exception and exception.search(message_content):
+                continue
+
+            if self._rule_matchers[rule_id].search(message_content):
+                return rule_id, self.rules[rule_id]
+
+        return None, None
+
+def _parse_rule_id(rule_id):
+    """JSON keys are strings; numeric rule IDs are ints in RULES"""
+    return int(rule_id) if isinstance(rule_id, str) and rule_id.isdigit() else rule_id
+
 class RulesEnforcer(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config_file = "data/rules_config.json"
-        self.rule_violations = {}  # Track violations per user
+        self._legacy_violations = {}  # Violations from old configs not yet moved to the database
         self.warned_messages = set()  # Track messages already warned for
+        self.store = JSONConfigStore(self.config_file, lambda: {'rule_violations': self._legacy_violations}, indent=4)
+        # Import app here to avoid circular imports
+        from app import app
+        self.app = app
         self.load_config()
         
         # Create vc channel detection
@@ -115,6 +188,12 @@ class RulesEnforcer(commands.Cog):
             "voice-chat", "vc-text", "voice-text",
             "music-commands", "music-requests", "vc-chat"
         ]
+        self._vc_channel_cache = {}  # channel_id -> is VC text channel
+        
+        # Compiled rule engines: the default one plus any per-guild packs
+        self.default_engine = RuleEngine(RULES)
+        self.guild_engines = {}
+        self.load_rule_packs()
         
     def load_config(self):
         """Load rule violations from config file"""
@@ -124,127 +203,182 @@ class RulesEnforcer(commands.Cog):
             try:
                 with open(self.config_file, 'r') as f:
                     config = json.load(f)
-                    self.rule_violations = config.get('rule_violations', {})
-                    logger.info(f"Loaded rules enforcer config with {sum(len(v) for v in self.rule_violations.values())} rule violations")
+                    self._legacy_violations = config.get('rule_violations', {})
             except Exception as e:
                 logger.error(f"Error loading rules config: {str(e)}")
-                self.rule_violations = {}
+                self._legacy_violations = {}
         else:
             logger.info("No rules config found, creating new one")
             self.save_config()
             
+        # Violations now live in the moderation_event table
+        if any(self._legacy_violations.values()):
+            self.migrate_legacy_violations()
+            
     def save_config(self):
-        """Save current rule violations to file"""
+        """Schedule a (debounced, atomic) save of the current rule violations"""
+        self.store.save()
+        
+    def migrate_legacy_violations(self):
+        """Move rule violations from the JSON config into the moderation tables"""
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump({'rule_violations': self.rule_violations}, f, indent=4)
-            logger.info("Saved rules enforcer configuration")
+            with self.app.app_context():
+                migrated = 0
+                for guild_id, users in self._legacy_violations.items():
+                    for user_id, violations in users.items():
+                        for violation in violations:
+                            try:
+                                timestamp = datetime.datetime.fromisoformat(violation["timestamp"])
+                            except (KeyError, TypeError, ValueError):
+                                timestamp = None
+                            record_event(guild_id, user_id, SOURCE_RULE, violation.get("rule_id"), timestamp)
+                            migrated += 1
+                db.session.commit()
+            logger.info(f"Migrated {migrated} rule violations from config to the database")
+            self._legacy_violations = {}
+            self.save_config()
         except Exception as e:
-            logger.error(f"Error saving rules config: {str(e)}")
+            logger.error(f"Error migrating rule violations to the database: {str(e)}")
             
-    def is_vc_channel(self, channel_name):
-        """Check if a channel is related to voice chat"""
-        return any(vc_name in channel_name.lower() for vc_name in self.vc_text_channels)
-        
-    def check_rule_violation(self, message_content, channel_name):
-        """Check if a message violates any rules"""
-        message_content = message_content.lower()
-        is_vc = self.is_vc_channel(channel_name)
+    def load_rule_pack(self, guild_id):
+        """(Re)load and compile the rule pack for one guild
+
+        A pack is a JSON file with a "rules" object using the same fields as
+        RULES. Pack rules override default rules with the same ID, and a rule
+        with "disabled": true removes that default rule for the guild.
+        Returns the number of rules in effect, or raises on an invalid pack.
+        """
+        guild_id = str(guild_id)
+        pack_file = os.path.join(RULE_PACKS_DIR, f"{guild_id}.json")
         
-        for rule_id, rule in RULES.items():
-            # Skip VC rules if not in a VC channel
-            if rule.get('vc_only', False) and not is_vc:
+        if not os.path.exists(pack_file):
+            self.guild_engines.pop(guild_id, None)
+            return len(RULES)
+            
+        with open(pack_file, 'r') as f:
+            pack = json.load(f)
+            
+        rules = dict(RULES)
+        for rule_id, rule in pack.get("rules", {}).items():
+            rule_id = _parse_rule_id(rule_id)
+            if rule.get("disabled", False):
+                rules.pop(rule_id, None)
                 continue
-                
-            # Check for rule exception first (e.g., "The Plowed" emote exception)
-            if "exception" in rule and re.search(rule["exception"], message_content, re.IGNORECASE):
+            rule.setdefault("name", f"Rule {rule_id}")
+            rule.setdefault("description", rule["name"])
+            rule.setdefault("severity", 1)
+            rule.setdefault("patterns", [])
+            rules[rule_id] = rule
+            
+        # Compile before swapping so a bad pattern keeps the old rules active
+        self.guild_engines[guild_id] = RuleEngine(rules)
+        logger.info(f"Loaded rule pack for guild {guild_id} with {len(rules)} rules")
+        return len(rules)
+        
+    def load_rule_packs(self):
+        """Load every per-guild rule pack found on disk"""
+        if not os.path.isdir(RULE_PACKS_DIR):
+            return
+            
+        for filename in os.listdir(RULE_PACKS_DIR):
+            if not filename.endswith(".json"):
                 continue
+            try:
+                self.load_rule_pack(filename[:-5])
+            except Exception as e:
+                logger.error(f"Error loading rule pack {filename}: {str(e)}")
                 
-            # Check all patterns for this rule
-            for pattern in rule["patterns"]:
-                if re.search(pattern, message_content, re.IGNORECASE):
-                    return rule_id, rule
-                    
-        return None, None
+    def get_engine(self, guild_id):
+        """Get the compiled rule engine for a guild"""
+        return self.guild_engines.get(str(guild_id), self.default_engine)
         
-    def add_violation(self, user_id, guild_id, rule_id):
-        """Add a rule violation to a user's record"""
-        user_id = str(user_id)
-        guild_id = str(guild_id)
-        rule_id = str(rule_id)
-        
-        if guild_id not in self.rule_violations:
-            self.rule_violations[guild_id] = {}
+    def get_rules(self, guild_id):
+        """Get the rules in effect for a guild"""
+        return self.get_engine(guild_id).rules
             
-        if user_id not in self.rule_violations[guild_id]:
-            self.rule_violations[guild_id][user_id] = []
+    def is_vc_channel(self, channel_name, channel_id=None):
+        """Check if a channel is related to voice chat (cached per channel ID)"""
+        if channel_id is not None and channel_id in self._vc_channel_cache:
+            return self._vc_channel_cache[channel_id]
             
-        # Add violation with timestamp
-        timestamp = datetime.datetime.utcnow().isoformat()
-        self.rule_violations[guild_id][user_id].append({
-            "rule_id": rule_id,
-            "timestamp": timestamp
-        })
+        is_vc = any(vc_name in channel_name.lower() for vc_name in self.vc_text_channels)
+        if channel_id is not None:
+            self._vc_channel_cache[channel_id] = is_vc
+        return is_vc
         
-        self.save_config()
-        return len(self.rule_violations[guild_id][user_id])
-    
-    def get_recent_violations(self, user_id, guild_id, days=30):
-        """Get recent rule violations for a user"""
-        user_id = str(user_id)
-        guild_id = str(guild_id)
+    def check_rule_violation(self, message_content, channel_name, channel_id=None, guild_id=None):
+        """Check if a message violates any rules"""
+        is_vc = self.is_vc_channel(channel_name, channel_id)
+        engine = self.get_engine(guild_id) if guild_id is not None else self.default_engine
+        return engine.match(message_content, is_vc)
         
-        if guild_id not in self.rule_violations or user_id not in self.rule_violations[guild_id]:
-            return []
-            
-        # Filter violations within the past X days
-        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
-        recent = []
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        """Forget the cached VC status of renamed channels"""
+        self._vc_channel_cache.pop(after.id, None)
         
-        for violation in self.rule_violations[guild_id][user_id]:
-            try:
-                violation_time = datetime.datetime.fromisoformat(violation["timestamp"])
-                if violation_time >= cutoff:
-                    recent.append(violation)
-            except:
-                # Handle any timestamp parsing errors
-                recent.append(violation)
-                
-        return recent
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        """Drop deleted channels from the VC status cache"""
+        self._vc_channel_cache.pop(channel.id, None)
         
-    def reset_violations(self, user_id, guild_id):
+    async def add_violation(self, user_id, guild_id, rule_id):
+        """Add a rule violation to a user's record
+
+        Returns the user's total number of violations.
+        """
+        return await moderation_repo.add_violation(guild_id, user_id, rule_id)
+    
+    async def get_recent_violations(self, user_id, guild_id, days=30):
+        """Get recent rule violation counts for a user, keyed by rule ID"""
+        return await moderation_repo.get_recent_violations(guild_id, user_id, days)
+        
+    async def reset_violations(self, user_id, guild_id):
         """Reset rule violations for a user"""
-        user_id = str(user_id)
-        guild_id = str(guild_id)
+        return await moderation_repo.reset_violations(guild_id, user_id) > 0
         
-        if guild_id in self.rule_violations and user_id in self.rule_violations[guild_id]:
-            self.rule_violations[guild_id][user_id] = []
-            self.save_config()
-            return True
-        return False
+    @tasks.loop(hours=24)
+    async def roll_up_moderation_events(self):
+        """Roll old warnings and violations into per-user aggregates"""
+        try:
+            removed = await moderation_repo.roll_up()
+            if removed:
+                logger.info(f"Rolled {removed} old moderation events into aggregates")
+        except Exception as e:
+            logger.error(f"Error rolling up moderation events: {str(e)}")
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Check messages for rule violations"""
-        # Ignore messages from bots
-        if message.author.bot:
-            return
+    async def cog_load(self):
+        """Register the rules check with the shared message pipeline"""
+        get_pipeline(self.bot).register("rules_enforcer", self.inspect_message, PRIORITY_RULES)
+        self.roll_up_moderation_events.start()
+
+    async def cog_unload(self):
+        """Remove the rules check from the shared message pipeline"""
+        get_pipeline(self.bot).unregister("rules_enforcer")
+        self.roll_up_moderation_events.cancel()
+        await self.store.close()
+
+    async def inspect_message(self, inspected: InspectedMessage):
+        """Check messages for rule violations (message pipeline stage)"""
+        message = inspected.message
             
-        # Ignore DMs
+        # Only plain text channels are covered by the rules
         if not isinstance(message.channel, discord.TextChannel):
-            return
+            return Verdict.CONTINUE
             
         # Check if message was already warned for
         if message.id in self.warned_messages:
-            return
+            return Verdict.CONTINUE
             
         # Check for rule violations
-        rule_id, rule = self.check_rule_violation(message.content, message.channel.name)
+        rule_id, rule = self.check_rule_violation(
+            inspected.text, message.channel.name, message.channel.id, message.guild.id
+        )
         if rule_id and rule:
             logger.info(f"Rule violation detected - Rule {rule_id}: {rule['name']} by {message.author.name} in {message.guild.name}")
             
             # Add violation to user's record
-            violation_count = self.add_violation(message.author.id, message.guild.id, rule_id)
+            violation_count = await self.add_violation(message.author.id, message.guild.id, rule_id)
             
             # Create warning embed
             embed = discord.Embed(
@@ -253,7 +387,7 @@ class RulesEnforcer(commands.Cog):
                 color=discord.Color.yellow()
             )
             
-            embed.add_field(name="Violation Count", value=f"This is violation #{violation_count} in the past 30 days", inline=False)
+            embed.add_field(name="Violation Count", value=f"This is violation #{violation_count}", inline=False)
             embed.add_field(name="Severity", value=f"{'🟥' * rule['severity']}{'⬜' * (3 - rule['severity'])}", inline=False)
             
             # What happens at this severity?
@@ -264,7 +398,7 @@ class RulesEnforcer(commands.Cog):
                 # Consider deleting the message for severity 2+
                 try:
                     if violation_count > 1:  # Only delete if repeated offense
-                        await message.delete()
+                        await inspected.delete()
                         logger.info(f"Deleted message from {message.author.name} for rule violation")
                 except:
                     logger.warning(f"Could not delete message from {message.author.name}")
@@ -272,7 +406,7 @@ class RulesEnforcer(commands.Cog):
                 embed.add_field(name="Action", value="Message removed and moderators notified", inline=False)
                 # Always delete for severity 3
                 try:
-                    await message.delete()
+                    await inspected.delete()
                     logger.info(f"Deleted message from {message.author.name} for severe rule violation")
                 except:
                     logger.warning(f"Could not delete message from {message.author.name}")
@@ -316,6 +450,11 @@ class RulesEnforcer(commands.Cog):
                     )
                 except:
                     logger.error(f"Could not send warning to channel for {message.author.name}")
+
+            if inspected.deleted:
+                return Verdict.STOP
+
+        return Verdict.CONTINUE
     
     @app_commands.command(name="violations", description="Check rule violations for a user")
     @app_commands.default_permissions(manage_messages=True)
@@ -327,7 +466,7 @@ class RulesEnforcer(commands.Cog):
             return
             
         # Get user's violations
-        violations = self.get_recent_violations(user.id, interaction.guild.id)
+        violations = await self.get_recent_violations(user.id, interaction.guild.id)
         
         if not violations:
             await interaction.response.send_message(f"{user.display_name} has no rule violations in the past 30 days.", ephemeral=True)
@@ -336,21 +475,14 @@ class RulesEnforcer(commands.Cog):
         # Create violations embed
         embed = discord.Embed(
             title=f"Rule Violations: {user.display_name}",
-            description=f"Found {len(violations)} violations in the past 30 days",
+            description=f"Found {sum(violations.values())} violations in the past 30 days",
             color=discord.Color.orange()
         )
         
-        # Count violations by rule
-        rule_counts = {}
-        for v in violations:
-            rule_id = v["rule_id"]
-            if rule_id not in rule_counts:
-                rule_counts[rule_id] = 0
-            rule_counts[rule_id] += 1
-            
         # Add fields for each rule violation
-        for rule_id, count in rule_counts.items():
-            rule_info = RULES.get(int(rule_id) if rule_id.isdigit() else rule_id, {"name": "Unknown Rule", "description": "Rule details not found"})
+        rules = self.get_rules(interaction.guild.id)
+        for rule_id, count in violations.items():
+            rule_info = rules.get(_parse_rule_id(rule_id), {"name": "Unknown Rule", "description": "Rule details not found"})
             embed.add_field(
                 name=f"Rule {rule_id}: {rule_info['name']} ({count})",
                 value=rule_info["description"],
@@ -369,7 +501,7 @@ class RulesEnforcer(commands.Cog):
             return
             
         # Reset violations
-        if self.reset_violations(user.id, interaction.guild.id):
+        if await self.reset_violations(user.id, interaction.guild.id):
             await interaction.response.send_message(f"Reset rule violations for {user.mention}.", ephemeral=False)
             logger.info(f"User {interaction.user.name} reset rule violations for {user.name} in {interaction.guild.name}")
         else:
@@ -380,7 +512,7 @@ class RulesEnforcer(commands.Cog):
     async def check_violations_prefix(self, ctx, user: discord.Member):
         """Check rule violations for a user (prefix command)"""
         # Get user's violations
-        violations = self.get_recent_violations(user.id, ctx.guild.id)
+        violations = await self.get_recent_violations(user.id, ctx.guild.id)
         
         if not violations:
             await ctx.send(f"{user.display_name} has no rule violations in the past 30 days.")
@@ -389,21 +521,14 @@ class RulesEnforcer(commands.Cog):
         # Create violations embed
         embed = discord.Embed(
             title=f"Rule Violations: {user.display_name}",
-            description=f"Found {len(violations)} violations in the past 30 days",
+            description=f"Found {sum(violations.values())} violations in the past 30 days",
             color=discord.Color.orange()
         )
         
-        # Count violations by rule
-        rule_counts = {}
-        for v in violations:
-            rule_id = v["rule_id"]
-            if rule_id not in rule_counts:
-                rule_counts[rule_id] = 0
-            rule_counts[rule_id] += 1
-            
         # Add fields for each rule violation
-        for rule_id, count in rule_counts.items():
-            rule_info = RULES.get(int(rule_id) if rule_id.isdigit() else rule_id, {"name": "Unknown Rule", "description": "Rule details not found"})
+        rules = self.get_rules(ctx.guild.id)
+        for rule_id, count in violations.items():
+            rule_info = rules.get(_parse_rule_id(rule_id), {"name": "Unknown Rule", "description": "Rule details not found"})
             embed.add_field(
                 name=f"Rule {rule_id}: {rule_info['name']} ({count})",
                 value=rule_info["description"],
@@ -417,12 +542,45 @@ class RulesEnforcer(commands.Cog):
     async def reset_violations_prefix(self, ctx, user: discord.Member):
         """Reset rule violations for a user (prefix command)"""
         # Reset violations
-        if self.reset_violations(user.id, ctx.guild.id):
+        if await self.reset_violations(user.id, ctx.guild.id):
             await ctx.send(f"Reset rule violations for {user.mention}.")
             logger.info(f"User {ctx.author.name} reset rule violations for {user.name} in {ctx.guild.name}")
         else:
             await ctx.send(f"{user.display_name} has no rule violations to reset.")
             
+    @app_commands.command(name="reloadrules", description="Reload this server's rule pack without restarting")
+    @app_commands.default_permissions(manage_guild=True)
+    async def reload_rules(self, interaction: discord.Interaction):
+        """Reload the rule pack for this server"""
+        # Check if user has appropriate permissions
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message("You need 'Manage Server' permission to use this command.", ephemeral=True)
+            return
+            
+        try:
+            rule_count = self.load_rule_pack(interaction.guild.id)
+        except Exception as e:
+            logger.error(f"Error reloading rule pack for {interaction.guild.name}: {str(e)}")
+            await interaction.response.send_message(f"Could not load the rule pack, keeping the current rules: `{str(e)}`", ephemeral=True)
+            return
+            
+        await interaction.response.send_message(f"Reloaded rules for this server ({rule_count} rules active).", ephemeral=True)
+        logger.info(f"User {interaction.user.name} reloaded the rule pack for {interaction.guild.name}")
+        
+    @commands.command(name="reloadrules")
+    @commands.has_permissions(manage_guild=True)
+    async def reload_rules_prefix(self, ctx):
+        """Reload the rule pack for this server (prefix command)"""
+        try:
+            rule_count = self.load_rule_pack(ctx.guild.id)
+        except Exception as e:
+            logger.error(f"Error reloading rule pack for {ctx.guild.name}: {str(e)}")
+            await ctx.send(f"Could not load the rule pack, keeping the current rules: `{str(e)}`")
+            return
+            
+        await ctx.send(f"Reloaded rules for this server ({rule_count} rules active).")
+        logger.info(f"User {ctx.author.name} reloaded the rule pack for {ctx.guild.name}")
+            
     @app_commands.command(name="rules", description="Display server rules")
     async def show_rules(self, interaction: discord.Interaction):
         """Display the server rules"""
@@ -432,10 +590,12 @@ class RulesEnforcer(commands.Cog):
             color=discord.Color.blue()
         )
         
+        rules = self.get_rules(interaction.guild.id) if interaction.guild else RULES
+        
         # Add regular rules
         for i in range(1, 9):
-            if i in RULES:
-                rule = RULES[i]
+            if i in rules:
+                rule = rules[i]
                 embed.add_field(
                     name=f"Rule {i}: {rule['name']}",
                     value=rule['description'],
@@ -446,7 +606,7 @@ class RulesEnforcer(commands.Cog):
         embed.add_field(name="Voice Chat Rules", value="Rules for voice chat channels:", inline=False)
         
         # Add VC rules
-        for rule_id, rule in RULES.items():
+        for rule_id, rule in rules.items():
             if isinstance(rule_id, str) and rule_id.startswith("vc"):
                 embed.add_field(
                     name=f"VC Rule {rule_id[2:]}: {rule['name']}",
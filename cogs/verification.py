@@ -9,8 +9,8 @@ from discord.ext import commands
 from discord.ui import Button, View
 from typing import Dict, List, Optional, Union, Literal
 
-from app import db
 from models.verification import VerificationSetting, VerificationLog
+from repositories import verification as verification_repo
 
 # Simple captcha generation function (using text and basic math)
 def generate_captcha():
@@ -123,13 +123,11 @@ class CaptchaModal(discord.ui.Modal):
         correct_answer = self.answer.lower()
         
         # Update attempt count
-        self.verification_log.captcha_attempts += 1
-        db.session.commit()
+        await self.cog.update_log(self.verification_log, captcha_attempts=self.verification_log.captcha_attempts + 1)
         
         if user_answer == correct_answer:
             # Mark captcha as completed
-            self.verification_log.captcha_completed = True
-            db.session.commit()
+            await self.cog.update_log(self.verification_log, captcha_completed=True)
             
             await interaction.response.send_message(
                 "✅ Captcha verification successful! Moving to the next step...",
@@ -141,10 +139,12 @@ class CaptchaModal(discord.ui.Modal):
         else:
             # Check if too many attempts
             if self.verification_log.captcha_attempts >= 3:
-                self.verification_log.success = False
-                self.verification_log.failure_reason = "Too many failed captcha attempts"
-                self.verification_log.completed_at = datetime.utcnow()
-                db.session.commit()
+                await self.cog.update_log(
+                    self.verification_log,
+                    success=False,
+                    failure_reason="Too many failed captcha attempts",
+                    completed_at=datetime.utcnow()
+                )
                 
                 await interaction.response.send_message(
                     "❌ You've made too many incorrect attempts. Please contact a server moderator for assistance.",
@@ -196,8 +196,7 @@ class QuestionsModal(discord.ui.Modal):
     
     async def on_submit(self, interaction: Interaction):
         # Update attempt count
-        self.verification_log.questions_attempts += 1
-        db.session.commit()
+        await self.cog.update_log(self.verification_log, questions_attempts=self.verification_log.questions_attempts + 1)
         
         # Check answers
         all_correct = True
@@ -213,8 +212,7 @@ class QuestionsModal(discord.ui.Modal):
         
         if all_correct:
             # Mark questions as completed
-            self.verification_log.questions_completed = True
-            db.session.commit()
+            await self.cog.update_log(self.verification_log, questions_completed=True)
             
             await interaction.response.send_message(
                 "✅ All questions answered correctly! Moving to the next step...",
@@ -226,10 +224,12 @@ class QuestionsModal(discord.ui.Modal):
         else:
             # Check if too many attempts
             if self.verification_log.questions_attempts >= 3:
-                self.verification_log.success = False
-                self.verification_log.failure_reason = "Too many failed question attempts"
-                self.verification_log.completed_at = datetime.utcnow()
-                db.session.commit()
+                await self.cog.update_log(
+                    self.verification_log,
+                    success=False,
+                    failure_reason="Too many failed question attempts",
+                    completed_at=datetime.utcnow()
+                )
                 
                 await interaction.response.send_message(
                     "❌ You've made too many incorrect attempts. Please contact a server moderator for assistance.",
@@ -255,8 +255,7 @@ class RoleAcceptView(View):
     @discord.ui.button(label="I Accept the Rules", style=ButtonStyle.success, custom_id="accept_rules")
     async def accept_rules(self, interaction: Interaction, button: Button):
         # Mark role acceptance as completed
-        self.verification_log.role_accept_completed = True
-        db.session.commit()
+        await self.cog.update_log(self.verification_log, role_accept_completed=True)
         
         await interaction.response.send_message(
             "✅ You've accepted the server rules. Moving to the next step...",
@@ -269,10 +268,12 @@ class RoleAcceptView(View):
     @discord.ui.button(label="Decline", style=ButtonStyle.danger, custom_id="decline_rules")
     async def decline_rules(self, interaction: Interaction, button: Button):
         # Mark verification as failed
-        self.verification_log.success = False
-        self.verification_log.failure_reason = "User declined rules"
-        self.verification_log.completed_at = datetime.utcnow()
-        db.session.commit()
+        await self.cog.update_log(
+            self.verification_log,
+            success=False,
+            failure_reason="User declined rules",
+            completed_at=datetime.utcnow()
+        )
         
         await interaction.response.send_message(
             "You've declined the server rules and cannot proceed with verification.",
@@ -300,32 +301,23 @@ class Verification(commands.Cog):
     
     async def get_verification_settings(self, guild_id: str) -> Optional[VerificationSetting]:
         """Get or create verification settings for a guild"""
-        from app import app
-        
-        with app.app_context():
-            settings = db.session.query(VerificationSetting).filter_by(guild_id=guild_id).first()
-            
-            if not settings:
-                # Create default settings
-                settings = VerificationSetting(guild_id=guild_id)
-                db.session.add(settings)
-                db.session.commit()
-                
-            return settings
+        return await verification_repo.get_settings(guild_id)
     
     async def create_verification_log(self, user_id: str, guild_id: str, setting_id: int) -> VerificationLog:
         """Create a new verification log entry"""
-        from app import app
-        
-        with app.app_context():
-            log = VerificationLog(
-                user_id=user_id,
-                guild_id=guild_id,
-                setting_id=setting_id
-            )
-            db.session.add(log)
-            db.session.commit()
-            return log
+        return await verification_repo.create_log(user_id, guild_id, setting_id)
+    
+    async def update_log(self, verification_log: VerificationLog, **fields):
+        """Apply changes to a verification log and persist them"""
+        for name, value in fields.items():
+            setattr(verification_log, name, value)
+        await verification_repo.update_log(verification_log.id, **fields)
+    
+    async def update_settings(self, settings: VerificationSetting, **fields):
+        """Apply changes to a guild's verification settings and persist them"""
+        for name, value in fields.items():
+            setattr(settings, name, value)
+        await verification_repo.update_settings(settings.id, **fields)
     
     async def start_user_verification(self, interaction: Interaction, guild_id: str):
         """Start the verification process for a user"""
@@ -402,8 +394,7 @@ class Verification(commands.Cog):
             # Show custom questions
             if not settings.custom_questions:
                 # No questions configured, mark as completed
-                verification_log.questions_completed = True
-                db.session.commit()
+                await self.update_log(verification_log, questions_completed=True)
             else:
                 questions = settings.custom_questions
                 await interaction.followup.send(
@@ -448,18 +439,11 @@ class Verification(commands.Cog):
     
     async def complete_verification(self, interaction: Interaction, verification_log: VerificationLog):
         """Complete the verification process"""
-        from app import app
-        
-        with app.app_context():
-            # Mark verification as successful
-            verification_log.success = True
-            verification_log.completed_at = datetime.utcnow()
-            
-            # Update settings stats
-            settings = await self.get_verification_settings(verification_log.guild_id)
-            settings.successful_verifications += 1
-            
-            db.session.commit()
+        # Mark verification as successful and update settings stats
+        settings = await self.get_verification_settings(verification_log.guild_id)
+        verification_log.success = True
+        verification_log.completed_at = datetime.utcnow()
+        await verification_repo.complete_log(verification_log.id, settings.id, verification_log.completed_at)
         
         # Get the guild and user
         guild = self.bot.get_guild(int(verification_log.guild_id))
@@ -671,30 +655,28 @@ class Verification(commands.Cog):
                 return
                 
             if setting == "captcha":
-                settings.require_captcha = not settings.require_captcha
+                await self.update_settings(settings, require_captcha=not settings.require_captcha)
                 toggle_status = "enabled" if settings.require_captcha else "disabled"
                 await interaction.followup.send(f"Captcha verification {toggle_status}.", ephemeral=True)
                 
             elif setting == "questions":
-                settings.require_questions = not settings.require_questions
+                await self.update_settings(settings, require_questions=not settings.require_questions)
                 toggle_status = "enabled" if settings.require_questions else "disabled"
                 await interaction.followup.send(f"Custom questions {toggle_status}.", ephemeral=True)
                 
             elif setting == "role_accept":
-                settings.require_role_accept = not settings.require_role_accept
+                await self.update_settings(settings, require_role_accept=not settings.require_role_accept)
                 toggle_status = "enabled" if settings.require_role_accept else "disabled"
                 await interaction.followup.send(f"Role acceptance {toggle_status}.", ephemeral=True)
                 
             elif setting == "account_age":
-                settings.require_account_age = not settings.require_account_age
+                await self.update_settings(settings, require_account_age=not settings.require_account_age)
                 toggle_status = "enabled" if settings.require_account_age else "disabled"
                 await interaction.followup.send(f"Account age check {toggle_status}.", ephemeral=True)
                 
             else:
                 await interaction.followup.send(f"Unknown setting: {setting}", ephemeral=True)
                 return
-                
-            db.session.commit()
             
         elif action == "set":
             if not setting:
@@ -712,8 +694,7 @@ class Verification(commands.Cog):
                         await interaction.followup.send("Minimum age must be a positive number.", ephemeral=True)
                         return
                         
-                    settings.min_account_age_days = min_age
-                    db.session.commit()
+                    await self.update_settings(settings, min_account_age_days=min_age)
                     await interaction.followup.send(f"Minimum account age set to {min_age} days.", ephemeral=True)
                 except ValueError:
                     await interaction.followup.send("Please provide a valid number for minimum age.", ephemeral=True)
@@ -723,8 +704,7 @@ class Verification(commands.Cog):
                     await interaction.followup.send("Please specify a channel.", ephemeral=True)
                     return
                     
-                settings.verification_channel_id = str(channel.id)
-                db.session.commit()
+                await self.update_settings(settings, verification_channel_id=str(channel.id))
                 await interaction.followup.send(f"Verification channel set to {channel.mention}.", ephemeral=True)
                 
             elif setting == "verified_role":
@@ -732,8 +712,7 @@ class Verification(commands.Cog):
                     await interaction.followup.send("Please specify a role.", ephemeral=True)
                     return
                     
-                settings.verified_role_id = str(role.id)
-                db.session.commit()
+                await self.update_settings(settings, verified_role_id=str(role.id))
                 await interaction.followup.send(f"Verified role set to {role.mention}.", ephemeral=True)
                 
             elif setting == "welcome_channel":
@@ -741,8 +720,7 @@ class Verification(commands.Cog):
                     await interaction.followup.send("Please specify a channel.", ephemeral=True)
                     return
                     
-                settings.welcome_channel_id = str(channel.id)
-                db.session.commit()
+                await self.update_settings(settings, welcome_channel_id=str(channel.id))
                 await interaction.followup.send(f"Welcome channel set to {channel.mention}.", ephemeral=True)
                 
             elif setting == "welcome_message":
@@ -750,8 +728,7 @@ class Verification(commands.Cog):
                     await interaction.followup.send("Please specify a welcome message.", ephemeral=True)
                     return
                     
-                settings.welcome_message = message
-                db.session.commit()
+                await self.update_settings(settings, welcome_message=message)
                 
                 # Preview the message
                 preview = message.replace("{user}", interaction.user.mention)
@@ -788,12 +765,10 @@ class Verification(commands.Cog):
                 await interaction.followup.send("Question and at least one answer are required.", ephemeral=True)
                 return
                 
-            # Add the question
-            if not settings.custom_questions:
-                settings.custom_questions = []
-                
-            settings.custom_questions.append({"question": question, "answers": answers})
-            db.session.commit()
+            # Add the question (a new list, so the JSON column is written)
+            questions = list(settings.custom_questions or [])
+            questions.append({"question": question, "answers": answers})
+            await self.update_settings(settings, custom_questions=questions)
             
             await interaction.followup.send(
                 f"Added question: \"{question}\"\n"
@@ -811,8 +786,9 @@ class Verification(commands.Cog):
                 return
                 
             # Remove the question
-            removed = settings.custom_questions.pop(index - 1)
-            db.session.commit()
+            questions = list(settings.custom_questions)
+            removed = questions.pop(index - 1)
+            await self.update_settings(settings, custom_questions=questions)
             
             await interaction.followup.send(
                 f"Removed question: \"{removed['question']}\"",
@@ -915,28 +891,8 @@ class Verification(commands.Cog):
                 )
                 return
         
-        # Create a verification log
-        from app import app
-        
-        with app.app_context():
-            # Create verification log
-            verification_log = VerificationLog(
-                user_id=str(user.id),
-                guild_id=guild_id,
-                setting_id=settings.id,
-                success=True,
-                captcha_completed=True,
-                questions_completed=True,
-                role_accept_completed=True,
-                completed_at=datetime.utcnow(),
-                failure_reason=None
-            )
-            db.session.add(verification_log)
-            
-            # Update settings stats
-            settings.successful_verifications += 1
-            
-            db.session.commit()
+        # Create a verification log and update settings stats
+        await verification_repo.record_manual_verification(str(user.id), guild_id, settings.id)
         
         await interaction.followup.send(
             f"✅ {user.mention} has been manually verified by {interaction.user.mention}"
@@ -13,6 +13,7 @@ from discord.ext import commands
 from discord import app_commands
 from utils.embed_helpers import create_embed, create_error_embed
 from cogs.ai_chat import AIChat
+from utils.message_pipeline import get_pipeline, InspectedMessage, Verdict, PRIORITY_VOICE_AI
 
 logger = logging.getLogger('discord')
 
@@ -251,12 +252,20 @@ class VoiceAI(commands.Cog):
             "I've disconnected from the voice channel and disabled AI chat."
         ))
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Listen for messages from users with active voice AI sessions"""
-        # Ignore messages from bots or system messages
-        if message.author.bot or not message.content:
-            return
+    async def cog_load(self):
+        """Register voice AI replies with the shared message pipeline"""
+        get_pipeline(self.bot).register("voice_ai", self.inspect_message, PRIORITY_VOICE_AI)
+
+    async def cog_unload(self):
+        """Remove voice AI replies from the shared message pipeline"""
+        get_pipeline(self.bot).unregister("voice_ai")
+
+    async def inspect_message(self, inspected: InspectedMessage):
+        """Listen for messages from users with active voice AI sessions (message pipeline stage)"""
+        message = inspected.message
+        # Ignore system messages and attachment-only messages
+        if not inspected.content:
+            return Verdict.CONTINUE
             
         # Check if the user has an active voice AI session
         if message.author.id in self.user_sessions and self.user_sessions[message.author.id]["active"]:
@@ -264,7 +273,7 @@ class VoiceAI(commands.Cog):
             guild_id = session["guild_id"]
             
             # Make sure the message is from the same guild as the voice session
-            if message.guild and message.guild.id == guild_id:
+            if message.guild.id == guild_id:
                 # Update last interaction time
                 session["last_interaction"] = asyncio.get_event_loop().time()
                 
@@ -273,10 +282,13 @@ class VoiceAI(commands.Cog):
                     # Don't respond to commands
                     ctx = await self.bot.get_context(message)
                     if ctx.valid:
-                        return
+                        return Verdict.CONTINUE
                         
                     # Generate AI response
                     await self.respond_with_voice(message)
+                    return Verdict.STOP
+        
+        return Verdict.CONTINUE
     
     async def respond_with_voice(self, message):
         """Generate an AI response and play it through voice"""
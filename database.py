@@ -4,4 +4,6 @@ from sqlalchemy.orm import DeclarativeBase
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+# Objects stay readable after commit, so units of work run on the database
+# executor can hand their results back to the event loop
+db = SQLAlchemy(model_class=Base, session_options={"expire_on_commit": False})
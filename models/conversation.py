@@ -1,30 +1,123 @@
 import datetime
 import os
-import time
 import logging
 import threading
 import sqlite3
-from collections import defaultdict
 from typing import Dict, List, Optional, Any
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, create_engine, delete, func, text
+from sqlalchemy.orm import Session, sessionmaker
 from database import Base, db
+from utils.history_store import HistoryStore, Turn
+from utils import sqlite_profile
 
 # Set up logging
 logger = logging.getLogger('discord')
 
 # In-memory conversation history fallback
-# This will be used when the database is not available
-# Structure: {user_id: [{"role": "user/assistant", "content": "message", "timestamp": time.time()}, ...]}
-memory_conversations = defaultdict(list)
-memory_lock = threading.Lock()  # Lock for thread-safe operations
+# This will be used when the database is not available. Each user keeps the
+# last MEMORY_TURNS_PER_USER turns in a ring buffer; least recently active
+# users are dropped once the store passes its user cap or memory budget.
+MEMORY_TURNS_PER_USER = 20
+MEMORY_MAX_USERS = int(os.environ.get("CONVERSATION_MEMORY_MAX_USERS", "5000"))
+MEMORY_MAX_BYTES = int(os.environ.get("CONVERSATION_MEMORY_MAX_BYTES", str(16 * 1024 * 1024)))
+memory_conversations = HistoryStore(MEMORY_TURNS_PER_USER, MEMORY_MAX_BYTES, max_users=MEMORY_MAX_USERS)
+
+# Connection pool sizing for the conversation engine (one engine per process)
+POOL_SIZE = int(os.environ.get("CONVERSATION_DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.environ.get("CONVERSATION_DB_MAX_OVERFLOW", "10"))
+POOL_RECYCLE_SECONDS = 300
+
+# Shared engine and session factory, created on first use
+_engine = None
+_session_factory = None
+_schema_ready = False
+_engine_lock = threading.Lock()
+
+def _sqlite_url() -> str:
+    """URL of the local SQLite fallback database"""
+    data_dir = os.path.join(os.getcwd(), "data")
+    os.makedirs(data_dir, exist_ok=True)
+    return f"sqlite:///{os.path.join(data_dir, 'discord_bot.db')}"
+
+def resolve_database_url() -> str:
+    """Pick the database used for conversation history"""
+    # Check if we're already using SQLite as a fallback
+    if os.environ.get("USING_SQLITE_FALLBACK"):
+        return _sqlite_url()
+    
+    # Try to use the local PostgreSQL database if available
+    if os.environ.get("PGUSER") and os.environ.get("PGHOST") and os.environ.get("PGDATABASE"):
+        return f"postgresql://{os.environ.get('PGUSER')}:{os.environ.get('PGPASSWORD')}@{os.environ.get('PGHOST')}:{os.environ.get('PGPORT')}/{os.environ.get('PGDATABASE')}"
+    
+    # Fall back to the DATABASE_URL environment variable, then the app's configured URL
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        # Import here to avoid circular imports
+        from dashboard.app import app
+        database_url = app.config.get("SQLALCHEMY_DATABASE_URI")
+    
+    return database_url or _sqlite_url()
+
+def get_engine():
+    """Get the shared conversation engine, creating it (and the schema) once"""
+    global _engine, _session_factory, _schema_ready
+    if _engine is not None and _schema_ready:
+        return _engine
+    
+    with _engine_lock:
+        if _engine is None:
+            database_url = resolve_database_url()
+            sqlite_profile.install()
+            options = {"pool_pre_ping": True}
+            if not database_url.startswith("sqlite"):
+                options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_recycle=POOL_RECYCLE_SECONDS)
+            _engine = create_engine(database_url, **options)
+            # Objects stay readable after their session closes
+            _session_factory = sessionmaker(bind=_engine, expire_on_commit=False)
+            logger.info(f"Created conversation database engine ({_engine.url.get_backend_name()})")
+        
+        if not _schema_ready:
+            Base.metadata.create_all(_engine, tables=[Conversation.__table__])
+            _upgrade_schema(_engine)
+            _schema_ready = True
+    return _engine
+
+def _upgrade_schema(engine) -> None:
+    """Bring indexes of an existing conversations table up to date (create_all won't)"""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_conversations_user_timestamp ON conversations (user_id, timestamp)"))
+        # The composite index covers user_id lookups on its own
+        conn.execute(text("DROP INDEX IF EXISTS ix_conversations_user_id"))
+
+def get_session() -> Session:
+    """Open a session from the shared conversation session factory"""
+    get_engine()
+    return _session_factory()
+
+def init_conversation_storage() -> None:
+    """Create the engine and conversation schema (called once at startup)"""
+    get_engine()
+
+def dispose_engine() -> None:
+    """Close every pooled connection (called on shutdown)"""
+    global _engine, _session_factory, _schema_ready
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+        _schema_ready = False
 
 class Conversation(Base):
     """Model for storing conversation history between users and the bot"""
     __tablename__ = 'conversations'
+    __table_args__ = (
+        # Latest-N history for a user is a range scan of this index, no sort
+        Index('idx_conversations_user_timestamp', 'user_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(String(64), nullable=False, index=True)  # Discord user ID
+    user_id = Column(String(64), nullable=False)  # Discord user ID
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     role = Column(String(20), nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
@@ -33,203 +126,113 @@ class Conversation(Base):
         return f"<Conversation {self.id} - User: {self.user_id}, Role: {self.role}>"
     
     @classmethod
-    def _add_to_memory(cls, user_id: str, role: str, content: str) -> Dict[str, Any]:
-        """Add a message to the in-memory conversation store"""
-        message = {
-            "role": role, 
-            "content": content, 
-            "timestamp": time.time()
-        }
-        
-        with memory_lock:
-            # Keep only the last 20 messages per user to avoid memory issues
-            if len(memory_conversations[user_id]) >= 20:
-                memory_conversations[user_id].pop(0)  # Remove oldest message
-            
-            memory_conversations[user_id].append(message)
-        
-        logger.info(f"Added message to in-memory store for user {user_id}")
-        return message
+    def _add_to_memory(cls, user_id: str, turns: List[tuple]) -> None:
+        """Add (role, content) turns to the in-memory conversation store"""
+        now = datetime.datetime.utcnow()
+        memory_conversations.append(
+            str(user_id),
+            [Turn(role, content, now) for role, content in turns],
+            create=True
+        )
     
     @classmethod
-    def _get_from_memory(cls, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get messages from the in-memory conversation store"""
-        with memory_lock:
-            # Return a copy of the messages to avoid modification issues
-            messages = memory_conversations.get(user_id, [])[:]
-        
-        # Sort messages by timestamp (oldest first)
-        messages.sort(key=lambda x: x.get("timestamp", 0))
-        
-        # Return only the requested number of messages
-        return messages[-limit:] if limit > 0 else messages
+    def _get_from_memory(cls, user_id: str, limit: int = 10) -> List[Turn]:
+        """Get messages from the in-memory conversation store, oldest first"""
+        # Turns are stored in arrival order, so no sorting is needed
+        return memory_conversations.recent(str(user_id), limit, partial=True)
+    
+    @classmethod
+    def memory_formatted_history(cls, user_id: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Formatted history from the in-memory store only (turns since startup), oldest first"""
+        return [{"role": turn.role, "content": turn.content} for turn in cls._get_from_memory(user_id, limit)]
     
     @classmethod
     def _clear_memory(cls, user_id: str) -> int:
         """Clear the in-memory conversation history for a user"""
-        with memory_lock:
-            count = len(memory_conversations.get(user_id, []))
-            if user_id in memory_conversations:
-                memory_conversations[user_id] = []
-        
+        count = memory_conversations.discard(str(user_id))
         logger.info(f"Cleared in-memory conversation history for user {user_id}")
         return count
     
     @classmethod
     def add_message(cls, user_id: str, role: str, content: str) -> Optional[Any]:
         """Add a new message to the conversation history"""
-        # Import here to avoid circular imports
-        from dashboard.app import app
-        
+        messages = cls.add_messages(user_id, [(role, content)])
+        return messages[0] if messages else None
+    
+    @classmethod
+    def add_exchange(cls, user_id: str, user_content: str, assistant_content: str) -> List[Any]:
+        """Add a user turn and the assistant's reply in one transaction"""
+        return cls.add_messages(user_id, [("user", user_content), ("assistant", assistant_content)])
+    
+    @classmethod
+    def add_messages(cls, user_id: str, turns: List[tuple]) -> List[Any]:
+        """Add (role, content) turns to the conversation history in one transaction"""
         # First, always add to in-memory store as backup
-        cls._add_to_memory(user_id, role, content)
+        cls._add_to_memory(user_id, turns)
         
         # Then try to add to database if possible
         try:
-            with app.app_context():
-                # Create a new session to avoid using a potentially closed one
-                from sqlalchemy.orm import Session
-                from sqlalchemy import create_engine
-                
-                # Check if we're already using SQLite as a fallback
-                if os.environ.get("USING_SQLITE_FALLBACK"):
-                    # Use SQLite directly
-                    data_dir = os.path.join(os.getcwd(), "data")
-                    os.makedirs(data_dir, exist_ok=True)
-                    sqlite_path = os.path.join(data_dir, "discord_bot.db")
-                    database_url = f"sqlite:///{sqlite_path}"
-                    logger.info(f"Using SQLite fallback for conversation history: {sqlite_path}")
-                # Try to use the local PostgreSQL database if available
-                elif os.environ.get("PGUSER") and os.environ.get("PGHOST") and os.environ.get("PGDATABASE"):
-                    # Create a database URL from environment variables
-                    local_db_url = f"postgresql://{os.environ.get('PGUSER')}:{os.environ.get('PGPASSWORD')}@{os.environ.get('PGHOST')}:{os.environ.get('PGPORT')}/{os.environ.get('PGDATABASE')}"
-                    database_url = local_db_url
-                    logger.info(f"Using local PostgreSQL database for conversation history")
-                else:
-                    # Fall back to the DATABASE_URL environment variable
-                    database_url = os.environ.get("DATABASE_URL")
-                    
-                    if not database_url:
-                        # Fall back to the app's configured database URL
-                        database_url = app.config.get("SQLALCHEMY_DATABASE_URI")
-                
-                if not database_url:
-                    # Final fallback to SQLite if all else fails
-                    data_dir = os.path.join(os.getcwd(), "data")
-                    os.makedirs(data_dir, exist_ok=True)
-                    sqlite_path = os.path.join(data_dir, "discord_bot.db")
-                    database_url = f"sqlite:///{sqlite_path}"
-                    logger.info(f"No database URL found, using SQLite fallback: {sqlite_path}")
-                
-                # Create a new engine and session for this operation
-                engine = create_engine(database_url, pool_pre_ping=True)
-                session = Session(engine)
-                
-                try:
-                    # Create and add the message
-                    message = cls(user_id=str(user_id), role=role, content=content)
-                    session.add(message)
-                    session.commit()
-                    return message
-                except Exception as e:
-                    session.rollback()
-                    raise e
-                finally:
-                    session.close()
-                    engine.dispose()
+            session = get_session()
+            try:
+                now = datetime.datetime.utcnow()
+                messages = [
+                    # Spread the timestamps so the turns keep their order
+                    cls(user_id=str(user_id), role=role, content=content,
+                        timestamp=now + datetime.timedelta(microseconds=index))
+                    for index, (role, content) in enumerate(turns)
+                ]
+                session.add_all(messages)
+                session.commit()
+                return messages
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
         except Exception as e:
             # Log the error but don't raise - we don't want to break the chat functionality
             logger.error(f"Error saving message to database: {str(e)}")
             logger.info("Message saved to in-memory store as fallback")
-            return None
+            return []
+    
+    @classmethod
+    def _query_history(cls, user_id: str, limit: int) -> List[Any]:
+        """The user's newest turns from the database, newest first (raises on database errors)"""
+        session = get_session()
+        try:
+            return session.query(cls).filter(cls.user_id == str(user_id))\
+                .order_by(cls.timestamp.desc(), cls.id.desc())\
+                .limit(limit)\
+                .all()
+        finally:
+            session.close()
     
     @classmethod
     def get_history(cls, user_id: str, limit: int = 10) -> List[Any]:
         """Get the conversation history for a user, limited to the last X messages"""
-        # Import here to avoid circular imports
-        from dashboard.app import app
-        
         try:
-            with app.app_context():
-                # Create a new session to avoid using a potentially closed one
-                from sqlalchemy.orm import Session
-                from sqlalchemy import create_engine
-                
-                # Check if we're already using SQLite as a fallback
-                if os.environ.get("USING_SQLITE_FALLBACK"):
-                    # Use SQLite directly
-                    data_dir = os.path.join(os.getcwd(), "data")
-                    os.makedirs(data_dir, exist_ok=True)
-                    sqlite_path = os.path.join(data_dir, "discord_bot.db")
-                    database_url = f"sqlite:///{sqlite_path}"
-                    logger.info(f"Using SQLite fallback for conversation history retrieval: {sqlite_path}")
-                # Try to use the local PostgreSQL database if available
-                elif os.environ.get("PGUSER") and os.environ.get("PGHOST") and os.environ.get("PGDATABASE"):
-                    # Create a database URL from environment variables
-                    local_db_url = f"postgresql://{os.environ.get('PGUSER')}:{os.environ.get('PGPASSWORD')}@{os.environ.get('PGHOST')}:{os.environ.get('PGPORT')}/{os.environ.get('PGDATABASE')}"
-                    database_url = local_db_url
-                    logger.info(f"Using local PostgreSQL database for conversation history retrieval")
-                else:
-                    # Fall back to the DATABASE_URL environment variable
-                    database_url = os.environ.get("DATABASE_URL")
-                    
-                    if not database_url:
-                        # Fall back to the app's configured database URL
-                        database_url = app.config.get("SQLALCHEMY_DATABASE_URI")
-                
-                if not database_url:
-                    # Final fallback to SQLite if all else fails
-                    data_dir = os.path.join(os.getcwd(), "data")
-                    os.makedirs(data_dir, exist_ok=True)
-                    sqlite_path = os.path.join(data_dir, "discord_bot.db")
-                    database_url = f"sqlite:///{sqlite_path}"
-                    logger.info(f"No database URL found, using SQLite fallback for retrieval: {sqlite_path}")
-                
-                # Create a new engine and session for this operation
-                engine = create_engine(database_url, pool_pre_ping=True)
-                session = Session(engine)
-                
-                try:
-                    # Query for messages
-                    Base.metadata.create_all(engine)
-                    result = session.query(cls).filter(cls.user_id == str(user_id))\
-                        .order_by(cls.timestamp.desc())\
-                        .limit(limit)\
-                        .all()
-                    return result
-                except Exception as e:
-                    session.rollback()
-                    raise e
-                finally:
-                    session.close()
-                    engine.dispose()
+            return cls._query_history(user_id, limit)
         except Exception as e:
             # Log the error but don't raise - we don't want to break the chat functionality
             logger.error(f"Error fetching conversation history from database: {str(e)}")
             logger.info("Using in-memory conversation history as fallback")
             
-            # Return memory messages in a format compatible with the database model
-            class MemoryMessage:
-                def __init__(self, role, content):
-                    self.role = role
-                    self.content = content
-                    self.timestamp = datetime.datetime.now()
-            
+            # Turns have the same role/content/timestamp attributes as the model; newest first to match
             memory_msgs = cls._get_from_memory(user_id, limit)
-            return [MemoryMessage(msg["role"], msg["content"]) for msg in memory_msgs]
+            memory_msgs.reverse()
+            return memory_msgs
     
     @classmethod
-    def get_formatted_history(cls, user_id: str, limit: int = 10) -> List[Dict[str, str]]:
+    def get_formatted_history(cls, user_id: str, limit: int = 10, fallback: bool = True) -> List[Dict[str, str]]:
         """
         Get the conversation history formatted for AI context
         Returns a list of {"role": "user"|"assistant", "content": "message"} dictionaries
+        With fallback=False a database error is raised instead of answering from memory.
         """
-        messages = cls.get_history(user_id, limit)
+        messages = cls.get_history(user_id, limit) if fallback else cls._query_history(user_id, limit)
         
-        # Check if we received actual database objects or our memory fallback
-        if messages and hasattr(messages[0], 'timestamp'):
-            # Reverse to get chronological order (oldest first) for database objects
-            messages.reverse()
+        # Reverse to get chronological order (oldest first)
+        messages.reverse()
         
         return [{"role": msg.role, "content": msg.content} for msg in messages]
     
@@ -240,63 +243,76 @@ class Conversation(Base):
         cls._clear_memory(user_id)
         
         # Then try to clear the database
-        # Import here to avoid circular imports
-        from dashboard.app import app
-        
         try:
-            with app.app_context():
-                # Create a new session to avoid using a potentially closed one
-                from sqlalchemy.orm import Session
-                from sqlalchemy import create_engine
-                
-                # Check if we're already using SQLite as a fallback
-                if os.environ.get("USING_SQLITE_FALLBACK"):
-                    # Use SQLite directly
-                    data_dir = os.path.join(os.getcwd(), "data")
-                    os.makedirs(data_dir, exist_ok=True)
-                    sqlite_path = os.path.join(data_dir, "discord_bot.db")
-                    database_url = f"sqlite:///{sqlite_path}"
-                    logger.info(f"Using SQLite fallback for clearing conversation history: {sqlite_path}")
-                # Try to use the local PostgreSQL database if available
-                elif os.environ.get("PGUSER") and os.environ.get("PGHOST") and os.environ.get("PGDATABASE"):
-                    # Create a database URL from environment variables
-                    local_db_url = f"postgresql://{os.environ.get('PGUSER')}:{os.environ.get('PGPASSWORD')}@{os.environ.get('PGHOST')}:{os.environ.get('PGPORT')}/{os.environ.get('PGDATABASE')}"
-                    database_url = local_db_url
-                    logger.info(f"Using local PostgreSQL database for clearing conversation history")
-                else:
-                    # Fall back to the DATABASE_URL environment variable
-                    database_url = os.environ.get("DATABASE_URL")
-                    
-                    if not database_url:
-                        # Fall back to the app's configured database URL
-                        database_url = app.config.get("SQLALCHEMY_DATABASE_URI")
-                
-                if not database_url:
-                    # Final fallback to SQLite if all else fails
-                    data_dir = os.path.join(os.getcwd(), "data")
-                    os.makedirs(data_dir, exist_ok=True)
-                    sqlite_path = os.path.join(data_dir, "discord_bot.db")
-                    database_url = f"sqlite:///{sqlite_path}"
-                    logger.info(f"No database URL found, using SQLite fallback for clearing history: {sqlite_path}")
-                
-                # Create a new engine and session for this operation
-                engine = create_engine(database_url, pool_pre_ping=True)
-                session = Session(engine)
-                
-                try:
-                    # Delete messages for this user
-                    Base.metadata.create_all(engine)
-                    result = session.query(cls).filter(cls.user_id == str(user_id)).delete()
-                    session.commit()
-                    return result
-                except Exception as e:
-                    session.rollback()
-                    raise e
-                finally:
-                    session.close()
-                    engine.dispose()
+            session = get_session()
+            try:
+                result = session.query(cls).filter(cls.user_id == str(user_id)).delete()
+                session.commit()
+                return result
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
         except Exception as e:
             # Log the error but don't raise - we don't want to break the chat functionality
             logger.error(f"Error clearing conversation history from database: {str(e)}")
             logger.info("In-memory conversation history was cleared as fallback")
-            return 0  # Return 0 rows affected on error
\ No newline at end of file
+            return 0  # Return 0 rows affected on error
+    
+    @classmethod
+    def _delete_ids(cls, session, rows) -> set:
+        """Delete the (id, user_id) rows; returns the affected user ids"""
+        if not rows:
+            return set()
+        session.execute(delete(cls).where(cls.id.in_([row[0] for row in rows])))
+        session.commit()
+        return {row[1] for row in rows}
+    
+    @classmethod
+    def prune_older_than(cls, cutoff: datetime.datetime, batch_size: int) -> tuple:
+        """Delete one batch of turns from before cutoff; returns (rows deleted, user ids affected)"""
+        session = get_session()
+        try:
+            # Old rows have the lowest ids, so walking the primary key finds them without a timestamp index
+            rows = session.query(cls.id, cls.user_id)\
+                .filter(cls.timestamp < cutoff)\
+                .order_by(cls.id)\
+                .limit(batch_size)\
+                .all()
+            return len(rows), cls._delete_ids(session, rows)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    @classmethod
+    def users_over_limit(cls, max_turns: int) -> List[str]:
+        """Users with more than max_turns stored turns"""
+        session = get_session()
+        try:
+            return [row[0] for row in session.query(cls.user_id)
+                    .group_by(cls.user_id)
+                    .having(func.count(cls.id) > max_turns)]
+        finally:
+            session.close()
+    
+    @classmethod
+    def prune_user(cls, user_id: str, keep: int, batch_size: int) -> int:
+        """Delete one batch of a user's turns beyond the newest `keep`; returns rows deleted"""
+        session = get_session()
+        try:
+            rows = session.query(cls.id, cls.user_id)\
+                .filter(cls.user_id == str(user_id))\
+                .order_by(cls.timestamp.desc(), cls.id.desc())\
+                .offset(keep)\
+                .limit(batch_size)\
+                .all()
+            cls._delete_ids(session, rows)
+            return len(rows)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
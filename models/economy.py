@@ -1,6 +1,6 @@
 from database import db
 from datetime import datetime
-from sqlalchemy import Index
+from sqlalchemy import Index, UniqueConstraint, inspect, text
 
 class UserEconomy(db.Model):
     __tablename__ = 'user_economy'
@@ -14,15 +14,15 @@ class UserEconomy(db.Model):
     last_daily = db.Column(db.DateTime)
     last_work = db.Column(db.DateTime)
     last_rob = db.Column(db.DateTime)  # Added for robbery cooldown
+    # Stored wallet + bank, updated with every balance change so leaderboards can use an index
+    total_balance = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     # Create an index on user_id for faster lookups
-    __table_args__ = (Index('idx_user_economy_user_id', 'user_id'),)
+    __table_args__ = (
+        Index('idx_user_economy_user_id', 'user_id'),
+        Index('idx_user_economy_total_balance', 'total_balance'),
+    )
 
-    @property
-    def total_balance(self):
-        """Get total balance (wallet + bank)"""
-        return self.wallet + self.bank
-        
     @property
     def display_identifier(self):
         """Get a user-friendly display identifier"""
@@ -97,6 +97,34 @@ class Transaction(db.Model):
         else:
             return f"User {self.user_id}"
 
+class TransactionDaily(db.Model):
+    """Per-user daily totals of transactions compacted out of the transaction table"""
+    __tablename__ = 'transaction_daily'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(20), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    credited = db.Column(db.Integer, default=0, nullable=False)  # Sum of positive amounts
+    debited = db.Column(db.Integer, default=0, nullable=False)  # Sum of negative amounts (as a positive number)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'day', name='uq_transaction_daily_user_day'),
+    )
+
+    @property
+    def net(self):
+        """Net change in coins for the day"""
+        return self.credited - self.debited
+
+def upgrade_economy_schema():
+    """Add columns introduced after an existing database was created (create_all won't)"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('user_economy')}
+    if 'total_balance' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE user_economy ADD COLUMN total_balance INTEGER NOT NULL DEFAULT 0"))
+            conn.execute(text("UPDATE user_economy SET total_balance = COALESCE(wallet, 0) + COALESCE(bank, 0)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_user_economy_total_balance ON user_economy (total_balance)"))
+
 def initialize_shop():
     """Initialize the shop with default items"""
     default_items = [
@@ -0,0 +1,159 @@
+from database import db
+from datetime import datetime, timedelta
+from sqlalchemy import Index, UniqueConstraint, func
+
+# Event sources
+SOURCE_PROFANITY = 'profanity'
+SOURCE_RULE = 'rule'
+
+# Events older than this are rolled up into ModerationAggregate rows
+DEFAULT_RETENTION_DAYS = 90
+
+class ModerationEvent(db.Model):
+    """One profanity warning or rule violation"""
+    __tablename__ = 'moderation_event'
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.String(20), nullable=False)
+    user_id = db.Column(db.String(20), nullable=False)
+    source = db.Column(db.String(20), nullable=False)  # 'profanity' or 'rule'
+    rule_id = db.Column(db.String(50), nullable=True)  # Rule ID for rule violations
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Every lookup filters on (guild, user, source) and a time range
+    __table_args__ = (
+        Index('idx_moderation_event_lookup', 'guild_id', 'user_id', 'source', 'timestamp'),
+        Index('idx_moderation_event_timestamp', 'timestamp'),
+    )
+
+class ModerationAggregate(db.Model):
+    """Rolled-up counts of moderation events older than the retention window"""
+    __tablename__ = 'moderation_aggregate'
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.String(20), nullable=False)
+    user_id = db.Column(db.String(20), nullable=False)
+    source = db.Column(db.String(20), nullable=False)
+    rule_id = db.Column(db.String(50), nullable=False, default='')  # '' for profanity warnings
+    count = db.Column(db.Integer, default=0, nullable=False)
+    first_seen = db.Column(db.DateTime, nullable=True)
+    last_seen = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('guild_id', 'user_id', 'source', 'rule_id', name='uq_moderation_aggregate_key'),
+    )
+
+def record_event(guild_id, user_id, source, rule_id=None, timestamp=None):
+    """Record a moderation event (caller commits)"""
+    event = ModerationEvent(
+        guild_id=str(guild_id),
+        user_id=str(user_id),
+        source=source,
+        rule_id=str(rule_id) if rule_id is not None else None,
+        timestamp=timestamp or datetime.utcnow()
+    )
+    db.session.add(event)
+    return event
+
+def count_events(guild_id, user_id, source, since=None, include_aggregates=False):
+    """Count a user's events, optionally only those at or after `since`"""
+    query = db.session.query(func.count(ModerationEvent.id)).filter(
+        ModerationEvent.guild_id == str(guild_id),
+        ModerationEvent.user_id == str(user_id),
+        ModerationEvent.source == source
+    )
+    if since is not None:
+        query = query.filter(ModerationEvent.timestamp >= since)
+    total = query.scalar() or 0
+
+    if include_aggregates:
+        total += db.session.query(func.coalesce(func.sum(ModerationAggregate.count), 0)).filter(
+            ModerationAggregate.guild_id == str(guild_id),
+            ModerationAggregate.user_id == str(user_id),
+            ModerationAggregate.source == source
+        ).scalar() or 0
+    return total
+
+def count_events_by_rule(guild_id, user_id, since):
+    """Rule violation counts per rule ID since a point in time"""
+    rows = db.session.query(ModerationEvent.rule_id, func.count(ModerationEvent.id)).filter(
+        ModerationEvent.guild_id == str(guild_id),
+        ModerationEvent.user_id == str(user_id),
+        ModerationEvent.source == SOURCE_RULE,
+        ModerationEvent.timestamp >= since
+    ).group_by(ModerationEvent.rule_id).all()
+    return {rule_id: count for rule_id, count in rows}
+
+def count_guild_events_by_user(guild_id, source):
+    """Total event counts (live plus rolled up) per user in a guild"""
+    totals = {}
+    rows = db.session.query(ModerationEvent.user_id, func.count(ModerationEvent.id)).filter(
+        ModerationEvent.guild_id == str(guild_id),
+        ModerationEvent.source == source
+    ).group_by(ModerationEvent.user_id).all()
+    for user_id, count in rows:
+        totals[user_id] = totals.get(user_id, 0) + count
+
+    rows = db.session.query(ModerationAggregate.user_id, func.sum(ModerationAggregate.count)).filter(
+        ModerationAggregate.guild_id == str(guild_id),
+        ModerationAggregate.source == source
+    ).group_by(ModerationAggregate.user_id).all()
+    for user_id, count in rows:
+        totals[user_id] = totals.get(user_id, 0) + (count or 0)
+    return totals
+
+def clear_events(guild_id, user_id, source):
+    """Delete a user's events and aggregates for one source; returns how many were live"""
+    filters = dict(guild_id=str(guild_id), user_id=str(user_id), source=source)
+    deleted = ModerationEvent.query.filter_by(**filters).delete(synchronize_session=False)
+    deleted += ModerationAggregate.query.filter_by(**filters).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+def add_to_aggregate(guild_id, user_id, source, rule_id, count, first_seen=None, last_seen=None):
+    """Fold `count` events into the aggregate row for a key (caller commits)"""
+    key = dict(guild_id=str(guild_id), user_id=str(user_id), source=source, rule_id=rule_id or '')
+    aggregate = ModerationAggregate.query.filter_by(**key).first()
+    if aggregate is None:
+        aggregate = ModerationAggregate(count=0, **key)
+        db.session.add(aggregate)
+
+    aggregate.count = (aggregate.count or 0) + count
+    if first_seen and (aggregate.first_seen is None or first_seen < aggregate.first_seen):
+        aggregate.first_seen = first_seen
+    if last_seen and (aggregate.last_seen is None or last_seen > aggregate.last_seen):
+        aggregate.last_seen = last_seen
+    return aggregate
+
+def roll_up_events(retention_days=DEFAULT_RETENTION_DAYS):
+    """Roll events older than the retention window into per-user aggregates
+
+    Returns the number of event rows removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    groups = db.session.query(
+        ModerationEvent.guild_id,
+        ModerationEvent.user_id,
+        ModerationEvent.source,
+        ModerationEvent.rule_id,
+        func.count(ModerationEvent.id),
+        func.min(ModerationEvent.timestamp),
+        func.max(ModerationEvent.timestamp)
+    ).filter(
+        ModerationEvent.timestamp < cutoff
+    ).group_by(
+        ModerationEvent.guild_id,
+        ModerationEvent.user_id,
+        ModerationEvent.source,
+        ModerationEvent.rule_id
+    ).all()
+
+    if not groups:
+        return 0
+
+    for guild_id, user_id, source, rule_id, count, first_seen, last_seen in groups:
+        add_to_aggregate(guild_id, user_id, source, rule_id, count, first_seen, last_seen)
+
+    removed = ModerationEvent.query.filter(
+        ModerationEvent.timestamp < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
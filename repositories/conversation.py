@@ -0,0 +1,144 @@
+"""
+Conversation Repository for Discord Bot
+
+Async wrappers around the Conversation model. The model manages its own
+pooled engine and sessions; these functions only move each call onto the
+database executor so AI chat handlers never block the event loop.
+
+Formatted history is served from a per-user hot cache of the newest turns.
+A user's cache entry is filled from the database once, appended to as turns
+are added and dropped when their history is cleared, so consecutive turns of
+an active chat (and repeated lookups while falling through AI providers)
+never touch the database.
+
+The table is kept bounded by a retention policy: at most
+CONVERSATION_MAX_TURNS turns per user and nothing older than
+CONVERSATION_RETENTION_DAYS (0 turns either limit off), enforced in small
+batches by prune_history().
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from models.conversation import Conversation
+from utils.db_executor import run_blocking, run_blocking_write
+from utils.history_store import HistoryStore, Turn
+
+logger = logging.getLogger('discord')
+
+# Newest turns cached per user, and the memory budget for the whole cache
+HISTORY_CACHE_TURNS = int(os.environ.get("CONVERSATION_CACHE_TURNS", "20"))
+HISTORY_CACHE_MAX_BYTES = int(os.environ.get("CONVERSATION_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+_history_cache = HistoryStore(HISTORY_CACHE_TURNS, HISTORY_CACHE_MAX_BYTES)
+
+# Retention policy; 0 disables a limit
+MAX_TURNS_PER_USER = int(os.environ.get("CONVERSATION_MAX_TURNS", "200"))
+RETENTION_DAYS = int(os.environ.get("CONVERSATION_RETENTION_DAYS", "90"))
+# Rows deleted per database transaction
+RETENTION_BATCH = int(os.environ.get("CONVERSATION_RETENTION_BATCH", "1000"))
+
+# user_id -> token of the cache fill in flight; a write in the meantime cancels the fill
+_filling = {}
+
+
+def _format(turns: List[Turn]) -> List[Dict[str, str]]:
+    return [{"role": turn.role, "content": turn.content} for turn in turns]
+
+
+def _forget(user_id: str) -> None:
+    """Drop a user's cache entry and cancel any fill in flight"""
+    _filling.pop(user_id, None)
+    _history_cache.discard(user_id)
+
+
+def _cache_turns(user_id: str, turns: List[tuple]) -> None:
+    """Record newly added turns in the hot cache"""
+    _filling.pop(user_id, None)
+    _history_cache.append(user_id, [Turn(role, content) for role, content in turns])
+
+
+async def add_message(user_id: str, role: str, content: str) -> Any:
+    """Add one turn to a user's conversation history"""
+    message = await run_blocking_write(Conversation.add_message, user_id, role, content)
+    _cache_turns(user_id, [(role, content)])
+    return message
+
+
+async def add_exchange(user_id: str, user_content: str, assistant_content: str) -> List[Any]:
+    """Add a user turn and the assistant's reply in one transaction"""
+    messages = await run_blocking_write(Conversation.add_exchange, user_id, user_content, assistant_content)
+    _cache_turns(user_id, [("user", user_content), ("assistant", assistant_content)])
+    return messages
+
+
+async def get_history(user_id: str, limit: int = 10) -> List[Any]:
+    """A user's most recent turns, newest first"""
+    return await run_blocking(Conversation.get_history, user_id, limit)
+
+
+async def get_formatted_history(user_id: str, limit: int = 10) -> List[Dict[str, str]]:
+    """A user's recent turns as role/content dicts, oldest first"""
+    cached = _history_cache.recent(user_id, limit)
+    if cached is not None:
+        return _format(cached)
+
+    # Fetch a full cache entry's worth so the following turns are served from memory
+    fetch = max(limit, HISTORY_CACHE_TURNS)
+    token = _filling[user_id] = object()
+    try:
+        history = await run_blocking(Conversation.get_formatted_history, user_id, fetch, False)
+    except Exception as e:
+        # The in-memory fallback only holds turns since startup, so it must never fill the cache
+        if _filling.get(user_id) is token:
+            del _filling[user_id]
+        logger.error(f"Error fetching conversation history from database: {str(e)}")
+        return Conversation.memory_formatted_history(user_id, limit)
+    if _filling.get(user_id) is token:
+        del _filling[user_id]
+        _history_cache.put(
+            user_id,
+            [Turn(message["role"], message["content"]) for message in history],
+            complete=len(history) < fetch
+        )
+    return history[-limit:] if limit > 0 else history
+
+
+async def clear_history(user_id: str) -> int:
+    """Delete a user's conversation history"""
+    _forget(user_id)
+    count = await run_blocking_write(Conversation.clear_history, user_id)
+    # A fill that read the history while it was being deleted must not survive
+    _forget(user_id)
+    return count
+
+
+async def prune_history(max_turns: int = MAX_TURNS_PER_USER, retention_days: int = RETENTION_DAYS,
+                        batch_size: int = RETENTION_BATCH) -> int:
+    """Delete turns outside the retention policy
+
+    Works in batches, each its own database transaction, so a large backlog
+    never holds a long lock. Returns the number of rows removed.
+    """
+    removed = 0
+    if retention_days > 0:
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        while True:
+            batch, user_ids = await run_blocking_write(Conversation.prune_older_than, cutoff, batch_size)
+            for user_id in user_ids:
+                _forget(user_id)
+            removed += batch
+            if batch < batch_size:
+                break
+
+    if max_turns > 0:
+        for user_id in await run_blocking(Conversation.users_over_limit, max_turns):
+            while True:
+                batch = await run_blocking_write(Conversation.prune_user, user_id, max_turns, batch_size)
+                removed += batch
+                if batch < batch_size:
+                    break
+            _forget(user_id)
+    return removed
@@ -0,0 +1,781 @@
+"""
+Economy Repository for Discord Bot
+
+Async data access for the economy system. Every public function is one unit
+of work run on the database executor, so command handlers never block the
+event loop on a query. Failures the user should see are raised as
+EconomyError (or CooldownError) with a ready-to-show message.
+
+Balance changes are single conditional UPDATE ... RETURNING statements that
+check and apply the change in the database, so concurrent commands from the
+same user can never lose an update or overdraw a wallet. The matching
+Transaction row is inserted in the same database transaction. With
+write-behind mode on, the frequent small rewards and bets are batched by
+repositories/economy_cache.py instead.
+"""
+
+import os
+from collections import OrderedDict, namedtuple
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update, insert, delete, func, case, literal, and_, or_, true
+from sqlalchemy.orm import joinedload
+
+from database import db
+from models.economy import UserEconomy, Item, Inventory, Transaction, TransactionDaily
+from repositories import item_catalog
+from utils.db_executor import run_db, run_write
+from utils.top_k import TopKTracker
+
+# Balances returned by balance-changing operations
+Balance = namedtuple("Balance", ["wallet", "bank", "bank_capacity"])
+
+# Richest users kept in memory for the leaderboard (more than are ever shown)
+LEADERBOARD_TRACKED = 100
+# Users per IN (...) query when ranking a guild's members
+_LEADERBOARD_QUERY_CHUNK = 500
+
+# Guilds whose leaderboards are kept in memory; the least recently read are dropped
+LEADERBOARD_GUILDS = int(os.environ.get("LEADERBOARD_GUILDS", "100"))
+
+_leaderboard = TopKTracker(LEADERBOARD_TRACKED)
+# guild_id -> (TopKTracker of the guild's members, their user ids), built on first read
+_guild_leaderboards: "OrderedDict[str, tuple]" = OrderedDict()
+
+# One page of transaction history; next_cursor is None on the last page
+TransactionPage = namedtuple("TransactionPage", ["transactions", "next_cursor"])
+
+# Transactions older than this are compacted into per-user daily totals
+TRANSACTION_RETENTION_DAYS = int(os.environ.get("TRANSACTION_RETENTION_DAYS", "90"))
+# Rows compacted per database transaction
+TRANSACTION_COMPACTION_BATCH = int(os.environ.get("TRANSACTION_COMPACTION_BATCH", "5000"))
+
+# Daily bank interest in basis points (50 = 0.5%); 0 turns interest off
+BANK_INTEREST_BPS = int(os.environ.get("BANK_INTEREST_BPS", "50"))
+
+# Outcome of an economy-wide credit: users affected and coins minted
+BulkCredit = namedtuple("BulkCredit", ["users", "minted"])
+
+_BALANCE_COLUMNS = (UserEconomy.wallet, UserEconomy.bank, UserEconomy.bank_capacity)
+
+# Robbery rules
+ROB_MIN_ROBBER_WALLET = 100
+ROB_MIN_VICTIM_WALLET = 50
+
+
+class EconomyError(Exception):
+    """An economy operation was refused; the message is shown to the user"""
+
+
+class CooldownError(EconomyError):
+    """An action is still on cooldown"""
+
+    def __init__(self, time_left: timedelta):
+        super().__init__(f"On cooldown for {time_left}")
+        self.time_left = time_left
+
+
+def _insert_ignore(model, values: dict) -> None:
+    """INSERT a row unless it would violate a unique constraint"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        # Generic fallback: try the insert inside a savepoint
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model).values(**values))
+        except Exception:
+            pass
+        return
+    db.session.execute(dialect_insert(model).values(**values).on_conflict_do_nothing())
+
+
+def _ensure_user(user_id: str, username: str = None, display_name: str = None) -> None:
+    """Create a user's economy row if it doesn't exist yet (caller commits)"""
+    _insert_ignore(UserEconomy, dict(
+        user_id=str(user_id),
+        username=username,
+        display_name=display_name,
+        wallet=0,
+        bank=0,
+        bank_capacity=1000,
+        total_balance=0
+    ))
+
+
+def _name_values(username: str = None, display_name: str = None) -> dict:
+    """Column values that refresh the stored Discord names"""
+    values = {}
+    if username:
+        values["username"] = username
+    if display_name:
+        values["display_name"] = display_name
+    return values
+
+
+def _apply(user_id: str, changes: dict, *conditions) -> Optional[Balance]:
+    """Conditionally update one user's row; returns the new balance or None if no row matched"""
+    if "wallet" in changes or "bank" in changes:
+        # SET expressions see the old row, so rebuild the total from the new values
+        changes = dict(changes, total_balance=(
+            changes.get("wallet", UserEconomy.wallet) + changes.get("bank", UserEconomy.bank)
+        ))
+    row = db.session.execute(
+        update(UserEconomy)
+        .where(UserEconomy.user_id == str(user_id), *conditions)
+        .values(**changes)
+        .returning(*_BALANCE_COLUMNS)
+    ).first()
+    return Balance(*row) if row else None
+
+
+def _apply_or_create(user_id: str, username: str, display_name: str, changes: dict, *conditions) -> Optional[Balance]:
+    """_apply, creating the user's row and retrying once if it didn't exist"""
+    balance = _apply(user_id, changes, *conditions)
+    if balance is None and _load_user(user_id) is None:
+        _ensure_user(user_id, username, display_name)
+        balance = _apply(user_id, changes, *conditions)
+    return balance
+
+
+def _load_user(user_id: str) -> Optional[UserEconomy]:
+    """Read a user's row (used only to explain a refused update)"""
+    return db.session.execute(
+        select(UserEconomy).where(UserEconomy.user_id == str(user_id))
+    ).scalar_one_or_none()
+
+
+def _record_transaction(user_id: str, username: str, display_name: str, amount: int, description: str) -> None:
+    """Insert a transaction row (caller commits)"""
+    db.session.execute(insert(Transaction).values(
+        user_id=str(user_id),
+        username=username,
+        display_name=display_name,
+        amount=amount,
+        description=description,
+        timestamp=datetime.utcnow()
+    ))
+
+
+def _cooldown_left(last_used: Optional[datetime], cooldown: timedelta, now: datetime) -> Optional[timedelta]:
+    """Time left on a cooldown, or None if it has passed"""
+    if last_used and now - last_used < cooldown:
+        return cooldown - (now - last_used)
+    return None
+
+
+def _track_total(user_id: str, total: int) -> None:
+    """Feed a user's new total to the in-memory leaderboards"""
+    _leaderboard.update(user_id, total)
+    for tracker, members in _guild_leaderboards.values():
+        if user_id in members:
+            tracker.update(user_id, total)
+
+
+def _track(user_id: str, balance: Balance) -> None:
+    """Feed a user's new balance to the in-memory leaderboards"""
+    _track_total(str(user_id), balance.wallet + balance.bank)
+
+
+def _write_behind():
+    """The write-behind cache, or None when write-behind mode is off"""
+    # Imported here to avoid a circular import
+    from repositories.economy_cache import get_cache
+    return get_cache()
+
+
+def _direct(*user_ids):
+    """Context for a direct database change to these users' balances"""
+    cache = _write_behind()
+    return cache.direct(*user_ids) if cache else nullcontext()
+
+
+def _exclusive():
+    """Context for a change to every user's balance"""
+    cache = _write_behind()
+    return cache.exclusive() if cache else nullcontext()
+
+
+def _get_user(user_id, username, display_name):
+    user = _load_user(user_id)
+    if user is None:
+        _ensure_user(user_id, username, display_name)
+        db.session.commit()
+        return _load_user(user_id)
+
+    names = _name_values(username, display_name)
+    if any(getattr(user, name) != value for name, value in names.items()):
+        _apply(user_id, names)
+        db.session.commit()
+        for name, value in names.items():
+            setattr(user, name, value)
+    return user
+
+
+async def get_user(user_id: str, username: str = None, display_name: str = None) -> UserEconomy:
+    """Get or create a user's economy profile"""
+    async with _direct(user_id):
+        user = await run_db(_get_user, user_id, username, display_name)
+    _track_total(user.user_id, user.total_balance)
+    return user
+
+
+def _claim_reward(user_id, username, display_name, cooldown_field, cooldown, amount, description):
+    now = datetime.utcnow()
+    column = getattr(UserEconomy, cooldown_field)
+    balance = _apply_or_create(
+        user_id, username, display_name,
+        dict(wallet=UserEconomy.wallet + amount, **{cooldown_field: now}, **_name_values(username, display_name)),
+        or_(column.is_(None), column <= now - cooldown)
+    )
+    if balance is None:
+        db.session.rollback()
+        user = _load_user(user_id)
+        raise CooldownError(_cooldown_left(getattr(user, cooldown_field), cooldown, now) or timedelta(0))
+
+    _record_transaction(user_id, username, display_name, amount, description)
+    db.session.commit()
+    return balance
+
+
+async def claim_reward(user_id: str, username: str, display_name: str, cooldown_field: str,
+                       cooldown: timedelta, amount: int, description: str) -> Balance:
+    """Pay a timed reward (daily, work) if its cooldown has passed"""
+    cache = _write_behind()
+    if cache:
+        balance = await cache.apply(user_id, username, display_name, amount, description,
+                                    cooldown_field=cooldown_field, cooldown=cooldown)
+    else:
+        balance = await run_write(_claim_reward, user_id, username, display_name, cooldown_field, cooldown, amount, description)
+    _track(user_id, balance)
+    return balance
+
+
+def _deposit(user_id, username, display_name, amount):
+    balance = _apply_or_create(
+        user_id, username, display_name,
+        dict(wallet=UserEconomy.wallet - amount, bank=UserEconomy.bank + amount),
+        UserEconomy.wallet >= amount,
+        UserEconomy.bank + amount <= UserEconomy.bank_capacity
+    )
+    if balance is None:
+        db.session.rollback()
+        user = _load_user(user_id)
+        if user is None or amount > user.wallet:
+            raise EconomyError("You don't have enough coins in your wallet")
+        raise EconomyError(f"Your bank can only hold {user.bank_capacity - user.bank} more coins")
+
+    _record_transaction(user_id, username, display_name, amount, "Bank deposit")
+    db.session.commit()
+    return balance
+
+
+async def deposit(user_id: str, username: str, display_name: str, amount: int) -> Balance:
+    """Move coins from the wallet into the bank"""
+    async with _direct(user_id):
+        return await run_write(_deposit, user_id, username, display_name, amount)
+
+
+def _withdraw(user_id, username, display_name, amount):
+    balance = _apply_or_create(
+        user_id, username, display_name,
+        dict(wallet=UserEconomy.wallet + amount, bank=UserEconomy.bank - amount),
+        UserEconomy.bank >= amount
+    )
+    if balance is None:
+        db.session.rollback()
+        raise EconomyError("You don't have enough coins in your bank")
+
+    _record_transaction(user_id, username, display_name, amount, "Bank withdrawal")
+    db.session.commit()
+    return balance
+
+
+async def withdraw(user_id: str, username: str, display_name: str, amount: int) -> Balance:
+    """Move coins from the bank into the wallet"""
+    async with _direct(user_id):
+        return await run_write(_withdraw, user_id, username, display_name, amount)
+
+
+def _settle_bet(user_id, username, display_name, stake, delta, description):
+    balance = _apply_or_create(
+        user_id, username, display_name,
+        dict(wallet=UserEconomy.wallet + delta),
+        UserEconomy.wallet >= stake
+    )
+    if balance is None:
+        db.session.rollback()
+        raise EconomyError("You don't have enough coins in your wallet")
+
+    _record_transaction(user_id, username, display_name, delta, description)
+    db.session.commit()
+    return balance
+
+
+async def settle_bet(user_id: str, username: str, display_name: str, stake: int, delta: int, description: str) -> Balance:
+    """Apply a gambling result (delta) if the user can cover the stake"""
+    cache = _write_behind()
+    if cache:
+        balance = await cache.apply(user_id, username, display_name, delta, description, stake=stake)
+    else:
+        balance = await run_write(_settle_bet, user_id, username, display_name, stake, delta, description)
+    _track(user_id, balance)
+    return balance
+
+
+def _lock_users(user_ids) -> dict:
+    """Lock several users' rows in ascending user_id order; returns {user_id: row}"""
+    rows = db.session.execute(
+        select(UserEconomy)
+        .where(UserEconomy.user_id.in_(sorted(user_ids)))
+        .order_by(UserEconomy.user_id)
+        .with_for_update()
+    ).scalars().all()
+    return {row.user_id: row for row in rows}
+
+
+def _rob(robber_info, victim_info, cooldown, success, steal_fraction, fine):
+    robber_id, robber_name, robber_display = robber_info
+    victim_id, victim_name, victim_display = victim_info
+    now = datetime.utcnow()
+
+    # Both rows are locked in a fixed order, so two users robbing each other can't deadlock
+    users = _lock_users([robber_id, victim_id])
+    if len(users) < 2:
+        _ensure_user(*robber_info)
+        _ensure_user(*victim_info)
+        users = _lock_users([robber_id, victim_id])
+    robber, victim = users[robber_id], users[victim_id]
+
+    time_left = _cooldown_left(robber.last_rob, cooldown, now)
+    if time_left:
+        db.session.rollback()
+        raise CooldownError(time_left)
+    if robber.wallet < ROB_MIN_ROBBER_WALLET:
+        db.session.rollback()
+        raise EconomyError(f"You need at least {ROB_MIN_ROBBER_WALLET} coins in your wallet to rob someone!")
+    if victim.wallet < ROB_MIN_VICTIM_WALLET:
+        db.session.rollback()
+        raise EconomyError(f"{victim_name} doesn't have enough coins to rob!")
+
+    amount = int(victim.wallet * steal_fraction) if success else -fine
+    deltas = {robber_id: amount}
+    if success:
+        deltas[victim_id] = -amount
+
+    # Apply the changes in the same ascending order the locks were taken
+    balances = {}
+    for user_id in sorted(deltas):
+        changes = dict(wallet=UserEconomy.wallet + deltas[user_id])
+        if user_id == robber_id:
+            changes.update(last_rob=now, **_name_values(robber_name, robber_display))
+        else:
+            changes.update(**_name_values(victim_name, victim_display))
+        balances[user_id] = _apply(user_id, changes)
+
+    if success:
+        _record_transaction(robber_id, robber_name, robber_display, amount, f"Stole {amount} coins from {victim_name}")
+        _record_transaction(victim_id, victim_name, victim_display, -amount, f"Got robbed by {robber_name}")
+    else:
+        _record_transaction(robber_id, robber_name, robber_display, -fine, "Fine for failed robbery attempt")
+
+    db.session.commit()
+    return amount, balances
+
+
+async def rob(robber_info: tuple, victim_info: tuple, cooldown: timedelta,
+              success: bool, steal_fraction: float, fine: int) -> int:
+    """Attempt a robbery; returns the coins stolen, or minus the fine paid
+
+    robber_info and victim_info are (user_id, username, display_name).
+    """
+    async with _direct(robber_info[0], victim_info[0]):
+        amount, balances = await run_write(_rob, robber_info, victim_info, cooldown, success, steal_fraction, fine)
+    for user_id, balance in balances.items():
+        _track(user_id, balance)
+    return amount
+
+
+def _transfer(sender_info, recipient_info, amount):
+    sender_id, sender_name, sender_display = sender_info
+    recipient_id, recipient_name, recipient_display = recipient_info
+
+    # Each UPDATE locks its row; doing them in ascending user_id order means
+    # two opposite transfers can't each hold the lock the other one needs
+    balances = {}
+    for user_id in sorted((sender_id, recipient_id)):
+        if user_id == sender_id:
+            balance = _apply_or_create(
+                sender_id, sender_name, sender_display,
+                dict(wallet=UserEconomy.wallet - amount, **_name_values(sender_name, sender_display)),
+                UserEconomy.wallet >= amount
+            )
+            if balance is None:
+                db.session.rollback()
+                raise EconomyError("You don't have enough coins in your wallet")
+        else:
+            balance = _apply_or_create(
+                recipient_id, recipient_name, recipient_display,
+                dict(wallet=UserEconomy.wallet + amount, **_name_values(recipient_name, recipient_display))
+            )
+        balances[user_id] = balance
+
+    _record_transaction(sender_id, sender_name, sender_display, -amount, f"Paid {recipient_name}")
+    _record_transaction(recipient_id, recipient_name, recipient_display, amount, f"Received from {sender_name}")
+    db.session.commit()
+    return balances
+
+
+async def transfer(sender_info: tuple, recipient_info: tuple, amount: int) -> Tuple[Balance, Balance]:
+    """Move wallet coins from one user to another in one transaction
+
+    sender_info and recipient_info are (user_id, username, display_name).
+    Returns the new (sender, recipient) balances.
+    """
+    async with _direct(sender_info[0], recipient_info[0]):
+        balances = await run_write(_transfer, sender_info, recipient_info, amount)
+    for user_id, balance in balances.items():
+        _track(user_id, balance)
+    return balances[sender_info[0]], balances[recipient_info[0]]
+
+
+async def list_shop_items() -> List[Item]:
+    """Items currently for sale (from the in-memory catalog)"""
+    return (await item_catalog.get_catalog()).items
+
+
+def _buy_item(user_id, username, display_name, item):
+    balance = _apply_or_create(
+        user_id, username, display_name,
+        dict(wallet=UserEconomy.wallet - item.price),
+        UserEconomy.wallet >= item.price
+    )
+    if balance is None:
+        db.session.rollback()
+        raise EconomyError("You don't have enough coins to buy this item")
+
+    added = db.session.execute(
+        update(Inventory)
+        .where(Inventory.user_id == str(user_id), Inventory.item_id == item.id)
+        .values(quantity=Inventory.quantity + 1)
+    ).rowcount
+    if not added:
+        db.session.execute(insert(Inventory).values(
+            user_id=str(user_id),
+            username=username,
+            display_name=display_name,
+            item_id=item.id,
+            quantity=1
+        ))
+
+    _record_transaction(user_id, username, display_name, -item.price, f"Bought {item.name}")
+    db.session.commit()
+    return balance
+
+
+async def buy_item(user_id: str, username: str, display_name: str, item_name: str) -> Item:
+    """Buy one of an item by name (ignoring case)"""
+    item = (await item_catalog.get_catalog()).get(item_name)
+    if not item:
+        raise EconomyError("That item doesn't exist or isn't available")
+
+    async with _direct(user_id):
+        balance = await run_write(_buy_item, user_id, username, display_name, item)
+    _track(user_id, balance)
+    return item
+
+
+def _get_inventory(user_id):
+    # Load each entry's item in the same query; the session is gone by the time it's read
+    return Inventory.query.options(joinedload(Inventory.item)).filter_by(user_id=str(user_id)).all()
+
+
+async def get_inventory(user_id: str) -> List[Inventory]:
+    """A user's inventory entries with their items loaded"""
+    return await run_db(_get_inventory, user_id)
+
+
+def _top_balances(limit, user_ids=None):
+    if user_ids is None:
+        return db.session.execute(
+            select(UserEconomy.user_id, UserEconomy.total_balance)
+            .order_by(UserEconomy.total_balance.desc())
+            .limit(limit)
+        ).all()
+
+    # Rank within a set of users (a guild's members), a chunk at a time
+    user_ids = list(user_ids)
+    best = []
+    for start in range(0, len(user_ids), _LEADERBOARD_QUERY_CHUNK):
+        best.extend(db.session.execute(
+            select(UserEconomy.user_id, UserEconomy.total_balance)
+            .where(UserEconomy.user_id.in_(user_ids[start:start + _LEADERBOARD_QUERY_CHUNK]))
+            .order_by(UserEconomy.total_balance.desc())
+            .limit(limit)
+        ).all())
+    best.sort(key=lambda row: row[1], reverse=True)
+    return best[:limit]
+
+
+async def _query_top_balances(limit, user_ids=None):
+    """_top_balances once pending write-behind changes are in the database"""
+    cache = _write_behind()
+    if cache:
+        await cache.flush()
+    return [tuple(row) for row in await run_db(_top_balances, limit, user_ids)]
+
+
+async def reconcile_leaderboard() -> None:
+    """Reload the in-memory leaderboard from the database
+
+    Guild leaderboards are dropped and rebuilt on their next read.
+    """
+    rows = await _query_top_balances(_leaderboard.capacity)
+    _leaderboard.load(rows)
+    _guild_leaderboards.clear()
+
+
+async def _load_guild_leaderboard(guild_id: str, user_ids: set) -> TopKTracker:
+    """Build a guild's leaderboard from its members' rows"""
+    tracker = TopKTracker(LEADERBOARD_TRACKED)
+    tracker.load(await _query_top_balances(tracker.capacity, user_ids))
+    _guild_leaderboards[guild_id] = (tracker, user_ids)
+    while len(_guild_leaderboards) > LEADERBOARD_GUILDS:
+        _guild_leaderboards.popitem(last=False)
+    return tracker
+
+
+async def _guild_leaderboard(guild_id: str, user_ids: set) -> TopKTracker:
+    """A guild's leaderboard, brought up to date with its current members"""
+    entry = _guild_leaderboards.get(guild_id)
+    if entry is None:
+        return await _load_guild_leaderboard(guild_id, user_ids)
+
+    _guild_leaderboards.move_to_end(guild_id)
+    tracker, members = entry
+    if user_ids == members:
+        return tracker
+    for user_id in members - user_ids:
+        tracker.discard(user_id)
+    joined = user_ids - members
+    if joined:
+        # Only the newcomers can outrank the floor without the tracker knowing
+        for user_id, total in await _query_top_balances(tracker.capacity, joined):
+            tracker.update(user_id, total)
+    _guild_leaderboards[guild_id] = (tracker, user_ids)
+    return tracker
+
+
+async def get_leaderboard(limit: int, user_ids: set = None, guild_id: str = None) -> List[Tuple[str, int]]:
+    """The richest users as (user_id, total_balance), optionally only among user_ids
+
+    Pass guild_id with a guild's member ids: each guild's leaderboard is then
+    built once and kept up to date in memory like the global one. Reads fall
+    back to the database only when memory can't answer exactly.
+    """
+    if user_ids is not None and guild_id is not None:
+        tracker = await _guild_leaderboard(guild_id, user_ids)
+        top = tracker.top(limit, user_ids)
+        if top is None:
+            tracker = await _load_guild_leaderboard(guild_id, user_ids)
+            top = tracker.top(limit, user_ids)
+        return top
+
+    if not _leaderboard.loaded:
+        await reconcile_leaderboard()
+    top = _leaderboard.top(limit, user_ids)
+    if top is not None:
+        return top
+    if user_ids is None:
+        await reconcile_leaderboard()
+        top = _leaderboard.top(limit)
+        if top is not None:
+            return top
+    return await _query_top_balances(limit, user_ids)
+
+
+def _get_transaction_page(user_id, limit, before):
+    query = select(Transaction).where(Transaction.user_id == str(user_id))
+    if before is not None:
+        # Keyset pagination: continue strictly after the last row of the previous page
+        timestamp, transaction_id = before
+        query = query.where(or_(
+            Transaction.timestamp < timestamp,
+            and_(Transaction.timestamp == timestamp, Transaction.id < transaction_id)
+        ))
+    rows = db.session.execute(
+        query.order_by(Transaction.timestamp.desc(), Transaction.id.desc()).limit(limit + 1)
+    ).scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1].timestamp, rows[-1].id)
+    return TransactionPage(rows, next_cursor)
+
+
+async def get_transaction_page(user_id: str, limit: int, before: tuple = None) -> TransactionPage:
+    """A page of a user's transactions, newest first
+
+    before is the next_cursor of the previous page. Each page is one range
+    scan of idx_transaction_user_timestamp, however deep it is.
+    """
+    cache = _write_behind()
+    if cache:
+        await cache.flush()
+    return await run_db(_get_transaction_page, user_id, limit, before)
+
+
+def _get_compacted_summary(user_id):
+    return db.session.execute(
+        select(
+            func.count(TransactionDaily.id),
+            func.coalesce(func.sum(TransactionDaily.count), 0),
+            func.coalesce(func.sum(TransactionDaily.credited - TransactionDaily.debited), 0),
+            func.max(TransactionDaily.day)
+        ).where(TransactionDaily.user_id == str(user_id))
+    ).one()
+
+
+async def get_compacted_summary(user_id: str) -> tuple:
+    """(days, transactions, net coins, latest day) of a user's compacted history"""
+    return tuple(await run_db(_get_compacted_summary, user_id))
+
+
+def _compact_transaction_batch(cutoff, batch_size):
+    # Old rows have the lowest ids, so walking the primary key finds them without a timestamp index
+    rows = db.session.execute(
+        select(Transaction.id, Transaction.user_id, Transaction.timestamp, Transaction.amount)
+        .where(Transaction.timestamp < cutoff)
+        .order_by(Transaction.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+
+    totals = {}
+    for _, user_id, timestamp, amount in rows:
+        day_totals = totals.setdefault((user_id, timestamp.date()), [0, 0, 0])
+        day_totals[0] += 1
+        if amount >= 0:
+            day_totals[1] += amount
+        else:
+            day_totals[2] -= amount
+
+    existing = {
+        (daily.user_id, daily.day): daily
+        for daily in TransactionDaily.query.filter(
+            TransactionDaily.user_id.in_({user_id for user_id, _ in totals}),
+            TransactionDaily.day.in_({day for _, day in totals})
+        )
+    }
+    for (user_id, day), (count, credited, debited) in totals.items():
+        daily = existing.get((user_id, day))
+        if daily is None:
+            daily = TransactionDaily(user_id=user_id, day=day, count=0, credited=0, debited=0)
+            db.session.add(daily)
+        daily.count += count
+        daily.credited += credited
+        daily.debited += debited
+
+    db.session.execute(
+        delete(Transaction).where(Transaction.id.in_([row[0] for row in rows])),
+        execution_options={"synchronize_session": False}
+    )
+    db.session.commit()
+    return len(rows)
+
+
+async def compact_transactions(retention_days: int = TRANSACTION_RETENTION_DAYS,
+                               batch_size: int = TRANSACTION_COMPACTION_BATCH) -> int:
+    """Fold transactions older than the retention window into daily totals
+
+    Works in batches, each its own database transaction, so a large backlog
+    never holds a long lock. Returns the number of rows removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = 0
+    while True:
+        batch = await run_write(_compact_transaction_batch, cutoff, batch_size)
+        removed += batch
+        if batch < batch_size:
+            return removed
+
+
+def _interest_amount(rate_bps):
+    """SQL expression for one user's interest, capped at their free bank capacity"""
+    interest = UserEconomy.bank * rate_bps // 10000
+    room = UserEconomy.bank_capacity - UserEconomy.bank
+    return case((interest > room, room), else_=interest)
+
+
+def _bulk_credit(column_name, amount, condition, description, dry_run):
+    """Credit `amount` (an SQL expression) to `column_name` of every matching user
+
+    Three statements however many users match: a SUM for the report, one
+    INSERT ... SELECT for the Transaction rows and one UPDATE.
+    """
+    users, minted = db.session.execute(
+        select(func.count(UserEconomy.id), func.coalesce(func.sum(amount), 0)).where(condition)
+    ).one()
+    if dry_run or not users:
+        return BulkCredit(users, minted)
+
+    # Transactions first: the amounts are computed from the balances before the update
+    db.session.execute(
+        insert(Transaction).from_select(
+            ["user_id", "username", "display_name", "amount", "description", "timestamp"],
+            select(
+                UserEconomy.user_id,
+                UserEconomy.username,
+                UserEconomy.display_name,
+                amount,
+                literal(description),
+                literal(datetime.utcnow(), db.DateTime)
+            ).where(condition)
+        )
+    )
+    column = getattr(UserEconomy, column_name)
+    db.session.execute(
+        update(UserEconomy)
+        .where(condition)
+        .values({column: column + amount, UserEconomy.total_balance: UserEconomy.total_balance + amount})
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return BulkCredit(users, minted)
+
+
+def _apply_bank_interest(rate_bps, dry_run):
+    amount = _interest_amount(rate_bps)
+    return _bulk_credit("bank", amount, amount > 0, "Bank interest", dry_run)
+
+
+def _apply_payout(amount, description, dry_run):
+    return _bulk_credit("wallet", literal(amount, db.Integer), true(), description, dry_run)
+
+
+async def _run_bulk_credit(func, *args, dry_run: bool) -> BulkCredit:
+    async with _exclusive():
+        result = await (run_db if dry_run else run_write)(func, *args, dry_run)
+    if result.users and not dry_run:
+        await reconcile_leaderboard()
+    return result
+
+
+async def apply_bank_interest(rate_bps: int = BANK_INTEREST_BPS, dry_run: bool = False) -> BulkCredit:
+    """Pay interest on every bank balance, capped at bank capacity
+
+    With dry_run nothing is written; the result reports what would be minted.
+    """
+    return await _run_bulk_credit(_apply_bank_interest, rate_bps, dry_run=dry_run)
+
+
+async def apply_payout(amount: int, description: str = "Event payout", dry_run: bool = False) -> BulkCredit:
+    """Give every user `amount` coins in their wallet"""
+    return await _run_bulk_credit(_apply_payout, amount, description, dry_run=dry_run)
@@ -0,0 +1,389 @@
+"""
+Write-behind Economy Cache for Discord Bot
+
+Optional mode (ECONOMY_WRITE_BEHIND=true) for high-frequency, low-value
+economy commands: daily, work, coinflip and slots. Their balance changes are
+applied to hot accounts held in memory and queued; queued changes are
+flushed to the database in one batch - a single executemany UPDATE of the
+summed wallet deltas plus a bulk Transaction insert - when the oldest change
+reaches ECONOMY_FLUSH_MAX_AGE seconds, when ECONOMY_FLUSH_MAX_PENDING changes
+are queued, or on shutdown.
+
+Every queued change is first appended to a local journal. After a crash the
+journal is replayed on startup; changes whose Transaction row already exists
+(matched on user and timestamp) are skipped, so a crash between a flush's
+commit and the journal cleanup can't apply anything twice. The journal is
+written to the OS but not fsynced: it survives a process crash, not a power
+loss.
+
+Every other balance change (deposit, withdraw, buy, rob, balance reads) goes
+through direct(), which flushes the users' queued changes first and drops
+their cached accounts afterwards. The cache assumes it is the only writer:
+don't enable it when several bot processes share one economy database.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import weakref
+from collections import OrderedDict, Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import bindparam, func, insert, select
+
+from database import db
+from models.economy import UserEconomy, Transaction
+from repositories.economy import (
+    Balance, EconomyError, CooldownError, _cooldown_left, _ensure_user, _get_user
+)
+from utils.db_executor import run_db, run_write
+
+logger = logging.getLogger('discord')
+
+ECONOMY_WRITE_BEHIND = os.environ.get("ECONOMY_WRITE_BEHIND", "false").lower() == "true"
+# Durability knobs: flush once the oldest queued change is this old, or this many are queued
+ECONOMY_FLUSH_MAX_AGE = float(os.environ.get("ECONOMY_FLUSH_MAX_AGE", "2.0"))
+ECONOMY_FLUSH_MAX_PENDING = int(os.environ.get("ECONOMY_FLUSH_MAX_PENDING", "500"))
+ECONOMY_JOURNAL_PATH = os.environ.get("ECONOMY_JOURNAL_PATH", "data/economy_journal.log")
+
+# Clean accounts kept in memory beyond this are evicted least-recently-used first
+DEFAULT_MAX_ACCOUNTS = 10000
+
+_COOLDOWN_FIELDS = ("last_daily", "last_work", "last_rob")
+
+
+class _Account:
+    """In-memory copy of the balance columns of one UserEconomy row"""
+
+    __slots__ = ("wallet", "bank", "bank_capacity", "last_daily", "last_work", "last_rob")
+
+    def __init__(self, user: UserEconomy):
+        for name in self.__slots__:
+            setattr(self, name, getattr(user, name))
+
+
+def _unapplied(ops: list) -> list:
+    """Drop journaled changes whose Transaction row is already in the database"""
+    stamps = [datetime.fromisoformat(op["at"]) for op in ops]
+    existing = set(db.session.execute(
+        select(Transaction.user_id, Transaction.timestamp).where(
+            Transaction.user_id.in_({op["user_id"] for op in ops}),
+            Transaction.timestamp >= min(stamps),
+            Transaction.timestamp <= max(stamps)
+        )
+    ).all())
+    return [op for op, at in zip(ops, stamps) if (op["user_id"], at) not in existing]
+
+
+def _apply_ops(ops: list, recovering: bool = False) -> int:
+    """Write queued changes in one transaction; returns how many were applied"""
+    if recovering:
+        ops = _unapplied(ops)
+        if not ops:
+            return 0
+
+    rows = {}
+    for op in ops:
+        row = rows.get(op["user_id"])
+        if row is None:
+            row = rows[op["user_id"]] = dict(
+                b_user_id=op["user_id"], b_delta=0, b_username=None, b_display_name=None,
+                **{f"b_{field}": None for field in _COOLDOWN_FIELDS}
+            )
+            if recovering:
+                _ensure_user(op["user_id"], op["username"], op["display_name"])
+        row["b_delta"] += op["delta"]
+        row["b_username"] = op["username"] or row["b_username"]
+        row["b_display_name"] = op["display_name"] or row["b_display_name"]
+        if op["cooldown_field"]:
+            key = f"b_{op['cooldown_field']}"
+            at = datetime.fromisoformat(op["at"])
+            row[key] = max(row[key], at) if row[key] else at
+
+    table = UserEconomy.__table__
+    cooldowns = {
+        field: func.coalesce(bindparam(f"b_{field}", type_=db.DateTime), table.c[field])
+        for field in _COOLDOWN_FIELDS
+    }
+    db.session.execute(
+        table.update()
+        .where(table.c.user_id == bindparam("b_user_id"))
+        .values(
+            wallet=table.c.wallet + bindparam("b_delta"),
+            total_balance=table.c.total_balance + bindparam("b_delta"),
+            username=func.coalesce(bindparam("b_username", type_=db.String), table.c.username),
+            display_name=func.coalesce(bindparam("b_display_name", type_=db.String), table.c.display_name),
+            **cooldowns
+        ),
+        list(rows.values())
+    )
+    db.session.execute(insert(Transaction), [
+        dict(
+            user_id=op["user_id"],
+            username=op["username"],
+            display_name=op["display_name"],
+            amount=op["delta"],
+            description=op["description"],
+            timestamp=datetime.fromisoformat(op["at"])
+        )
+        for op in ops
+    ])
+    db.session.commit()
+    return len(ops)
+
+
+class EconomyWriteBehindCache:
+    """Hot accounts in memory with batched, journaled writes to the database"""
+
+    def __init__(self, journal_path: str = ECONOMY_JOURNAL_PATH, max_age: float = ECONOMY_FLUSH_MAX_AGE,
+                 max_pending: int = ECONOMY_FLUSH_MAX_PENDING, max_accounts: int = DEFAULT_MAX_ACCOUNTS):
+        self.journal_path = journal_path
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self.max_accounts = max_accounts
+        self._accounts = OrderedDict()
+        self._pending = []
+        self._dirty = Counter()  # user_id -> queued changes
+        self._oldest = None  # monotonic time of the oldest queued change
+        self._user_locks = weakref.WeakValueDictionary()
+        self._flush_lock = asyncio.Lock()
+        self._journal = None
+        self._task = None
+        # exclusive() holds new changes back and waits for in-flight ones
+        self._open = asyncio.Event()
+        self._open.set()
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def _flushing_path(self) -> str:
+        return self.journal_path + ".flushing"
+
+    async def start(self) -> None:
+        """Replay any journal left by a crash and start the flush loop"""
+        if self._journal is not None:
+            return
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        await self._recover()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+        logger.info(f"Economy write-behind cache started (max age {self.max_age}s, max pending {self.max_pending})")
+
+    async def close(self) -> None:
+        """Stop the flush loop and write everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self._journal is not None and not self._pending:
+            self._journal.close()
+            self._journal = None
+
+    async def _recover(self) -> None:
+        """Apply changes journaled before a crash"""
+        ops = []
+        for path in (self._flushing_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        # A torn final line from the crash itself
+                        logger.warning(f"Skipping unreadable economy journal entry in {path}")
+
+        if ops:
+            applied = await run_write(_apply_ops, ops, True)
+            logger.info(f"Recovered {applied} of {len(ops)} journaled economy changes")
+        for path in (self._flushing_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _lock_for(self, user_id: str) -> asyncio.Lock:
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._user_locks[user_id] = lock
+        return lock
+
+    async def _account(self, user_id: str, username: str, display_name: str) -> _Account:
+        """Get a hot account, loading (or creating) it from the database on a miss"""
+        account = self._accounts.get(user_id)
+        if account is not None:
+            self._accounts.move_to_end(user_id)
+            return account
+
+        account = _Account(await run_db(_get_user, user_id, username, display_name))
+        self._accounts[user_id] = account
+        self._evict()
+        return account
+
+    def _evict(self) -> None:
+        """Drop least recently used accounts that have nothing queued"""
+        excess = len(self._accounts) - self.max_accounts
+        if excess <= 0:
+            return
+        for user_id in list(self._accounts):
+            if excess <= 0:
+                break
+            if not self._dirty[user_id]:
+                del self._accounts[user_id]
+                excess -= 1
+
+    async def apply(self, user_id: str, username: str, display_name: str, delta: int, description: str,
+                    stake: int = 0, cooldown_field: str = None, cooldown: timedelta = None) -> Balance:
+        """Apply a wallet change in memory and queue it for the database
+
+        The same rules as the direct path apply: the cooldown must have passed
+        and the wallet must cover the stake.
+        """
+        await self.start()
+        await self._open.wait()
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            return await self._apply(user_id, username, display_name, delta, description, stake, cooldown_field, cooldown)
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+    async def _apply(self, user_id, username, display_name, delta, description, stake, cooldown_field, cooldown):
+        async with self._lock_for(user_id):
+            account = await self._account(user_id, username, display_name)
+            now = datetime.utcnow()
+            if cooldown_field:
+                time_left = _cooldown_left(getattr(account, cooldown_field), cooldown, now)
+                if time_left:
+                    raise CooldownError(time_left)
+            if account.wallet < stake:
+                raise EconomyError("You don't have enough coins in your wallet")
+
+            account.wallet += delta
+            if cooldown_field:
+                setattr(account, cooldown_field, now)
+            self._queue(dict(
+                user_id=user_id,
+                username=username,
+                display_name=display_name,
+                delta=delta,
+                description=description,
+                cooldown_field=cooldown_field,
+                at=now.isoformat()
+            ))
+            return Balance(account.wallet, account.bank, account.bank_capacity)
+
+    def _queue(self, op: dict) -> None:
+        """Journal a change and queue it, flushing early once enough are queued"""
+        self._journal.write(json.dumps(op) + "\n")
+        self._journal.flush()
+        self._pending.append(op)
+        self._dirty[op["user_id"]] += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if len(self._pending) >= self.max_pending:
+            asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> int:
+        """Write all queued changes to the database; returns how many were written"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            ops, self._pending = self._pending, []
+            self._oldest = None
+
+            # New changes go to a fresh journal while this batch is written
+            self._journal.close()
+            os.replace(self.journal_path, self._flushing_path)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+            try:
+                await run_write(_apply_ops, ops)
+            except Exception as e:
+                logger.error(f"Economy flush of {len(ops)} changes failed, will retry: {str(e)}")
+                self._pending = ops + self._pending
+                self._oldest = time.monotonic()
+                for op in ops:
+                    self._journal.write(json.dumps(op) + "\n")
+                self._journal.flush()
+                os.remove(self._flushing_path)
+                return 0
+
+            os.remove(self._flushing_path)
+            for op in ops:
+                self._dirty[op["user_id"]] -= 1
+                if self._dirty[op["user_id"]] <= 0:
+                    del self._dirty[op["user_id"]]
+            return len(ops)
+
+    async def _flush_loop(self) -> None:
+        """Flush whenever the oldest queued change reaches max_age"""
+        while True:
+            await asyncio.sleep(min(self.max_age, 1.0))
+            if self._oldest is not None and time.monotonic() - self._oldest >= self.max_age:
+                await self.flush()
+
+    @asynccontextmanager
+    async def direct(self, *user_ids: str):
+        """Run a direct database change for these users
+
+        Their queued changes are flushed first and their cached accounts are
+        dropped afterwards. Users are locked in ascending order.
+        """
+        user_ids = sorted(set(user_ids))
+        locks = [self._lock_for(user_id) for user_id in user_ids]
+        for lock in locks:
+            await lock.acquire()
+        try:
+            if any(self._dirty[user_id] for user_id in user_ids):
+                await self.flush()
+                if any(self._dirty[user_id] for user_id in user_ids):
+                    raise EconomyError("Your balance is still being saved, please try again in a moment")
+            yield
+        finally:
+            for user_id in user_ids:
+                self._accounts.pop(user_id, None)
+            for lock in reversed(locks):
+                lock.release()
+
+    @asynccontextmanager
+    async def exclusive(self):
+        """Run a change that touches every account (interest, payouts)
+
+        New cached changes wait, in-flight ones finish, everything queued is
+        flushed and every cached account is dropped, so the change sees (and
+        later reads see) the real database state.
+        """
+        self._open.clear()
+        try:
+            await self._idle.wait()
+            await self.flush()
+            if self._pending:
+                raise EconomyError("Economy changes are still being saved, please try again in a moment")
+            self._accounts.clear()
+            yield
+        finally:
+            self._open.set()
+
+
+_cache = None
+
+
+def get_cache() -> Optional[EconomyWriteBehindCache]:
+    """Get the write-behind cache, or None when write-behind mode is off"""
+    global _cache
+    if _cache is None and ECONOMY_WRITE_BEHIND:
+        _cache = EconomyWriteBehindCache()
+    return _cache
+
+
+async def close_cache() -> None:
+    """Flush and stop the write-behind cache, if running (called on shutdown)"""
+    if _cache is not None:
+        await _cache.close()
@@ -0,0 +1,91 @@
+"""
+Item Catalog for Discord Bot
+
+The shop catalog only changes when the shop is (re)initialized, so it is
+loaded once and served from memory: shop listings, item lookups for buy and
+buy autocomplete make no database calls. Names are indexed casefolded, by
+full name and by the start of every word, in a sorted list searched with
+bisect, so a prefix lookup is O(log n) and fast enough for Discord's
+autocomplete deadline.
+
+Anything that writes the Item table must call invalidate() (or reload())
+afterwards.
+"""
+
+import bisect
+from typing import List, Optional
+
+from models.economy import Item
+from utils.db_executor import run_db
+
+# Discord shows at most 25 autocomplete choices
+MAX_SUGGESTIONS = 25
+
+
+class ItemCatalog:
+    """Immutable snapshot of the buyable items"""
+
+    def __init__(self, items: List[Item]):
+        self.items = sorted(items, key=lambda item: item.name.casefold())
+        self._by_name = {item.name.casefold(): item for item in self.items}
+
+        # (key, item) for the full name and every word-start suffix, sorted by key
+        entries = set()
+        for index, item in enumerate(self.items):
+            name = item.name.casefold()
+            words = name.split()
+            for i in range(len(words)):
+                entries.add((" ".join(words[i:]), index))
+        entries = sorted(entries)
+        self._keys = [key for key, _ in entries]
+        self._indexes = [index for _, index in entries]
+
+    def get(self, name: str) -> Optional[Item]:
+        """An item by name, ignoring case"""
+        return self._by_name.get(name.strip().casefold())
+
+    def search(self, prefix: str, limit: int = MAX_SUGGESTIONS) -> List[Item]:
+        """Items whose name, or any word in it, starts with prefix"""
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return self.items[:limit]
+
+        found = []
+        seen = set()
+        position = bisect.bisect_left(self._keys, prefix)
+        while position < len(self._keys) and self._keys[position].startswith(prefix):
+            index = self._indexes[position]
+            if index not in seen:
+                seen.add(index)
+                found.append(index)
+            position += 1
+        # Show matches in catalog order, not suffix order
+        return [self.items[index] for index in sorted(found)[:limit]]
+
+
+_catalog = None
+
+
+def _load_items():
+    return Item.query.filter_by(is_buyable=True).all()
+
+
+async def reload() -> ItemCatalog:
+    """Load the catalog from the database"""
+    global _catalog
+    _catalog = ItemCatalog(await run_db(_load_items))
+    return _catalog
+
+
+def invalidate() -> None:
+    """Forget the catalog; the next use reloads it"""
+    global _catalog
+    _catalog = None
+
+
+async def get_catalog() -> ItemCatalog:
+    """The current catalog, loading it on first use"""
+    catalog = _catalog
+    if catalog is None:
+        catalog = await reload()
+    return catalog
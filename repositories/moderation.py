@@ -0,0 +1,63 @@
+"""
+Moderation Repository for Discord Bot
+
+Async data access for profanity warnings and rule violations. Each public
+function is one unit of work on the database executor, so the message
+pipeline stages that record them never block the event loop.
+"""
+
+from datetime import datetime, timedelta
+
+from database import db
+from models.moderation import (
+    SOURCE_PROFANITY, SOURCE_RULE, record_event, count_events, count_events_by_rule,
+    count_guild_events_by_user, clear_events, roll_up_events
+)
+from utils.db_executor import run_db, run_write
+
+
+def _add_event(guild_id, user_id, source, rule_id):
+    record_event(guild_id, user_id, source, rule_id)
+    db.session.commit()
+    return count_events(guild_id, user_id, source, include_aggregates=True)
+
+
+async def add_warning(guild_id, user_id) -> int:
+    """Record a profanity warning; returns the user's total warnings"""
+    return await run_write(_add_event, guild_id, user_id, SOURCE_PROFANITY, None)
+
+
+async def get_warning_count(guild_id, user_id) -> int:
+    """Total profanity warnings for a user, including rolled-up ones"""
+    return await run_db(count_events, guild_id, user_id, SOURCE_PROFANITY, include_aggregates=True)
+
+
+async def get_guild_warning_counts(guild_id) -> dict:
+    """Total profanity warnings per warned user in a guild"""
+    return await run_db(count_guild_events_by_user, guild_id, SOURCE_PROFANITY)
+
+
+async def reset_warnings(guild_id, user_id) -> int:
+    """Delete a user's profanity warnings; returns how many were removed"""
+    return await run_write(clear_events, guild_id, user_id, SOURCE_PROFANITY)
+
+
+async def add_violation(guild_id, user_id, rule_id) -> int:
+    """Record a rule violation; returns the user's total violations"""
+    return await run_write(_add_event, guild_id, user_id, SOURCE_RULE, rule_id)
+
+
+async def get_recent_violations(guild_id, user_id, days=30) -> dict:
+    """Rule violation counts in the past `days` days, keyed by rule ID"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return await run_db(count_events_by_rule, guild_id, user_id, cutoff)
+
+
+async def reset_violations(guild_id, user_id) -> int:
+    """Delete a user's rule violations; returns how many were removed"""
+    return await run_write(clear_events, guild_id, user_id, SOURCE_RULE)
+
+
+async def roll_up() -> int:
+    """Roll old warnings and violations into per-user aggregates; returns the events removed"""
+    return await run_write(roll_up_events)
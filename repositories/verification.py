@@ -0,0 +1,114 @@
+"""
+Verification Repository for Discord Bot
+
+Async data access for server verification settings and verification logs.
+Each public function is one unit of work on the database executor. Changes
+are applied by primary key, so callers can keep using the (detached) objects
+they were handed earlier.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import update
+
+from database import db
+from models.verification import VerificationSetting, VerificationLog
+from utils.db_executor import run_db, run_write
+
+
+def _get_settings(guild_id):
+    settings = db.session.query(VerificationSetting).filter_by(guild_id=str(guild_id)).first()
+    if not settings:
+        # Create default settings
+        settings = VerificationSetting(guild_id=str(guild_id))
+        db.session.add(settings)
+        db.session.commit()
+    return settings
+
+
+async def get_settings(guild_id: str) -> VerificationSetting:
+    """Get or create verification settings for a guild"""
+    return await run_db(_get_settings, guild_id)
+
+
+def _update_settings(setting_id, fields):
+    db.session.execute(update(VerificationSetting).where(VerificationSetting.id == setting_id).values(**fields))
+    db.session.commit()
+
+
+async def update_settings(setting_id: int, **fields) -> None:
+    """Persist changes to a guild's verification settings"""
+    await run_write(_update_settings, setting_id, fields)
+
+
+def _increment_setting_stat(setting_id, field):
+    column = getattr(VerificationSetting, field)
+    db.session.execute(update(VerificationSetting).where(VerificationSetting.id == setting_id).values({column: column + 1}))
+    db.session.commit()
+
+
+async def increment_setting_stat(setting_id: int, field: str) -> None:
+    """Atomically bump a usage counter (e.g. successful_verifications)"""
+    await run_write(_increment_setting_stat, setting_id, field)
+
+
+def _create_log(user_id, guild_id, setting_id):
+    log = VerificationLog(user_id=str(user_id), guild_id=str(guild_id), setting_id=setting_id)
+    db.session.add(log)
+    db.session.commit()
+    return log
+
+
+async def create_log(user_id: str, guild_id: str, setting_id: int) -> VerificationLog:
+    """Create a new verification log entry"""
+    return await run_write(_create_log, user_id, guild_id, setting_id)
+
+
+def _update_log(log_id, fields):
+    db.session.execute(update(VerificationLog).where(VerificationLog.id == log_id).values(**fields))
+    db.session.commit()
+
+
+async def update_log(log_id: int, **fields) -> None:
+    """Persist changes to a verification log"""
+    await run_write(_update_log, log_id, fields)
+
+
+def _complete_log(log_id, setting_id, completed_at):
+    db.session.execute(
+        update(VerificationLog).where(VerificationLog.id == log_id).values(success=True, completed_at=completed_at)
+    )
+    db.session.execute(
+        update(VerificationSetting).where(VerificationSetting.id == setting_id)
+        .values(successful_verifications=VerificationSetting.successful_verifications + 1)
+    )
+    db.session.commit()
+
+
+async def complete_log(log_id: int, setting_id: int, completed_at: datetime) -> None:
+    """Mark a verification as successful and count it, in one transaction"""
+    await run_write(_complete_log, log_id, setting_id, completed_at)
+
+
+def _record_manual_verification(user_id, guild_id, setting_id):
+    db.session.add(VerificationLog(
+        user_id=str(user_id),
+        guild_id=str(guild_id),
+        setting_id=setting_id,
+        success=True,
+        captcha_completed=True,
+        questions_completed=True,
+        role_accept_completed=True,
+        completed_at=datetime.utcnow(),
+        failure_reason=None
+    ))
+    db.session.execute(
+        update(VerificationSetting).where(VerificationSetting.id == setting_id)
+        .values(successful_verifications=VerificationSetting.successful_verifications + 1)
+    )
+    db.session.commit()
+
+
+async def record_manual_verification(user_id: str, guild_id: str, setting_id: int) -> None:
+    """Log a moderator's manual verification and count it"""
+    await run_write(_record_manual_verification, user_id, guild_id, setting_id)
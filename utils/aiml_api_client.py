@@ -3,19 +3,27 @@ AIML API Client for Discord Bot
 
 This module provides integration with aimlapi.com services
 for AI capabilities. It supports text generation and other AI features.
+stream_text() streams a completion as server-sent events, so callers can
+show the answer while it is still being generated.
 """
 
 import os
 import json
 import logging
-import requests
-from typing import Dict, Any, Optional
-import asyncio
+from typing import Dict, Any, AsyncIterator, Optional
+
+import aiohttp
+
+from utils import http_client
 
-# We'll use requests for async operations with async/await syntax
-# instead of aiohttp since it might not be available
 logger = logging.getLogger('discord')
 
+# A stream may run as long as it keeps producing; give up after this long without data (seconds)
+STREAM_IDLE_TIMEOUT = 30
+
+class AIMLAPIError(Exception):
+    """The AIML API could not produce a completion"""
+
 class AIMLAPIClient:
     """Client for interacting with aimlapi.com services"""
     
@@ -30,6 +38,11 @@ class AIMLAPIClient:
         else:
             logger.info("AIML API client initialized successfully")
     
+    async def _post(self, endpoint: str, headers: Dict[str, str], payload: Dict[str, Any]):
+        """POST over the shared keep-alive session; returns (status, body text)"""
+        async with http_client.get_session("aiml").post(endpoint, headers=headers, json=payload) as response:
+            return response.status, await response.text()
+    
     async def generate_text(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> Optional[str]:
         """Generate text response from the AIML API"""
         if not self.initialized:
@@ -54,13 +67,7 @@ class AIMLAPIClient:
                 "temperature": temperature
             }
             
-            # Use requests in a non-blocking way with asyncio.to_thread
-            # This runs the HTTP request in a background thread
-            def make_request():
-                response = requests.post(endpoint, headers=headers, json=payload)
-                return response.status_code, response.text
-                
-            status_code, response_text = await asyncio.get_event_loop().run_in_executor(None, make_request)
+            status_code, response_text = await self._post(endpoint, headers, payload)
             
             if status_code != 200:
                 logger.error(f"AIML API error: {status_code} - {response_text}")
@@ -89,6 +96,54 @@ class AIMLAPIClient:
             logger.error(f"Error generating text with AIML API: {str(e)}")
             return None
             
+    async def stream_text(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> AsyncIterator[str]:
+        """Generate a text response, yielding each piece as the API produces it
+
+        Raises AIMLAPIError if the API refuses the request.
+        """
+        if not self.initialized:
+            raise AIMLAPIError("AIML API client not initialized (missing API key)")
+            
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+            "Accept": "text/event-stream"
+        }
+        endpoint = f"{self.base_url}/chat/completions"
+        payload = {
+            "model": "gpt-3.5-turbo",
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True
+        }
+        timeout = aiohttp.ClientTimeout(total=None, connect=http_client.CONNECT_TIMEOUT, sock_read=STREAM_IDLE_TIMEOUT)
+        
+        async with http_client.get_session("aiml").post(endpoint, headers=headers, json=payload, timeout=timeout) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise AIMLAPIError(f"AIML API error: {response.status} - {error_text[:200]}")
+            
+            # Server-sent events: one "data: {json}" line per chunk, then "data: [DONE]"
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed AIML stream chunk: {data[:100]}")
+                    continue
+                for choice in chunk.get("choices", []):
+                    piece = (choice.get("delta") or {}).get("content") or choice.get("text")
+                    if piece:
+                        yield piece
+            
     async def analyze_content(self, content: str) -> Dict[str, Any]:
         """Analyze content for toxicity, sentiment, etc."""
         if not self.initialized:
@@ -113,12 +168,7 @@ class AIMLAPIClient:
                 "temperature": 0.3  # Lower temperature for more deterministic analysis
             }
             
-            # Use requests in a non-blocking way with asyncio executor
-            def make_request():
-                response = requests.post(endpoint, headers=headers, json=payload)
-                return response.status_code, response.text
-                
-            status_code, response_text = await asyncio.get_event_loop().run_in_executor(None, make_request)
+            status_code, response_text = await self._post(endpoint, headers, payload)
             
             if status_code != 200:
                 logger.error(f"AIML API error: {status_code} - {response_text}")
@@ -188,12 +238,7 @@ class AIMLAPIClient:
                 "temperature": 0.5  # Lower temperature for more focused summaries
             }
             
-            # Use requests in a non-blocking way with asyncio executor
-            def make_request():
-                response = requests.post(endpoint, headers=headers, json=payload)
-                return response.status_code, response.text
-                
-            status_code, response_text = await asyncio.get_event_loop().run_in_executor(None, make_request)
+            status_code, response_text = await self._post(endpoint, headers, payload)
             
             if status_code != 200:
                 logger.error(f"AIML API error: {status_code} - {response_text}")
@@ -0,0 +1,134 @@
+"""
+Write-behind JSON Config Store for Discord Bot
+
+Cogs keep their JSON-backed configuration in memory and call save() whenever
+it changes. Saves are coalesced on a short debounce and written off the event
+loop with an atomic temp-file-plus-rename, so a burst of changes costs a single
+disk write and a crash never leaves a half-written config file behind.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import tempfile
+import weakref
+from typing import Any, Callable
+
+logger = logging.getLogger('discord')
+
+# Default debounce between the first change and the disk write (seconds)
+DEFAULT_SAVE_DELAY = 2.0
+
+# Every live store, so shutdown can flush them all
+_stores = weakref.WeakSet()
+
+
+class JSONConfigStore:
+    """Debounced, atomic writer for one JSON config file"""
+
+    def __init__(self, path: str, serialize: Callable[[], Any], delay: float = DEFAULT_SAVE_DELAY, indent: int = 2):
+        """
+        path: file to write
+        serialize: returns the current in-memory state to dump as JSON
+        delay: debounce window in seconds
+        """
+        self.path = path
+        self.delay = delay
+        self.indent = indent
+        self._serialize = serialize
+        self._dirty = False
+        self._task = None
+        self._lock = asyncio.Lock()
+        _stores.add(self)
+
+    def save(self) -> None:
+        """Mark the state as changed and schedule a debounced write"""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, startup code): write right away
+            self.flush_now()
+            return
+
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        while True:
+            await asyncio.sleep(self.delay)
+            # Shielded so close() cancelling the debounce can't abort a write mid-way
+            written = await asyncio.shield(self.flush())
+            # Changes saved while we were writing found this task still running, so write them too
+            if not written or not self._dirty:
+                return
+
+    async def flush(self) -> bool:
+        """Write pending changes now, off the event loop; False if the write failed"""
+        async with self._lock:
+            if not self._dirty:
+                return True
+            self._dirty = False
+
+            # Serialize on the loop so the state can't change mid-dump
+            try:
+                payload = json.dumps(self._serialize(), indent=self.indent)
+            except Exception as e:
+                logger.error(f"Error serializing config for {self.path}: {str(e)}")
+                return False
+
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, payload)
+                logger.debug(f"Saved config file {self.path}")
+                return True
+            except Exception as e:
+                # Keep the changes pending so the next save retries them
+                self._dirty = True
+                logger.error(f"Error writing config file {self.path}: {str(e)}")
+                return False
+
+    def flush_now(self) -> None:
+        """Write pending changes synchronously (no event loop available)"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            self._write(json.dumps(self._serialize(), indent=self.indent))
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Error writing config file {self.path}: {str(e)}")
+
+    def _write(self, payload: str) -> None:
+        """Atomically replace the config file with payload"""
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    async def close(self) -> None:
+        """Cancel any pending debounce and flush immediately"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        await self.flush()
+
+
+async def flush_all_stores() -> None:
+    """Flush every config store (called on bot shutdown)"""
+    for store in list(_stores):
+        try:
+            await store.close()
+        except Exception as e:
+            logger.error(f"Error flushing config store {store.path}: {str(e)}")
@@ -0,0 +1,174 @@
+"""
+Cooldown Index for Discord Bot
+
+This module keeps the next time each user may repeat a timed action (daily,
+work, rob) so commands can reject a user who is still on cooldown without a
+database round trip. The database stays the source of truth: the index is
+warmed lazily from the results of real claims (a successful claim, or a claim
+the database refused with the time left) and only ever answers "still on
+cooldown". A miss just falls through to the normal database path.
+
+Storage is pluggable. The default backend is a process-local dict; set
+COOLDOWN_BACKEND_URL to a redis:// URL to share cooldowns between bot
+processes.
+"""
+
+import os
+import time
+import heapq
+import logging
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Optional
+
+logger = logging.getLogger('discord')
+
+# Shared backend, e.g. redis://localhost:6379/0 (empty = process-local)
+COOLDOWN_BACKEND_URL = os.environ.get("COOLDOWN_BACKEND_URL", "")
+
+# Memory backend: prune expired entries once it holds this many
+DEFAULT_MAX_ENTRIES = 50000
+
+
+class CooldownBackend(ABC):
+    """Storage for next-allowed times (seconds since the epoch) by key"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[float]:
+        """Next-allowed time for a key, or None if unknown"""
+
+    @abstractmethod
+    async def set(self, key: str, until: float) -> None:
+        """Remember that a key is on cooldown until `until`"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Forget a key"""
+
+
+class MemoryCooldownBackend(CooldownBackend):
+    """Process-local backend
+
+    A heap of expiry times lets expired entries be dropped a few at a time as
+    new ones arrive. If the map still outgrows max_entries, the entries
+    closest to expiry are dropped down to PRUNE_TO of the cap, so the cost is
+    amortised over many writes. Dropping a live entry only loses the fast
+    path: the database still enforces that cooldown.
+    """
+
+    # Fraction of max_entries left after pruning a full map
+    PRUNE_TO = 0.9
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._until = {}
+        # (until, key), possibly stale: an entry only counts if it matches _until
+        self._expiry = []
+
+    async def get(self, key: str) -> Optional[float]:
+        return self._until.get(key)
+
+    async def set(self, key: str, until: float) -> None:
+        self._until[key] = until
+        heapq.heappush(self._expiry, (until, key))
+        now = time.time()
+        self._pop_while(lambda: self._expiry[0][0] <= now)
+        if len(self._until) > self.max_entries:
+            low_water = int(self.max_entries * self.PRUNE_TO)
+            self._pop_while(lambda: len(self._until) > low_water)
+        elif len(self._expiry) > 2 * self.max_entries:
+            # Overwritten and deleted keys leave stale heap entries behind
+            self._expiry = [(until, key) for key, until in self._until.items()]
+            heapq.heapify(self._expiry)
+
+    async def delete(self, key: str) -> None:
+        self._until.pop(key, None)
+
+    def _pop_while(self, condition) -> None:
+        """Drop the entries closest to expiry while condition() holds"""
+        while self._expiry and condition():
+            until, key = heapq.heappop(self._expiry)
+            if self._until.get(key) == until:
+                del self._until[key]
+
+
+class RedisCooldownBackend(CooldownBackend):
+    """Backend shared between processes through Redis (needs the redis package)"""
+
+    def __init__(self, url: str, prefix: str = "cooldown:"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[float]:
+        value = await self._client.get(self.prefix + key)
+        return float(value) if value is not None else None
+
+    async def set(self, key: str, until: float) -> None:
+        ttl_ms = int((until - time.time()) * 1000)
+        if ttl_ms > 0:
+            # Entries expire with the cooldown, so Redis never holds stale keys
+            await self._client.set(self.prefix + key, until, px=ttl_ms)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self.prefix + key)
+
+
+class CooldownIndex:
+    """Answers "is this user still on cooldown?" from the backend alone"""
+
+    def __init__(self, backend: CooldownBackend = None):
+        self.backend = backend or MemoryCooldownBackend()
+
+    @staticmethod
+    def _key(user_id, action: str) -> str:
+        return f"{action}:{user_id}"
+
+    async def time_left(self, user_id, action: str) -> Optional[timedelta]:
+        """Time left on a known cooldown, or None if not known to be on cooldown"""
+        try:
+            until = await self.backend.get(self._key(user_id, action))
+        except Exception as e:
+            logger.warning(f"Cooldown index lookup failed: {str(e)}")
+            return None
+        if until is None:
+            return None
+        remaining = until - time.time()
+        return timedelta(seconds=remaining) if remaining > 0 else None
+
+    async def start(self, user_id, action: str, cooldown: timedelta) -> None:
+        """Record that the action was just used"""
+        await self.set_remaining(user_id, action, cooldown)
+
+    async def set_remaining(self, user_id, action: str, time_left: timedelta) -> None:
+        """Record a cooldown with `time_left` to go (e.g. as reported by the database)"""
+        try:
+            await self.backend.set(self._key(user_id, action), time.time() + time_left.total_seconds())
+        except Exception as e:
+            logger.warning(f"Cooldown index update failed: {str(e)}")
+
+    async def clear(self, user_id, action: str) -> None:
+        """Forget a user's cooldown (e.g. after an admin reset)"""
+        try:
+            await self.backend.delete(self._key(user_id, action))
+        except Exception as e:
+            logger.warning(f"Cooldown index update failed: {str(e)}")
+
+
+_index = None
+
+
+def get_cooldown_index() -> CooldownIndex:
+    """Get the shared cooldown index, creating its backend on first use"""
+    global _index
+    if _index is None:
+        backend = None
+        if COOLDOWN_BACKEND_URL:
+            try:
+                backend = RedisCooldownBackend(COOLDOWN_BACKEND_URL)
+                logger.info("Using shared cooldown backend")
+            except ImportError:
+                logger.warning("COOLDOWN_BACKEND_URL is set but the redis package is not installed; using memory backend")
+        _index = CooldownIndex(backend)
+    return _index
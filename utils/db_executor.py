@@ -0,0 +1,245 @@
+"""
+Database Executor for Discord Bot
+
+SQLAlchemy calls block, so cogs must never run them on the event loop. This
+module owns a small bounded thread pool dedicated to database work. Each call
+submitted through run_db is one unit of work: it runs inside its own Flask app
+context, so it gets a fresh scoped session that is rolled back on error and
+removed when the context ends.
+
+Units of work that write go through run_write. On PostgreSQL that is the same
+as run_db. On SQLite, where only one connection can write at a time, they are
+queued for a single writer thread instead: it takes whatever has queued up (up
+to DB_WRITE_BATCH units), runs each unit in its own savepoint of one
+BEGIN IMMEDIATE transaction and commits the batch once. A unit that fails only
+rolls back its own savepoint, and no caller hears back before the batch has
+committed.
+"""
+
+import os
+import queue
+import asyncio
+import logging
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from database import db
+from utils.sqlite_profile import is_sqlite
+
+logger = logging.getLogger('discord')
+
+# Number of threads doing database work; keep it at or below the engine's pool size
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "4"))
+# Most write units the SQLite writer commits in one transaction
+DB_WRITE_BATCH = int(os.environ.get("DB_WRITE_BATCH", "100"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_writer = None
+# False once we know the database isn't SQLite and writes go through run_db
+_use_writer = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the shared database thread pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+                logger.info(f"Started database executor with {DB_EXECUTOR_WORKERS} workers")
+    return _executor
+
+
+def _unit_of_work(func: Callable, args: tuple, kwargs: dict) -> Any:
+    """Run func inside an app context with its own session"""
+    # Import app here to avoid circular imports
+    from app import app
+
+    with app.app_context():
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+async def run_db(func: Callable, *args, **kwargs) -> Any:
+    """Run a Flask-SQLAlchemy unit of work on the database executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), _unit_of_work, func, args, kwargs)
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run blocking database code that manages its own session on the database executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+class _Write:
+    __slots__ = ("func", "args", "kwargs", "batched", "future")
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, batched: bool):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        # Flask-SQLAlchemy units share the batch transaction; blocking code runs on its own
+        self.batched = batched
+        self.future = Future()
+
+
+class SQLiteWriter:
+    """Single thread that performs every write, committing queued units in batches"""
+
+    def __init__(self, url, batch_size: int = DB_WRITE_BATCH):
+        self.batch_size = batch_size
+        # A dedicated connection: autocommit at the driver so SQLAlchemy controls BEGIN
+        self.engine = create_engine(url, pool_size=1, max_overflow=0)
+        event.listen(self.engine, "connect", self._on_connect)
+        event.listen(self.engine, "begin", self._on_begin)
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Started SQLite writer (batches of up to {batch_size} writes)")
+
+    @staticmethod
+    def _on_connect(dbapi_connection, connection_record):
+        # pysqlite's own transaction handling breaks SAVEPOINT
+        dbapi_connection.isolation_level = None
+
+    @staticmethod
+    def _on_begin(connection):
+        # Take the write lock up front; a deferred transaction could fail to upgrade later
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def submit(self, func: Callable, args: tuple, kwargs: dict, batched: bool) -> Future:
+        write = _Write(func, args, kwargs, batched)
+        self._queue.put(write)
+        return write.future
+
+    def close(self) -> None:
+        """Finish the queued writes and stop the thread"""
+        self._queue.put(None)
+        self._thread.join()
+        self.engine.dispose()
+
+    def _run(self) -> None:
+        # Import app here to avoid circular imports
+        from app import app
+
+        stopping = False
+        while not stopping:
+            write = self._queue.get()
+            if write is None:
+                return
+            batch = [write]
+            while len(batch) < self.batch_size:
+                try:
+                    write = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if write is None:
+                    stopping = True
+                    break
+                batch.append(write)
+
+            units = []
+            for write in batch:
+                if write.batched:
+                    units.append(write)
+                    continue
+                # Blocking code uses its own engine, so it can't join the batch transaction
+                if units:
+                    self._commit_units(app, units)
+                    units = []
+                self._run_blocking(write)
+            if units:
+                self._commit_units(app, units)
+
+    def _commit_units(self, app, units) -> None:
+        outcomes = []
+        try:
+            with app.app_context(), self.engine.connect() as connection, connection.begin():
+                for write in units:
+                    # A fresh session per unit, joined to the batch transaction through a savepoint
+                    session = Session(bind=connection, join_transaction_mode="create_savepoint",
+                                      expire_on_commit=False)
+                    db.session.registry.set(session)
+                    try:
+                        outcomes.append((write, write.func(*write.args, **write.kwargs), None))
+                    except Exception as e:
+                        session.rollback()
+                        outcomes.append((write, None, e))
+                    finally:
+                        db.session.remove()
+        except Exception as e:
+            # The batch didn't commit, so none of its units happened
+            logger.error(f"SQLite write batch of {len(units)} failed: {str(e)}")
+            for write in units:
+                write.future.set_exception(e)
+            return
+
+        for write, result, error in outcomes:
+            if error is None:
+                write.future.set_result(result)
+            else:
+                write.future.set_exception(error)
+
+    @staticmethod
+    def _run_blocking(write: _Write) -> None:
+        try:
+            write.future.set_result(write.func(*write.args, **write.kwargs))
+        except Exception as e:
+            write.future.set_exception(e)
+
+
+def get_writer() -> Optional[SQLiteWriter]:
+    """The SQLite writer, or None when the database handles concurrent writers itself"""
+    global _writer, _use_writer
+    if _use_writer is None:
+        with _executor_lock:
+            if _use_writer is None:
+                # Import app here to avoid circular imports
+                from app import app
+
+                with app.app_context():
+                    engine = db.engine
+                if is_sqlite(engine):
+                    _writer = SQLiteWriter(engine.url)
+                _use_writer = _writer is not None
+    return _writer
+
+
+async def run_write(func: Callable, *args, **kwargs) -> Any:
+    """Run a Flask-SQLAlchemy unit of work that writes (batched through the writer on SQLite)"""
+    writer = get_writer()
+    if writer is None:
+        return await run_db(func, *args, **kwargs)
+    return await asyncio.wrap_future(writer.submit(func, args, kwargs, True))
+
+
+async def run_blocking_write(func: Callable, *args, **kwargs) -> Any:
+    """Run blocking code that writes with its own session (on the writer thread on SQLite)"""
+    writer = get_writer()
+    if writer is None:
+        return await run_blocking(func, *args, **kwargs)
+    return await asyncio.wrap_future(writer.submit(func, args, kwargs, False))
+
+
+def shutdown_executor() -> None:
+    """Wait for queued database work and stop the executor and writer (called on shutdown)"""
+    global _executor, _writer, _use_writer
+    with _executor_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+        _use_writer = None
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
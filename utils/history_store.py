@@ -0,0 +1,144 @@
+"""
+Bounded Conversation History Store for Discord Bot
+
+This module keeps recent conversation turns in memory with hard bounds. Each
+user gets a fixed-size ring buffer of slotted Turn records, appended in
+arrival order so reads never sort. Users are kept in least-recently-used
+order and evicted from the front whenever the total size of the stored
+content goes over the byte budget (or the user count over its cap), so memory
+stays bounded no matter how many different users chat with the bot.
+"""
+
+import threading
+from collections import deque, OrderedDict
+from typing import Any, Hashable, Iterable, List, Optional, Tuple
+
+# Rough per-turn overhead (record, deque slot, strings) counted on top of the content
+TURN_OVERHEAD_BYTES = 120
+
+
+class Turn:
+    """One message in a conversation"""
+
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role: str, content: str, timestamp: Any = None):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + TURN_OVERHEAD_BYTES
+
+
+class _UserHistory:
+    __slots__ = ("turns", "complete", "size")
+
+    def __init__(self, max_turns: int, complete: bool):
+        self.turns = deque(maxlen=max_turns)
+        # True when these turns are the user's entire history, not just the newest ones
+        self.complete = complete
+        self.size = 0
+
+
+class HistoryStore:
+    """Per-user ring buffers of turns under a global byte budget"""
+
+    def __init__(self, max_turns: int, max_bytes: int, max_users: Optional[int] = None):
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.max_users = max_users
+        self.total_bytes = 0
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, user_id: Hashable) -> bool:
+        return user_id in self._users
+
+    def _append(self, history: _UserHistory, turn: Turn) -> None:
+        if len(history.turns) == history.turns.maxlen:
+            # The ring buffer is full: the oldest turn falls off the left
+            dropped = history.turns[0].size
+            history.size -= dropped
+            self.total_bytes -= dropped
+            history.complete = False
+        history.turns.append(turn)
+        history.size += turn.size
+        self.total_bytes += turn.size
+
+    def _evict(self) -> None:
+        """Drop least recently used users until under the byte budget and user cap"""
+        users = self._users
+        while len(users) > 1 and (
+            self.total_bytes > self.max_bytes or (self.max_users is not None and len(users) > self.max_users)
+        ):
+            _, history = users.popitem(last=False)
+            self.total_bytes -= history.size
+
+    def put(self, user_id: Hashable, turns: Iterable[Turn], complete: bool) -> None:
+        """Replace a user's turns (oldest first)"""
+        history = _UserHistory(self.max_turns, complete)
+        with self._lock:
+            old = self._users.pop(user_id, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            for turn in turns:
+                self._append(history, turn)
+            self._users[user_id] = history
+            self._evict()
+
+    def append(self, user_id: Hashable, turns: Iterable[Turn], create: bool = False) -> bool:
+        """Append turns to a user's history; returns False if the user isn't stored and create is off"""
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is None:
+                if not create:
+                    return False
+                # A user first seen here has no earlier turns
+                history = self._users[user_id] = _UserHistory(self.max_turns, True)
+            else:
+                self._users.move_to_end(user_id)
+            for turn in turns:
+                self._append(history, turn)
+            self._evict()
+            return True
+
+    def recent(self, user_id: Hashable, limit: int, partial: bool = False) -> Optional[List[Turn]]:
+        """The newest `limit` turns (oldest first), or None if the store can't answer
+
+        The store can answer when it holds at least `limit` turns for the user,
+        or all of the user's turns. With partial, whatever is stored is
+        returned (an empty list for an unknown user).
+        """
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is None:
+                return [] if partial else None
+            count = len(history.turns)
+            if limit <= 0:
+                if not (history.complete or partial):
+                    return None
+                limit = count
+            elif count < limit and not (history.complete or partial):
+                return None
+            self._users.move_to_end(user_id)
+            start = max(count - limit, 0)
+            return [history.turns[i] for i in range(start, count)]
+
+    def discard(self, user_id: Hashable) -> int:
+        """Forget a user; returns how many turns were stored"""
+        with self._lock:
+            history = self._users.pop(user_id, None)
+            if history is None:
+                return 0
+            self.total_bytes -= history.size
+            return len(history.turns)
+
+    def stats(self) -> Tuple[int, int]:
+        """(users, bytes) currently stored"""
+        with self._lock:
+            return len(self._users), self.total_bytes
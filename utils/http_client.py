@@ -0,0 +1,90 @@
+"""
+Shared HTTP Clients for Discord Bot
+
+Every outbound API call (AI providers, link previews, meme sources) goes
+through a long-lived aiohttp session from this module instead of opening a
+session per call, so repeat calls reuse warm keep-alive connections and skip
+the TCP and TLS handshakes. Each provider gets its own session, and so its own
+connection pool and timeout; connectors cap connections per host and cache
+DNS lookups.
+
+Cogs that make requests call acquire() in cog_load and release() in
+cog_unload; the sessions are closed when the last user releases them (and
+unconditionally by close_sessions() when the bot shuts down).
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict
+
+import aiohttp
+
+logger = logging.getLogger('discord')
+
+# Total request timeout per provider (seconds); anything else uses "default"
+PROVIDER_TIMEOUTS = {
+    "aiml": 60,
+    "gemini": 45,
+    "vertex": 60,
+    "web": 10,
+    "memes": 5,
+    "default": 30,
+}
+CONNECT_TIMEOUT = 10
+
+# Connection pool limits per session
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "100"))
+HTTP_POOL_SIZE_PER_HOST = int(os.environ.get("HTTP_POOL_SIZE_PER_HOST", "20"))
+# How long idle keep-alive connections and resolved addresses are kept (seconds)
+HTTP_KEEPALIVE_SECONDS = 60
+HTTP_DNS_CACHE_SECONDS = 300
+
+_sessions: Dict[str, aiohttp.ClientSession] = {}
+_users = 0
+
+
+def get_session(provider: str = "default") -> aiohttp.ClientSession:
+    """The shared session for a provider, created on first use (call from the event loop)"""
+    session = _sessions.get(provider)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ttl_dns_cache=HTTP_DNS_CACHE_SECONDS
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=PROVIDER_TIMEOUTS.get(provider, PROVIDER_TIMEOUTS["default"]),
+            connect=CONNECT_TIMEOUT
+        )
+        session = _sessions[provider] = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        logger.info(f"Opened shared HTTP session for {provider}")
+    return session
+
+
+def acquire() -> None:
+    """Register a user of the shared sessions (cog_load)"""
+    global _users
+    _users += 1
+
+
+async def release() -> None:
+    """Unregister a user; the last one out closes the sessions (cog_unload)"""
+    global _users
+    _users = max(_users - 1, 0)
+    if _users == 0:
+        await close_sessions()
+
+
+async def close_sessions() -> None:
+    """Close every shared session and its pooled connections"""
+    sessions = list(_sessions.values())
+    _sessions.clear()
+    for session in sessions:
+        if not session.closed:
+            await session.close()
+    if sessions:
+        # Give SSL transports a moment to shut down cleanly
+        await asyncio.sleep(0.25)
+        logger.info(f"Closed {len(sessions)} shared HTTP sessions")
@@ -0,0 +1,129 @@
+"""
+Message Inspection Pipeline for Discord Bot
+
+This module provides a single on_message dispatcher shared by every cog that
+inspects guild messages (profanity filter, rules enforcer, AI moderation, etc).
+Each message is normalized once into an InspectedMessage and handed to the
+registered stages in priority order. A stage that deletes or fully handles the
+message returns Verdict.STOP so later stages (and their AI calls) are skipped.
+"""
+
+import re
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+logger = logging.getLogger('discord')
+
+# Shared URL pattern used by every stage that looks at links
+URL_PATTERN = re.compile(r'https?://\S+')
+
+# Stage priorities (lower runs first). Cheap, local filters go before AI calls.
+PRIORITY_PROFANITY = 10
+PRIORITY_RULES = 20
+PRIORITY_AI_MODERATION = 30
+PRIORITY_CONTENT_ANALYSIS = 40
+PRIORITY_CONVERSATION = 50
+PRIORITY_VOICE_AI = 60
+
+
+class Verdict:
+    """Result returned by an inspection stage"""
+    CONTINUE = "continue"  # Let the next stage look at the message
+    STOP = "stop"          # Terminal: the message was deleted or fully handled
+
+
+class InspectedMessage:
+    """A guild message normalized once for all inspection stages"""
+
+    __slots__ = (
+        "message", "guild_id", "channel_id", "content", "text", "urls",
+        "attachments", "image_attachments", "mention_count",
+        "role_mention_count", "mention_everyone", "deleted"
+    )
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self.guild_id = str(message.guild.id)
+        self.channel_id = str(message.channel.id)
+        self.content = message.content or ""
+        # Casefolded copy for case-insensitive matching
+        self.text = self.content.casefold()
+        self.urls = URL_PATTERN.findall(self.content) if "http" in self.text else []
+        self.attachments = list(message.attachments)
+        self.image_attachments = [
+            a for a in self.attachments
+            if a.content_type and a.content_type.startswith("image/")
+        ]
+        self.mention_count = len(message.mentions)
+        self.role_mention_count = len(message.role_mentions)
+        self.mention_everyone = message.mention_everyone
+        self.deleted = False
+
+    async def delete(self) -> None:
+        """Delete the underlying message and remember that it is gone"""
+        await self.message.delete()
+        self.deleted = True
+
+
+Stage = Callable[[InspectedMessage], Awaitable[Optional[str]]]
+
+
+class MessagePipeline:
+    """Ordered set of inspection stages driven by one on_message listener"""
+
+    def __init__(self):
+        self._stages: Dict[str, tuple] = {}
+        self._ordered: List[tuple] = []
+
+    def register(self, name: str, stage: Stage, priority: int) -> None:
+        """Register (or replace) a named stage"""
+        self._stages[name] = (priority, name, stage)
+        self._ordered = sorted(self._stages.values(), key=lambda s: (s[0], s[1]))
+        logger.info(f"Registered message inspection stage '{name}' (priority {priority})")
+
+    def unregister(self, name: str) -> None:
+        """Remove a stage, e.g. when its cog is unloaded"""
+        if self._stages.pop(name, None) is not None:
+            self._ordered = sorted(self._stages.values(), key=lambda s: (s[0], s[1]))
+            logger.info(f"Unregistered message inspection stage '{name}'")
+
+    @property
+    def stage_names(self) -> List[str]:
+        """Stage names in execution order"""
+        return [name for _, name, _ in self._ordered]
+
+    async def dispatch(self, message: discord.Message) -> None:
+        """Normalize a message once and run it through every stage in order"""
+        # Bots and DMs are never inspected
+        if message.author.bot or not message.guild:
+            return
+
+        if not self._ordered:
+            return
+
+        inspected = InspectedMessage(message)
+
+        # Iterate over a snapshot so (un)registration during dispatch is safe
+        for priority, name, stage in tuple(self._ordered):
+            try:
+                verdict = await stage(inspected)
+            except Exception as e:
+                logger.error(f"Error in message inspection stage '{name}': {str(e)}")
+                continue
+
+            if verdict == Verdict.STOP or inspected.deleted:
+                logger.debug(f"Message {message.id} stopped at inspection stage '{name}'")
+                break
+
+
+def get_pipeline(bot) -> MessagePipeline:
+    """Get the bot's message pipeline, installing its listener on first use"""
+    pipeline = getattr(bot, "message_pipeline", None)
+    if pipeline is None:
+        pipeline = MessagePipeline()
+        bot.message_pipeline = pipeline
+        bot.add_listener(pipeline.dispatch, "on_message")
+        logger.info("Message inspection pipeline installed")
+    return pipeline
@@ -0,0 +1,284 @@
+"""
+AI Provider Router for Discord Bot
+
+AI requests used to walk a fixed chain of providers, so an outage made every
+request wait out the failing provider's timeout before falling through. A
+ProviderRouter instead keeps a rolling window of latencies and outcomes per
+provider and:
+
+- orders the candidates for each request by health: providers that failed
+  recently go after the others, otherwise the caller's preference holds
+- opens a circuit breaker on a provider after repeated failures, skipping it
+  entirely until a cooldown passes; then a single probe request decides
+  whether it closes again or stays open for longer
+- hedges: if the leading request is still running after that provider's
+  median latency, the next healthy provider is raised in parallel and the
+  first good answer wins
+
+One router per workload (chat, moderation), since their latencies differ.
+snapshot() reports every provider's state for debugging.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('discord')
+
+# Samples kept per provider for latency and error rate
+ROUTER_WINDOW = int(os.environ.get("AI_ROUTER_WINDOW", "50"))
+# Consecutive failures, or error rate over a window of at least ROUTER_MIN_SAMPLES, that open the breaker
+BREAKER_FAILURES = int(os.environ.get("AI_BREAKER_FAILURES", "3"))
+BREAKER_ERROR_RATE = 0.5
+ROUTER_MIN_SAMPLES = 10
+# Seconds a breaker stays open; doubles after each failed probe up to the maximum
+BREAKER_COOLDOWN = float(os.environ.get("AI_BREAKER_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN = 300.0
+# Providers that failed within DEGRADED_SECONDS, or fail more often than
+# DEGRADED_ERROR_RATE, are tried after healthier ones until they go quiet
+DEGRADED_ERROR_RATE = 0.2
+DEGRADED_SECONDS = 60.0
+# Hedge after the leader's median latency, within these bounds (seconds)
+HEDGE_MIN_DELAY = 0.5
+HEDGE_MAX_DELAY = 10.0
+# Latency samples needed before the median is trusted for hedging
+HEDGE_MIN_SAMPLES = 5
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# An attempt gets a claim() callable and returns its result, or None for "no answer"
+Attempt = Callable[[Callable[[], bool]], Awaitable[Any]]
+
+
+class ProviderHealth:
+    """Rolling health of one provider and its circuit breaker"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = deque(maxlen=ROUTER_WINDOW)
+        self.outcomes = deque(maxlen=ROUTER_WINDOW)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.failed_at = None
+        self.cooldown = BREAKER_COOLDOWN
+        self.probing = False
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def p50(self) -> Optional[float]:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[len(ordered) // 2]
+
+    def degraded(self, now: float) -> bool:
+        """Failed recently, so healthier providers go first"""
+        if self.failed_at is None or now - self.failed_at >= DEGRADED_SECONDS:
+            return False
+        return self.consecutive_failures > 0 or self.error_rate > DEGRADED_ERROR_RATE
+
+    def available(self, now: float) -> bool:
+        """Whether a request may be sent now (moving an expired open breaker to half-open)"""
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self.probing = False
+            logger.info(f"AI provider {self.name} circuit half-open, probing")
+        if self.state == HALF_OPEN:
+            return not self.probing
+        return self.state == CLOSED
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            logger.info(f"AI provider {self.name} recovered, circuit closed")
+        self.state = CLOSED
+        self.probing = False
+        self.cooldown = BREAKER_COOLDOWN
+
+    def record_slow(self, latency: float) -> None:
+        """A request abandoned for a faster provider: it took at least this long"""
+        self.latencies.append(latency)
+        if self.state == HALF_OPEN:
+            self.probing = False
+
+    def record_failure(self, now: float) -> None:
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.failed_at = now
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+            self._open(now)
+        elif self.state == CLOSED and (
+            self.consecutive_failures >= BREAKER_FAILURES
+            or (len(self.outcomes) >= ROUTER_MIN_SAMPLES and self.error_rate >= BREAKER_ERROR_RATE)
+        ):
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.probing = False
+        logger.warning(f"AI provider {self.name} circuit open for {self.cooldown:.0f}s "
+                       f"({self.consecutive_failures} consecutive failures, {self.error_rate:.0%} errors)")
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        p50 = self.p50()
+        return {
+            "provider": self.name,
+            "state": self.state,
+            "p50": p50,
+            "error_rate": self.error_rate,
+            "samples": len(self.outcomes),
+            "degraded": self.degraded(now),
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": max(self.opened_at + self.cooldown - now, 0.0) if self.state == OPEN else 0.0,
+        }
+
+
+class ProviderRouter:
+    """Runs a request against the healthiest providers, with breakers and hedging"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._health: Dict[str, ProviderHealth] = {}
+
+    def health(self, provider: str) -> ProviderHealth:
+        health = self._health.get(provider)
+        if health is None:
+            health = self._health[provider] = ProviderHealth(provider)
+        return health
+
+    def _order(self, candidates: List[Tuple[str, Attempt]], now: float) -> List[Tuple[str, Attempt]]:
+        """Available candidates, recently failing ones last; the caller's order breaks ties"""
+        ranked = []
+        for priority, (provider, attempt) in enumerate(candidates):
+            health = self.health(provider)
+            if not health.available(now):
+                continue
+            # A half-open provider keeps its place so its probe actually gets sent
+            demoted = health.state == CLOSED and health.degraded(now)
+            ranked.append(((demoted, priority), provider, attempt))
+        ranked.sort(key=lambda entry: entry[0])
+        return [(provider, attempt) for _, provider, attempt in ranked]
+
+    def _hedge_delay(self, provider: str) -> float:
+        p50 = self.health(provider).p50()
+        if p50 is None:
+            return HEDGE_MAX_DELAY
+        return min(max(p50, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    async def run(self, candidates: List[Tuple[str, Attempt]], hedge: bool = True) -> Optional[Tuple[str, Any]]:
+        """Get an answer from the first provider that gives one
+
+        candidates are (provider name, attempt) in order of preference. An
+        attempt returns its answer, or None (or raises) if it has none. An
+        attempt that starts showing output to the user calls claim() first:
+        if that returns True the other attempts are cancelled and no more are
+        started; if False another provider has already won and the attempt
+        should stop. Returns (provider, answer), or None if nobody answered.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self._order(candidates, time.monotonic())
+        pending: Dict[asyncio.Task, Tuple[str, float]] = {}
+        claimed = []
+
+        def cancel_others(keep=None):
+            for task in pending:
+                if task is not keep:
+                    task.cancel()
+
+        def launch():
+            provider, attempt = queue.pop(0)
+            health = self.health(provider)
+            if health.state == HALF_OPEN:
+                health.probing = True
+
+            def claim() -> bool:
+                if claimed:
+                    return claimed[0] == provider
+                claimed.append(provider)
+                cancel_others(keep=current)
+                return True
+
+            current = asyncio.create_task(attempt(claim))
+            pending[current] = (provider, loop.time())
+
+        try:
+            if queue:
+                launch()
+            while pending:
+                # Hedge only while nobody has claimed the answer and a second provider is free
+                timeout = None
+                if hedge and queue and len(pending) == 1 and not claimed:
+                    leader, started = next(iter(pending.values()))
+                    timeout = max(self._hedge_delay(leader) - (loop.time() - started), 0.0)
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The leader may have claimed the answer while we waited
+                    if not claimed:
+                        logger.info(f"{self.name} router: {leader} slower than usual, hedging with {queue[0][0]}")
+                        launch()
+                    continue
+
+                for task in done:
+                    provider, started = pending.pop(task)
+                    elapsed = loop.time() - started
+                    health = self.health(provider)
+                    if task.cancelled():
+                        health.record_slow(elapsed)
+                        continue
+                    error = task.exception()
+                    result = None if error else task.result()
+                    if result is None:
+                        reason = f"{type(error).__name__}: {error}" if error else "no answer"
+                        logger.warning(f"{self.name} router: {provider} failed after {elapsed:.2f}s ({reason})")
+                        health.record_failure(time.monotonic())
+                        continue
+                    health.record_success(elapsed)
+                    # Losers still running just took longer than the winner
+                    for other, (other_provider, other_started) in pending.items():
+                        other.cancel()
+                        self.health(other_provider).record_slow(loop.time() - other_started)
+                    pending.clear()
+                    return provider, result
+
+                # Everything in flight failed: move on to the next provider right away
+                if not pending and queue and not claimed:
+                    launch()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Every known provider's health, for debugging"""
+        now = time.monotonic()
+        return [health.snapshot(now) for health in self._health.values()]
+
+
+_routers: Dict[str, ProviderRouter] = {}
+
+
+def get_router(name: str) -> ProviderRouter:
+    """The shared router for a workload ("chat", "moderation"), created on first use"""
+    router = _routers.get(name)
+    if router is None:
+        router = _routers[name] = ProviderRouter(name)
+    return router
+
+
+def all_routers() -> List[ProviderRouter]:
+    return list(_routers.values())
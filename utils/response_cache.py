@@ -0,0 +1,236 @@
+"""
+Response Cache for Discord Bot
+
+Expensive AI calls are often repeated word for word: the same FAQ asked in
+/ask a few minutes apart, or the same message pasted into a channel over and
+over. ResponseCache remembers results by key for a limited time:
+
+- a memory tier: an LRU of up to max_entries entries, answered without I/O
+- an optional disk tier: a small SQLite file that survives restarts, read
+  on a memory miss; it is opened, read, written and closed on the database
+  executor, never on the event loop
+
+Entries expire after ttl seconds in both tiers. Keys are built with
+make_key() from normalize_text()'d input plus whatever else changes the
+answer (model, personality, ...). clear() empties both tiers, for when
+something the key doesn't cover has changed.
+"""
+
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.db_executor import run_blocking
+from utils.sqlite_profile import PRAGMAS
+
+logger = logging.getLogger('discord')
+
+# Disk entries beyond this many are pruned, oldest first
+DISK_MAX_ENTRIES = 20000
+# Expired and excess disk entries are pruned once every this many stores
+DISK_PRUNE_EVERY = 500
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of text, for cache keys"""
+    return " ".join(text.lower().split())
+
+
+def make_key(*parts: Any) -> str:
+    """Stable hash of the key parts"""
+    return hashlib.sha256("\x00".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """SQLite file of JSON values with expiry times"""
+
+    def __init__(self, path: str, table: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.table = table
+        self._lock = threading.Lock()
+        self._stores = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_expires_at ON {table} (expires_at)")
+        self.prune()
+
+    def get(self, key: str, now: float):
+        """(value, expires_at) for a live key, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._stores += 1
+            prune = self._stores % DISK_PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop expired entries, then the ones closest to expiry beyond DISK_MAX_ENTRIES"""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (DISK_MAX_ENTRIES,)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """TTL cache with an LRU memory tier and an optional SQLite disk tier"""
+
+    def __init__(self, name: str, max_entries: int, ttl: float, path: Optional[str] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk = None
+        # Set once the disk tier failed to open or was closed; the memory tier carries on alone
+        self._disk_done = False
+        self._open_lock = asyncio.Lock()
+        self._pending = set()
+
+    async def open(self) -> None:
+        """Open the disk tier now rather than on first use (e.g. in cog_load)"""
+        await self._disk_tier()
+
+    async def _disk_tier(self) -> Optional[_DiskTier]:
+        """The disk tier, opened on first use; None if disabled or unusable"""
+        if self._disk is not None or not self.path or self._disk_done:
+            return self._disk
+        async with self._open_lock:
+            if self._disk is None and not self._disk_done:
+                try:
+                    self._disk = await run_blocking(_DiskTier, self.path, self.name)
+                    logger.info(f"Opened {self.name} disk cache at {self.path}")
+                except Exception as e:
+                    self._disk_done = True
+                    logger.error(f"Could not open {self.name} disk cache at {self.path}: {str(e)}")
+        return self._disk
+
+    async def _run_disk(self, func, *args) -> Any:
+        """Run a disk tier call on the executor, tracked so close() can wait for it"""
+        future = asyncio.ensure_future(run_blocking(func, *args))
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return await future
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value from the memory tier, or None"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Cache a value in the memory tier"""
+        self._remember(key, value, time.time() + self.ttl)
+
+    async def fetch(self, key: str) -> Optional[Any]:
+        """Cached value from either tier, or None"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        disk = await self._disk_tier()
+        if disk is None:
+            return None
+        try:
+            found = await self._run_disk(disk.get, key, time.time())
+        except Exception as e:
+            logger.error(f"Error reading {self.name} disk cache: {str(e)}")
+            return None
+        if found is None:
+            return None
+        value, expires_at = found
+        # The memory lookup already counted this as a miss
+        self.misses -= 1
+        self.hits += 1
+        self._remember(key, value, expires_at)
+        return value
+
+    async def store(self, key: str, value: Any) -> None:
+        """Cache a JSON-serializable value in both tiers"""
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        disk = await self._disk_tier()
+        if disk is not None:
+            try:
+                await self._run_disk(disk.put, key, value, expires_at)
+            except Exception as e:
+                logger.error(f"Error writing {self.name} disk cache: {str(e)}")
+
+    async def clear(self) -> None:
+        """Forget everything in both tiers"""
+        self._entries.clear()
+        disk = await self._disk_tier()
+        if disk is not None:
+            try:
+                await self._run_disk(disk.clear)
+            except Exception as e:
+                logger.error(f"Error clearing {self.name} disk cache: {str(e)}")
+        logger.info(f"Cleared {self.name} cache")
+
+    async def close(self) -> None:
+        """Wait for disk reads and writes in flight, then close the disk tier"""
+        self._disk_done = True
+        async with self._open_lock:
+            disk, self._disk = self._disk, None
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if disk is not None:
+            await run_blocking(disk.close)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,121 @@
+"""
+Sliding Time Windows for Discord Bot
+
+This module provides small in-memory sliding windows used by rate-based
+detectors (spam, raids). A window is a deque of (timestamp, value) pairs that
+only ever grows at the right and expires from the left, so insert, expiry and
+count are O(1) amortized no matter how long the bot has been running.
+Windows are ephemeral: they are never written to a config file.
+"""
+
+import time
+from collections import deque, OrderedDict
+from typing import Any, Hashable, List, Optional
+
+# Default cap on the number of windows a store keeps alive
+DEFAULT_MAX_WINDOWS = 10000
+
+
+class SlidingWindow:
+    """Timestamps (plus an optional value each) seen within the last max_age seconds"""
+
+    __slots__ = ("max_age", "entries")
+
+    def __init__(self, max_age: float, maxlen: Optional[int] = None):
+        self.max_age = max_age
+        self.entries = deque(maxlen=maxlen)
+
+    def expire(self, now: Optional[float] = None) -> None:
+        """Drop entries older than max_age"""
+        cutoff = (time.monotonic() if now is None else now) - self.max_age
+        entries = self.entries
+        while entries and entries[0][0] <= cutoff:
+            entries.popleft()
+
+    def add(self, value: Any = None, now: Optional[float] = None) -> int:
+        """Record an entry and return the number of entries in the window"""
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+        self.entries.append((now, value))
+        return len(self.entries)
+
+    def count(self, now: Optional[float] = None) -> int:
+        """Number of entries in the window"""
+        self.expire(now)
+        return len(self.entries)
+
+    def values(self) -> List[Any]:
+        """Values in the window, oldest first"""
+        return [value for _, value in self.entries]
+
+    def tail(self, n: int) -> List[Any]:
+        """The newest n values, oldest first"""
+        if n >= len(self.entries):
+            return self.values()
+        return [self.entries[i][1] for i in range(len(self.entries) - n, len(self.entries))]
+
+    @property
+    def newest(self) -> Optional[float]:
+        """Timestamp of the newest entry, or None when empty"""
+        return self.entries[-1][0] if self.entries else None
+
+
+class WindowStore:
+    """Keyed sliding windows with a global cap on how many are kept
+
+    Windows are kept in least-recently-used order. Adding to a window moves it
+    to the end; windows whose newest entry has expired, and the oldest windows
+    beyond max_windows, are dropped from the front. Memory is therefore bounded
+    by max_windows * maxlen entries.
+    """
+
+    def __init__(self, max_age: float, maxlen: Optional[int] = None, max_windows: int = DEFAULT_MAX_WINDOWS):
+        self.max_age = max_age
+        self.maxlen = maxlen
+        self.max_windows = max_windows
+        self._windows = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def get(self, key: Hashable) -> Optional[SlidingWindow]:
+        """Get the window for a key without creating it"""
+        return self._windows.get(key)
+
+    def add(self, key: Hashable, value: Any = None, now: Optional[float] = None) -> SlidingWindow:
+        """Record an entry in a key's window and return the window"""
+        now = time.monotonic() if now is None else now
+
+        window = self._windows.get(key)
+        if window is None:
+            window = SlidingWindow(self.max_age, self.maxlen)
+            self._windows[key] = window
+        else:
+            self._windows.move_to_end(key)
+            # Follow threshold changes made after the window was created
+            window.max_age = self.max_age
+
+        window.add(value, now)
+        self._evict(now)
+        return window
+
+    def discard(self, key: Hashable) -> None:
+        """Forget a key's window"""
+        self._windows.pop(key, None)
+
+    def clear(self) -> None:
+        """Forget every window"""
+        self._windows.clear()
+
+    def _evict(self, now: float) -> None:
+        """Drop stale windows from the front and enforce the window cap"""
+        windows = self._windows
+        while len(windows) > self.max_windows:
+            windows.popitem(last=False)
+
+        cutoff = now - self.max_age
+        while windows:
+            key, window = next(iter(windows.items()))
+            if window.newest is not None and window.newest > cutoff:
+                break
+            del windows[key]
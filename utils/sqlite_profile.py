@@ -0,0 +1,64 @@
+"""
+SQLite Profile for Discord Bot
+
+Small installs run on the SQLite fallback database (data/discord_bot.db),
+shared by the bot and the dashboard. A default-configured SQLite file uses a
+rollback journal, so any writer blocks every reader and concurrent writers
+fail straight away with "database is locked". install() tunes every SQLite
+connection as it is opened:
+
+- WAL journal: readers never block the writer and the writer never blocks readers
+- synchronous=NORMAL: commits don't fsync in WAL mode, only checkpoints do
+- busy_timeout: wait for the write lock instead of failing
+- mmap_size and cache_size: keep the hot pages in memory
+
+Writes are also funnelled through a single writer thread (see
+utils.db_executor.run_write) so the bot never competes with itself for the
+write lock.
+"""
+
+import os
+import logging
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('discord')
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Page cache per connection, in KiB
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+    # Negative sizes are in KiB rather than pages
+    f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+)
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    """Tune a freshly opened SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def install() -> None:
+    """Apply the profile to every SQLite connection opened from now on (idempotent)"""
+    if not event.contains(Engine, "connect", _apply_pragmas):
+        event.listen(Engine, "connect", _apply_pragmas)
+        logger.info("SQLite connection profile installed (WAL, synchronous=NORMAL)")
+
+
+def is_sqlite(engine: Engine) -> bool:
+    return engine.dialect.name == "sqlite"
@@ -0,0 +1,79 @@
+"""
+Top-K Tracker for Discord Bot
+
+This module keeps the highest-scoring keys (e.g. the richest users) in memory
+so leaderboards can be served without sorting a table. The tracker holds up to
+`capacity` keys and a floor score with one invariant: every key it is not
+tracking scores at or below the floor. Score changes keep the invariant
+without a query; when too few tracked keys remain to answer a read exactly,
+the caller reloads the tracker from the database.
+"""
+
+import heapq
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+
+class TopKTracker:
+    """The `capacity` highest scores, maintained incrementally"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._scores = {}
+        self._floor = None  # None until loaded
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def load(self, rows: Iterable[Tuple[Hashable, int]]) -> None:
+        """Replace the contents with the top rows from the source of truth
+
+        rows must be the highest-scoring keys, at most `capacity` of them.
+        """
+        self._scores = dict(rows)
+        if len(self._scores) >= self.capacity:
+            self._floor = min(self._scores.values())
+        else:
+            # Fewer keys than capacity exist at all: nothing is untracked
+            self._floor = float("-inf")
+        self.loaded = True
+
+    def update(self, key: Hashable, score: int) -> None:
+        """Record a key's new score"""
+        if not self.loaded:
+            return
+
+        if key in self._scores:
+            if score < self._floor:
+                # Untracked keys may now outrank it; stop tracking it
+                del self._scores[key]
+            else:
+                self._scores[key] = score
+            return
+
+        if score > self._floor:
+            self._scores[key] = score
+            if len(self._scores) > self.capacity:
+                evicted, evicted_score = min(self._scores.items(), key=lambda item: item[1])
+                del self._scores[evicted]
+                self._floor = max(self._floor, evicted_score)
+
+    def discard(self, key: Hashable) -> None:
+        """Stop tracking a key (e.g. a deleted profile)"""
+        self._scores.pop(key, None)
+
+    def top(self, k: int, keys: Optional[set] = None) -> Optional[List[Tuple[Hashable, int]]]:
+        """The k highest (key, score) pairs, optionally only among `keys`
+
+        Returns None when the tracker can't answer exactly and the caller
+        should fall back to the database.
+        """
+        if not self.loaded:
+            return None
+        items = self._scores.items()
+        if keys is not None:
+            items = [(key, score) for key, score in items if key in keys]
+        best = heapq.nlargest(k, items, key=lambda item: item[1])
+        if len(best) < k and self._floor != float("-inf"):
+            return None
+        return best
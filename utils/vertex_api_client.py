@@ -13,6 +13,8 @@ import requests
 import time
 from typing import Dict, List, Optional, Any
 
+from utils import http_client
+
 logger = logging.getLogger('discord')
 
 class VertexRESTClient:
@@ -158,6 +160,13 @@ class VertexRESTClient:
             logger.error(f"Error getting auth token: {str(e)}")
             return False
             
+    async def _post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]):
+        """POST over the shared keep-alive session; returns (status, parsed JSON or error text)"""
+        async with http_client.get_session("vertex").post(url, headers=headers, json=payload) as response:
+            if response.status != 200:
+                return response.status, await response.text()
+            return response.status, await response.json()
+            
     async def generate_text(self, prompt: str, max_output_tokens: int = 1024, temperature: float = 0.7):
         """Generate text using Vertex AI text model via REST API"""
         if not self.initialized or not self.auth_token:
@@ -189,13 +198,12 @@ class VertexRESTClient:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            status_code, data = await self._post(url, headers, payload)
             
-            if response.status_code != 200:
-                logger.error(f"Error generating text: {response.status_code} - {response.text}")
+            if status_code != 200:
+                logger.error(f"Error generating text: {status_code} - {data}")
                 return None
                 
-            data = response.json()
             if 'predictions' in data and data['predictions']:
                 return data['predictions'][0].get('content', '')
                 
@@ -261,13 +269,12 @@ class VertexRESTClient:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            status_code, data = await self._post(url, headers, payload)
             
-            if response.status_code != 200:
-                logger.error(f"Error generating chat response: {response.status_code} - {response.text}")
+            if status_code != 200:
+                logger.error(f"Error generating chat response: {status_code} - {data}")
                 return None
                 
-            data = response.json()
             if 'predictions' in data and data['predictions']:
                 prediction = data['predictions'][0]
                 if isinstance(prediction, dict) and 'candidates' in prediction: